@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""Local benchmark: seed a realistic dataset, drive every endpoint in-process, report latency as JSON.
+
+The app runs in this process behind httpx's ASGI transport (no network, no uvicorn), against a local
+mongod or, with --memory, the mongomock-motor stand-in. Seeding is deterministic for a given --seed.
+
+    python backend/benchmark.py                                  # 100k numbers, 20k places, 5M usages
+    python backend/benchmark.py --scale 0.01 --concurrency 32    # same shape, 1% of the volume
+    python backend/benchmark.py --memory --scale 0.002 --scenarios places_list,bootstrap
+
+The benchmark database (--db) is dropped and re-seeded unless --reuse finds it already populated.
+Per scenario the report has throughput, p50/p95/p99 latency and, on mongod, the mean Mongo commands and
+documents per request taken from the Server-Timing header. The stand-in has no command monitoring, so
+there every collection call is booked as one command (see CountingDatabase).
+/api/events (a stream) and the admin/observability routes are not benchmarked.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
+
+DEFAULT_VOLUMES = {"numbers": 100_000, "places": 20_000, "usages": 5_000_000}
+CATEGORIES = [
+    "Кафе", "Рестораны", "Доставка еды", "Такси", "Каршеринг", "Маркетплейсы", "Продукты", "Аптеки",
+    "Банки", "Кино", "Стриминг", "Одежда", "Электроника", "Путешествия", "Спорт", "Образование",
+    "Красота", "Игры", "Книги", "Зоотовары",
+]
+NAME_WORDS = [
+    "Вкус", "Город", "Быстро", "Север", "Лайм", "Океан", "Маркет", "Точка", "Ромашка", "Кит", "Смарт",
+    "Поехали", "Домой", "Сова", "Восток", "Ягода", "Штурман", "Плюс", "Мята", "Орбита",
+]
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+SERVER_TIMING_RE = re.compile(r'(\d+) cmds, (\d+) docs')
+INSERT_BATCH = 10_000
+
+
+def seeded_uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def fake_image(rng: random.Random, size: int) -> bytes:
+    # Random payload behind a PNG signature: incompressible like a real logo, distinct per place
+    return PNG_MAGIC + rng.randbytes(max(0, size - len(PNG_MAGIC)))
+
+
+def media_doc(server, rng: random.Random, size: int) -> Dict[str, Any]:
+    content = fake_image(rng, size)
+    return {"contentType": "image/png", "data": base64.b64encode(content).decode("ascii"), "hash": server.media_hash(content)}
+
+
+async def insert_batched(collection, docs, batch: int = INSERT_BATCH) -> int:
+    buf: List[Dict[str, Any]] = []
+    total = 0
+    for d in docs:
+        buf.append(d)
+        if len(buf) >= batch:
+            await collection.insert_many(buf, ordered=False)
+            total += len(buf)
+            buf = []
+    if buf:
+        await collection.insert_many(buf, ordered=False)
+        total += len(buf)
+    return total
+
+
+async def seed(server, db, volumes: Dict[str, int], rng: random.Random, logo_ratio: float = 0.6, logo_bytes: int = 8192) -> Dict[str, Any]:
+    """Write a dataset shaped like production straight into the collections, counters and summaries included.
+
+    Place popularity is skewed (a few places collect most usages), usage times spread over the last year,
+    and every derived field the app maintains (nameKey, phoneDigits, usedCount, lastEventAt, usageCount,
+    media hashes, revisions, daily rollups) is filled in so startup has nothing to backfill.
+    """
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    year = timedelta(days=365)
+    # seeded revisions predate the sync overlap window, so a token from right after seeding yields a true delta
+    rev = server.next_rev() - 2 * server.SYNC_REV_OVERLAP
+
+    operators = []
+    for name in server.DEFAULT_OPERATORS:
+        operators.append({
+            "id": seeded_uuid(rng), "name": name, "nameKey": server.name_key(name),
+            "logo": media_doc(server, rng, logo_bytes), "createdAt": now - year, "rev": rev,
+        })
+    await db.operators.insert_many(operators)
+    operator_keys = [server.operator_key(o["name"]) for o in operators]
+
+    categories = []
+    for name in CATEGORIES:
+        doc = {"id": seeded_uuid(rng), "name": name, "nameKey": server.name_key(name), "createdAt": now - year, "rev": rev}
+        if rng.random() < 0.5:
+            doc["icon"] = media_doc(server, rng, logo_bytes // 4)
+        categories.append(doc)
+    await db.categories.insert_many(categories)
+
+    n_numbers, n_places = volumes["numbers"], volumes["places"]
+    numbers = []
+    for local in rng.sample(range(10 ** 9), n_numbers):
+        digits = f"79{local:09d}"
+        numbers.append({
+            "id": seeded_uuid(rng), "phone": server.format_ru_phone_strict(digits), "phoneDigits": digits,
+            "operatorKey": rng.choice(operator_keys), "usedCount": 0, "createdAt": now - year * rng.random(), "rev": rev,
+        })
+    places = []
+    for i in range(n_places):
+        name = f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_WORDS)} {i}"
+        places.append({
+            "id": seeded_uuid(rng), "name": name, "nameKey": server.name_key(name), "category": rng.choice(CATEGORIES),
+            "promoCode": f"PROMO{i}" if rng.random() < 0.4 else None,
+            "promoUrl": f"https://example.com/p/{i}" if rng.random() < 0.3 else None,
+            "comment": None, "usageCount": 0, "createdAt": now - year * rng.random(), "rev": rev,
+        })
+
+    # Usages: each number gets ~usages/numbers distinct places; rng.random() ** 3 bends choice towards low indices
+    per_number = volumes["usages"] / max(1, n_numbers)
+    rollups: Dict[tuple, int] = {}
+
+    def usages():
+        for n in numbers:
+            k = min(n_places, int(per_number) + (1 if rng.random() < per_number % 1 else 0))
+            chosen = set()
+            while len(chosen) < k:
+                chosen.add(int(n_places * rng.random() ** 3))
+            last = None
+            for idx in chosen:
+                p = places[idx]
+                at = now - year * rng.random()
+                last = at if last is None or at > last else last
+                p["usageCount"] += 1
+                day = server.utc_day(at)
+                for key in (("total", "all"), ("operator", n["operatorKey"]), ("category", p["category"])):
+                    rollups[key + (day,)] = rollups.get(key + (day,), 0) + 1
+                yield {"id": seeded_uuid(rng), "numberId": n["id"], "placeId": p["id"], "used": True, "updatedAt": at, "rev": rev}
+            n["usedCount"] = len(chosen)
+            if last is not None:
+                # never-used numbers carry no lastEventAt at all (null and missing sort alike)
+                n["lastEventAt"] = last
+
+    n_usages = await insert_batched(db.usages, usages())
+    await insert_batched(db.numbers, numbers)
+
+    def place_docs():
+        for p in places:
+            if rng.random() < logo_ratio:
+                p = dict(p, logo=media_doc(server, rng, int(logo_bytes * (0.5 + rng.random()))))
+            yield p
+
+    # logos are generated per batch so the full set is never held in memory
+    await insert_batched(db.places, place_docs(), batch=1000)
+    await insert_batched(db.usage_daily, (
+        {"dim": dim, "key": key, "day": day, "marked": count, "unmarked": 0}
+        for (dim, key, day), count in rollups.items()
+    ))
+    await db.meta.update_one({"_id": "usage_rollup"}, {"$set": {"upTo": now}}, upsert=True)
+    return {
+        "seconds": round(time.perf_counter() - started, 2),
+        "counts": {"numbers": n_numbers, "places": n_places, "usages": n_usages, "operators": len(operators), "categories": len(categories)},
+    }
+
+
+@dataclass
+class BenchContext:
+    """Ids sampled from the seeded database that scenarios draw their requests from."""
+    numbers: List[Dict[str, Any]]
+    places: List[Dict[str, Any]]
+    logos: List[Dict[str, Any]]
+    operators: List[Dict[str, Any]]
+    categories: List[Dict[str, Any]]
+    seed_rev: int
+    created: Dict[str, List[str]] = field(default_factory=dict)
+
+
+async def load_context(server, sample: int = 2000) -> BenchContext:
+    db = server.db
+    numbers, places, logos, operators, categories, newest = await asyncio.gather(
+        db.numbers.find({}, {"_id": 0, "id": 1, "phone": 1, "operatorKey": 1}).limit(sample).to_list(sample),
+        db.places.find({}, {"_id": 0, "id": 1, "name": 1, "category": 1}).limit(sample).to_list(sample),
+        db.places.find({"logo": {"$ne": None}}, {"_id": 0, "id": 1, "logo.hash": 1}).limit(sample).to_list(sample),
+        db.operators.find({}, {"_id": 0, "id": 1, "name": 1}).to_list(100),
+        db.categories.find({}, {"_id": 0, "id": 1, "name": 1, "icon.hash": 1}).to_list(100),
+        db.places.find_one({}, {"_id": 0, "rev": 1}, sort=[("rev", -1)]),
+    )
+    # a sync token just past the newest seeded revision and its overlap window
+    seed_rev = (newest or {}).get("rev", 0) + server.SYNC_REV_OVERLAP
+    return BenchContext(numbers, places, logos, operators, categories, seed_rev)
+
+
+def multipart(fields: Dict[str, str]) -> Dict[str, Any]:
+    # the form endpoints only parse multipart bodies
+    return {"files": {k: (None, v) for k, v in fields.items()}}
+
+
+def bench_phone(rng: random.Random) -> str:
+    # seeded numbers are all +7 9xx, so created ones (+7 8xx) never collide with them
+    return f"+78{rng.randrange(10 ** 9):09d}"
+
+
+def created_id(ctx: BenchContext, kind: str) -> Optional[str]:
+    pool = ctx.created.get(kind) or []
+    return pool.pop() if pool else None
+
+
+# Each scenario turns (context, rng) into (method, url, httpx kwargs); None skips the slot.
+# Reads come first and writes last, and the deletes consume what the creates made.
+Scenario = Callable[[BenchContext, random.Random], Optional[tuple]]
+
+SCENARIOS: Dict[str, Scenario] = {
+    "places_list": lambda c, r: ("GET", "/api/places", {}),
+    "places_filtered": lambda c, r: ("GET", "/api/places", {"params": {"category": r.choice(CATEGORIES), "sort": r.choice(["popular", "name", "new"])}}),
+    "places_query": lambda c, r: ("GET", "/api/places", {"params": {"q": r.choice(NAME_WORDS).lower()[:4]}}),
+    "places_facets": lambda c, r: ("GET", "/api/places", {"params": {"facets": "true"}}),
+    "place_get": lambda c, r: ("GET", f"/api/places/{r.choice(c.places)['id']}", {}),
+    "place_logo": lambda c, r: ("GET", f"/api/places/{(p := r.choice(c.logos))['id']}/logo", {"params": {"v": p["logo"]["hash"]}}),
+    "place_usage": lambda c, r: ("GET", f"/api/places/{r.choice(c.places)['id']}/usage", {}),
+    "next_free": lambda c, r: ("GET", f"/api/places/{r.choice(c.places)['id']}/next-free", {"params": {"limit": 5}}),
+    "numbers_list": lambda c, r: ("GET", "/api/numbers", {}),
+    "numbers_query": lambda c, r: ("GET", "/api/numbers", {"params": {"q": r.choice(c.numbers)["phone"][:9]}}),
+    "numbers_facets": lambda c, r: ("GET", "/api/numbers", {"params": {"facets": "true"}}),
+    "number_get": lambda c, r: ("GET", f"/api/numbers/{r.choice(c.numbers)['id']}", {}),
+    "number_usage": lambda c, r: ("GET", f"/api/numbers/{r.choice(c.numbers)['id']}/usage", {}),
+    "number_recommendations": lambda c, r: ("GET", f"/api/numbers/{r.choice(c.numbers)['id']}/recommendations", {}),
+    "operators_list": lambda c, r: ("GET", "/api/operators", {}),
+    "operator_get": lambda c, r: ("GET", f"/api/operators/{r.choice(c.operators)['id']}", {}),
+    "operator_logo": lambda c, r: ("GET", f"/api/operators/{r.choice(c.operators)['id']}/logo", {}),
+    "categories_list": lambda c, r: ("GET", "/api/categories", {}),
+    "category_icon": lambda c, r: ("GET", f"/api/categories/{r.choice([x for x in c.categories if x.get('icon')])['id']}/icon", {}),
+    "search_text": lambda c, r: ("GET", "/api/search", {"params": {"q": r.choice(c.places)["name"].split()[0]}}),
+    "search_phone": lambda c, r: ("GET", "/api/search", {"params": {"q": r.choice(c.numbers)["phone"][:10]}}),
+    "suggest": lambda c, r: ("GET", "/api/suggest", {"params": {"q": r.choice(c.places)["name"][:r.randint(1, 4)]}}),
+    "bootstrap": lambda c, r: ("GET", "/api/bootstrap", {}),
+    # first page of a cold client's snapshot: bounded by SYNC_LIMIT per collection, whatever the dataset size
+    "sync_full": lambda c, r: ("GET", "/api/sync", {}),
+    "sync_delta": lambda c, r: ("GET", "/api/sync", {"params": {"since": c.seed_rev}}),
+    "stats_usage": lambda c, r: ("GET", "/api/stats/usage", {"params": {"dim": r.choice(["total", "operator", "category"])}}),
+    "usage_toggle": lambda c, r: ("POST", "/api/usage", {"json": {"numberId": r.choice(c.numbers)["id"], "placeId": r.choice(c.places)["id"], "used": r.random() < 0.5}}),
+    "next_free_reserve": lambda c, r: ("POST", f"/api/places/{r.choice(c.places)['id']}/next-free", {}),
+    "number_update": lambda c, r: ("PUT", f"/api/numbers/{(n := r.choice(c.numbers))['id']}", {"json": {"phone": n["phone"], "operatorKey": n["operatorKey"]}}),
+    "place_update": lambda c, r: ("PUT", f"/api/places/{r.choice(c.places)['id']}", multipart({"promoCode": f"BENCH{r.randint(0, 10 ** 6)}"})),
+    "number_create": lambda c, r: ("POST", "/api/numbers", {"json": {"phone": bench_phone(r), "operatorKey": r.choice(c.numbers)["operatorKey"]}}),
+    "place_create": lambda c, r: ("POST", "/api/places", multipart({"name": f"Бенч {seeded_uuid(r)}", "category": r.choice(CATEGORIES)})),
+    "operator_create": lambda c, r: ("POST", "/api/operators", multipart({"name": f"Бенч {seeded_uuid(r)}"})),
+    "category_create": lambda c, r: ("POST", "/api/categories", multipart({"name": f"Бенч {seeded_uuid(r)}"})),
+    "number_delete": lambda c, r: ("DELETE", f"/api/numbers/{i}", {}) if (i := created_id(c, "number_create")) else None,
+    "place_delete": lambda c, r: ("DELETE", f"/api/places/{i}", {}) if (i := created_id(c, "place_create")) else None,
+    "operator_delete": lambda c, r: ("DELETE", f"/api/operators/{i}", {}) if (i := created_id(c, "operator_create")) else None,
+    "category_delete": lambda c, r: ("DELETE", f"/api/categories/{i}", {}) if (i := created_id(c, "category_create")) else None,
+}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest rank
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, name: str, ctx: BenchContext, requests: int, concurrency: int, seed: int = 0, trace_memory: bool = False,
+) -> Dict[str, Any]:
+    """Fire `requests` requests from one scenario with at most `concurrency` in flight; return its summary."""
+    make = SCENARIOS[name]
+    rng = random.Random(f"{seed}:{name}")
+    latencies: List[float] = []
+    commands: List[int] = []
+    docs: List[int] = []
+    statuses: Dict[str, int] = {}
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            spec = make(ctx, rng)
+            if spec is None:
+                continue
+            method, url, kwargs = spec
+            started = time.perf_counter()
+            resp = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            statuses[str(resp.status_code)] = statuses.get(str(resp.status_code), 0) + 1
+            m = SERVER_TIMING_RE.search(resp.headers.get("server-timing", ""))
+            if m:
+                commands.append(int(m.group(1)))
+                docs.append(int(m.group(2)))
+            if resp.status_code == 200 and method == "POST" and name.endswith("_create"):
+                ctx.created.setdefault(name, []).append(resp.json()["id"])
+
+    if trace_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+    out: Dict[str, Any] = {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": sum(n for code, n in statuses.items() if int(code) >= 400),
+        "statuses": statuses,
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "meanMs": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "p50Ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95Ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99Ms": round(percentile(ordered, 99) * 1000, 3),
+        "maxMs": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        "dbCommands": round(sum(commands) / len(commands), 2) if commands else None,
+        "dbDocs": round(sum(docs) / len(docs), 1) if docs else None,
+    }
+    if trace_memory:
+        out["peakKb"] = round((tracemalloc.get_traced_memory()[1] - base) / 1024, 1)
+    return out
+
+
+# Collection method -> the command a real driver sends for it
+COMMAND_NAMES = {
+    "find": "find", "find_one": "find", "aggregate": "aggregate", "count_documents": "aggregate",
+    "distinct": "distinct", "insert_one": "insert", "insert_many": "insert", "update_one": "update",
+    "update_many": "update", "replace_one": "update", "bulk_write": "update", "delete_one": "delete",
+    "delete_many": "delete", "find_one_and_update": "findAndModify", "find_one_and_delete": "findAndModify",
+    "find_one_and_replace": "findAndModify", "create_index": "createIndexes", "list_indexes": "listIndexes",
+    "estimated_document_count": "count", "drop": "drop",
+}
+CURSOR_METHODS = {"find", "aggregate", "list_indexes"}
+
+
+def account(server, command: str, collection: str, seconds: float, docs: int):
+    """Book one stand-in call the way MongoCommandMetrics books a real command."""
+    server.mongo_latency.observe((command, collection), seconds)
+    stats = server.request_db.get()
+    if stats is not None:
+        stats.record(seconds, docs, 0)
+
+
+class CountingCursor:
+    """A stand-in cursor that books its fetch as one command and the documents it yields."""
+
+    def __init__(self, cursor, server, command: str, collection: str):
+        self._cursor = cursor
+        self._server = server
+        self._command = command
+        self._collection = collection
+        self._fetched = False
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def chained(*args, **kwargs):
+            out = attr(*args, **kwargs)
+            return self if out is self._cursor else out
+        return chained
+
+    async def to_list(self, *args, **kwargs):
+        started = time.perf_counter()
+        items = await self._cursor.to_list(*args, **kwargs)
+        account(self._server, self._command, self._collection, time.perf_counter() - started, len(items))
+        return items
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        started = time.perf_counter()
+        item = await self._cursor.__anext__()
+        if not self._fetched:
+            self._fetched = True
+            account(self._server, self._command, self._collection, time.perf_counter() - started, 1)
+        elif (stats := self._server.request_db.get()) is not None:
+            with stats.lock:
+                stats.docs += 1
+        return item
+
+
+class CountingCollection:
+    """Stand-in collection whose calls are accounted like the CommandListener accounts real ones."""
+
+    def __init__(self, collection, server):
+        self._collection = collection
+        self._server = server
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        command = COMMAND_NAMES.get(name, name)
+        if name in CURSOR_METHODS:
+            return lambda *args, **kwargs: CountingCursor(attr(*args, **kwargs), self._server, command, self._collection.name)
+        if not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            started = time.perf_counter()
+            out = await attr(*args, **kwargs)
+            docs = len(out) if isinstance(out, list) else int(isinstance(out, dict))
+            account(self._server, command, self._collection.name, time.perf_counter() - started, docs)
+            return out
+        return call
+
+
+class CountingDatabase:
+    """Wraps the stand-in database so Server-Timing and /api/metrics see its calls as Mongo commands."""
+
+    def __init__(self, db, server):
+        self._db = db
+        self._server = server
+
+    def __getattr__(self, name):
+        attr = getattr(self._db, name)
+        # the stand-in's collections pass for Motor ones; everything else is database-level API
+        return CountingCollection(attr, self._server) if isinstance(attr, AsyncIOMotorCollection) else attr
+
+    def __getitem__(self, name):
+        return CountingCollection(self._db[name], self._server)
+
+
+def load_server(db_name: str, memory: bool):
+    """Import the app with its database pointed at the benchmark one (and swapped for the stand-in if asked).
+
+    The client is rebuilt on every call: DB_NAME is only read on the first import of server, and a Motor
+    client stays bound to the event loop it first ran on.
+    """
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ["DB_NAME"] = db_name
+    sys.path.insert(0, str(Path(__file__).parent))
+    import server
+    if memory:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("--memory needs mongomock-motor: pip install mongomock-motor")
+        server.client = AsyncMongoMockClient()
+        server.db = CountingDatabase(server.client[db_name], server)
+    else:
+        server.client = AsyncIOMotorClient(os.environ["MONGO_URL"], event_listeners=[server.MongoCommandMetrics()])
+        server.db = server.client[db_name]
+    return server
+
+
+def reset_app_state(server):
+    """Forget what the in-process caches learned from a previous database (one process may host several)."""
+    server.query_cache = server.ResponseCache(server.QUERY_CACHE_SIZE, server.QUERY_CACHE_TTL)
+    server.suggest_index = server.SuggestIndex()
+
+
+async def prepare(server, volumes: Dict[str, int], seed_value: int, reuse: bool = False, logo_ratio: float = 0.6, logo_bytes: int = 8192) -> Dict[str, Any]:
+    """Seed (or reuse) the benchmark database, then run the app's startup so indexes and caches are warm."""
+    db = server.db
+    info: Dict[str, Any] = {"reused": False}
+    if reuse and await db.numbers.count_documents({}, limit=1):
+        info["reused"] = True
+    else:
+        await server.client.drop_database(db.name)
+        info.update(await seed(server, db, volumes, random.Random(seed_value), logo_ratio, logo_bytes))
+    reset_app_state(server)
+    started = time.perf_counter()
+    await server.app.router.startup()
+    info["startupSeconds"] = round(time.perf_counter() - started, 2)
+    return info
+
+
+async def benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    server = load_server(args.db, args.memory)
+    volumes = {k: max(1, int(getattr(args, k) * args.scale)) for k in DEFAULT_VOLUMES}
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"unknown scenarios: {', '.join(unknown)} (have: {', '.join(SCENARIOS)})")
+
+    report: Dict[str, Any] = {
+        "config": {
+            "backend": "memory" if args.memory else os.environ["MONGO_URL"], "db": args.db, "seed": args.seed,
+            "volumes": volumes, "requests": args.requests, "concurrency": args.concurrency, "warmup": args.warmup,
+        },
+    }
+    report["dataset"] = await prepare(server, volumes, args.seed, args.reuse, args.logo_ratio, args.logo_bytes)
+    report["scenarios"] = await drive(server, names, args.requests, args.concurrency, args.warmup, args.seed, args.trace_memory)
+    return report
+
+
+async def drive(
+    server, names: List[str], requests: int, concurrency: int, warmup: int = 0, seed: int = 0, trace_memory: bool = False,
+) -> Dict[str, Any]:
+    """Run the named scenarios in order against a prepared app, then shut it down; returns their summaries."""
+    ctx = await load_context(server)
+    results: Dict[str, Any] = {}
+    try:
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for name in names:
+                if warmup and not name.endswith(("_create", "_delete")):
+                    await run_scenario(client, name, ctx, warmup, concurrency, seed + 1)
+                results[name] = await run_scenario(client, name, ctx, requests, concurrency, seed, trace_memory)
+                logging.getLogger("benchmark").info("%s: %s", name, results[name])
+    finally:
+        await server.app.router.shutdown()
+    return results
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    p.add_argument("--memory", action="store_true", help="use the in-memory mongomock-motor stand-in instead of MONGO_URL")
+    p.add_argument("--db", default="first_bench", help="benchmark database (dropped and re-seeded)")
+    p.add_argument("--reuse", action="store_true", help="keep an already seeded --db instead of re-seeding")
+    p.add_argument("--seed", type=int, default=1, help="random seed for the dataset and the request mix")
+    p.add_argument("--scale", type=float, default=1.0, help="multiplier applied to every volume")
+    for k, v in DEFAULT_VOLUMES.items():
+        p.add_argument(f"--{k}", type=int, default=v, help=f"{k} to seed (default {v})")
+    p.add_argument("--logo-ratio", type=float, default=0.6, help="share of places with a logo")
+    p.add_argument("--logo-bytes", type=int, default=8192, help="average logo size")
+    p.add_argument("--scenarios", default="", help="comma-separated subset (default: all)")
+    p.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    p.add_argument("--concurrency", type=int, default=16, help="requests in flight per scenario")
+    p.add_argument("--warmup", type=int, default=10, help="unrecorded requests per read scenario")
+    p.add_argument("--trace-memory", action="store_true", help="report each scenario's peak Python allocation (slower)")
+    p.add_argument("--output", help="write the JSON report here instead of stdout")
+    p.add_argument("-v", "--verbose", action="store_true", help="log per-scenario progress and the app's warnings")
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr)
+    if not args.verbose:
+        # per-request DB budget warnings would drown the run; the report carries the same numbers
+        logging.getLogger("server").setLevel(logging.ERROR)
+    report = asyncio.run(benchmark(args))
+    text = json.dumps(report, indent=2, ensure_ascii=False, default=str)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
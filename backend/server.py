@@ -1,18 +1,38 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Response
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File, Form, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne, monitoring
+from pymongo.errors import DuplicateKeyError, BulkWriteError, OperationFailure, PyMongoError
+import bson
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
 from uuid import uuid4
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 import uuid
 from datetime import datetime, timezone, timedelta
 import base64
 import re
+import json
+import asyncio
+import time
+import bisect
+import unicodedata
+import hashlib
+import threading
+import contextvars
+import cProfile
+import hmac
+import random
+import sys
+import traceback
+import tracemalloc
+import resource
+from collections import OrderedDict
 
 # Helpers to ensure timezone-aware UTC datetimes
 def ensure_utc(dt):
@@ -34,9 +54,448 @@ def normalize_doc_dt(d: Dict[str, Any]):
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# ---------------------
+# Prometheus metrics
+# ---------------------
+# A minimal in-process registry rendered in the Prometheus text format at GET /api/metrics. Mongo commands are
+# timed by a pymongo CommandListener, which runs on driver threads, hence the locks.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+def prom_labels(names: tuple, values: tuple) -> str:
+    def esc(v: Any) -> str:
+        return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{n}="{esc(v)}"' for n, v in zip(names, values))
+
+class PromMetric:
+    """Counter or gauge keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help: str, kind: str, labels: tuple = ()):
+        self.name, self.help, self.kind, self.labels = name, help, kind, labels
+        # an unlabelled series exists from the start, so scrapes see 0 rather than no series at all
+        self.values: Dict[tuple, float] = {} if labels else {(): 0}
+        self.lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, labels: tuple = ()):
+        self.inc(labels, -1)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, v in list(self.values.items()):
+            lines.append(f"{self.name}{{{prom_labels(self.labels, labels)}}} {v}" if labels else f"{self.name} {v}")
+        return lines
+
+class PromHistogram:
+    """Histogram keyed by a tuple of label values; buckets are stored per slot and cumulated on render."""
+
+    def __init__(self, name: str, help: str, labels: tuple, buckets: tuple):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        # per series: one slot per bucket, an overflow slot, then sum and count
+        self.series: Dict[tuple, List[float]] = {} if labels else {(): [0] * (len(buckets) + 3)}
+        self.lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        slot = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            s = self.series.get(labels)
+            if s is None:
+                s = self.series[labels] = [0] * (len(self.buckets) + 3)
+            s[slot] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, s in list(self.series.items()):
+            base = prom_labels(self.labels, labels)
+            sep = "," if base else ""
+            plain = f"{{{base}}}" if base else ""
+            cumulative = 0
+            for bound, n in zip(self.buckets, s):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {s[-1]}')
+            lines.append(f"{self.name}_sum{plain} {s[-2]}")
+            lines.append(f"{self.name}_count{plain} {s[-1]}")
+        return lines
+
+http_requests = PromMetric("first_http_requests_total", "HTTP requests by route template and status.", "counter", ("method", "route", "status"))
+http_in_flight = PromMetric("first_http_requests_in_flight", "HTTP requests currently being served.", "gauge")
+http_latency = PromHistogram("first_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route"), LATENCY_BUCKETS)
+http_size = PromHistogram("first_http_response_size_bytes", "HTTP response body size by route template.", ("method", "route"), SIZE_BUCKETS)
+mongo_latency = PromHistogram("first_mongo_command_duration_seconds", "Mongo command latency by command and collection.", ("command", "collection"), LATENCY_BUCKETS)
+mongo_failures = PromMetric("first_mongo_command_failures_total", "Failed Mongo commands by command and collection.", "counter", ("command", "collection"))
+loop_lag = PromHistogram("first_event_loop_lag_seconds", "Delay of the event loop waking a sleeping task.", (), LATENCY_BUCKETS)
+loop_stalls = PromMetric("first_event_loop_stalls_total", "Times a single callback blocked the loop past the threshold.", "counter")
+
+# Per-request Mongo accounting: Motor copies the context into its executor threads, so the listener sees the
+# stats object of the request that issued the command. Surfaced as Server-Timing and checked against budgets.
+DB_WARN_COMMANDS = int(os.environ.get("DB_WARN_COMMANDS", "10"))
+DB_WARN_DOCS = int(os.environ.get("DB_WARN_DOCS", "5000"))
+# Reply sizes need a re-encode of every reply, so they are only measured when asked for
+DB_ACCOUNT_BYTES = os.environ.get("DB_ACCOUNT_BYTES", "0") == "1"
+ACCESS_LOG = os.environ.get("ACCESS_LOG", "0") == "1"
+
+class RequestDbStats:
+    def __init__(self):
+        self.commands = 0
+        self.docs = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float, docs: int, size: int):
+        with self.lock:
+            self.commands += 1
+            self.docs += docs
+            self.bytes += size
+            self.seconds += seconds
+
+    def server_timing(self, total: float) -> str:
+        desc = f"{self.commands} cmds, {self.docs} docs" + (f", {self.bytes} B" if DB_ACCOUNT_BYTES else "")
+        return f'db;dur={self.seconds * 1000:.1f};desc="{desc}", app;dur={total * 1000:.1f}'
+
+request_db: contextvars.ContextVar[Optional[RequestDbStats]] = contextvars.ContextVar("request_db", default=None)
+
+def reply_docs(reply: Dict[str, Any]) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if "value" in reply:
+        # findAndModify
+        return 1 if reply["value"] else 0
+    if "values" in reply:
+        # distinct
+        return len(reply["values"])
+    return 0
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self.pending: Dict[tuple, str] = {}
+
+    def started(self, event):
+        cmd = event.command
+        target = cmd.get("collection") if event.command_name == "getMore" else cmd.get(event.command_name)
+        self.pending[(event.connection_id, event.request_id)] = target if isinstance(target, str) else ""
+
+    def succeeded(self, event):
+        collection = self.pending.pop((event.connection_id, event.request_id), "")
+        mongo_latency.observe((event.command_name, collection), event.duration_micros / 1e6)
+        stats = request_db.get()
+        if stats is not None:
+            size = len(bson.encode(event.reply)) if DB_ACCOUNT_BYTES else 0
+            stats.record(event.duration_micros / 1e6, reply_docs(event.reply), size)
+
+    def failed(self, event):
+        collection = self.pending.pop((event.connection_id, event.request_id), "")
+        mongo_latency.observe((event.command_name, collection), event.duration_micros / 1e6)
+        mongo_failures.inc((event.command_name, collection))
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request (labelled by route template) and accounting its Mongo work."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = 500
+        size = 0
+        stats = RequestDbStats()
+        token = request_db.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timing = stats.server_timing(time.perf_counter() - started).encode()
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing)]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_db.reset(token)
+            http_in_flight.dec()
+            elapsed = time.perf_counter() - started
+            # the template, not the raw path, keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            http_requests.inc((method, route, str(status)))
+            http_latency.observe((method, route), elapsed)
+            http_size.observe((method, route), size)
+            if stats.commands > DB_WARN_COMMANDS or stats.docs > DB_WARN_DOCS:
+                logger.warning(
+                    "%s %s issued %d Mongo commands returning %d documents (budget %d/%d)",
+                    method, scope["path"], stats.commands, stats.docs, DB_WARN_COMMANDS, DB_WARN_DOCS,
+                )
+            if ACCESS_LOG:
+                logger.info(
+                    "%s %s %d %.1fms db=%d cmds/%d docs/%d B/%.1fms", method, scope["path"], status,
+                    elapsed * 1000, stats.commands, stats.docs, stats.bytes, stats.seconds * 1000,
+                )
+
+# ---------------------
+# On-demand profiling
+# ---------------------
+# A request is profiled when it carries a valid signed X-Profile-Token or is picked by the admin sampler.
+# With neither configured the middleware is a couple of attribute checks per request.
+try:
+    from pyinstrument import Profiler as InstrumentProfiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+except ImportError:  # optional: cProfile sees CPU but not time spent awaiting Mongo
+    InstrumentProfiler = None
+
+PROFILE_SECRET = os.environ.get("PROFILE_SECRET")
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", "/tmp/first-profiles"))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "50"))
+PROFILE_HEADER = b"x-profile-token"
+
+def sign_profile_token(expires: int) -> str:
+    sig = hmac.new(PROFILE_SECRET.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+    return f"{expires}:{sig}"
+
+def profile_token_valid(value: bytes) -> bool:
+    expires, _, sig = value.decode("latin-1").partition(":")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(sign_profile_token(int(expires)), f"{expires}:{sig}")
+
+class ProfileSampler:
+    """Admin-controlled sampling window: profile `rate` of requests under `route` until `until`."""
+
+    def __init__(self):
+        self.rate = 0.0
+        self.route = "/"
+        self.until = 0.0
+        self.busy = False
+        self.captured = 0
+
+    def configure(self, rate: float, route: str, seconds: float):
+        self.rate = max(0.0, min(rate, 1.0))
+        self.route = route or "/"
+        self.until = time.time() + seconds if self.rate else 0.0
+
+    def picks(self, path: str) -> bool:
+        return time.time() < self.until and path.startswith(self.route) and random.random() < self.rate
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate, "route": self.route, "until": self.until, "captured": self.captured,
+            "engine": "pyinstrument" if InstrumentProfiler else "cprofile",
+        }
+
+profile_sampler = ProfileSampler()
+
+def store_profile(name: str, data: Optional[bytes], prof: Optional[cProfile.Profile]):
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    path = PROFILE_DIR / name
+    if prof is not None:
+        prof.dump_stats(str(path))
+    else:
+        path.write_bytes(data)
+    files = sorted(PROFILE_DIR.iterdir(), key=lambda f: f.stat().st_mtime)
+    for old in files[:max(0, len(files) - PROFILE_KEEP)]:
+        old.unlink(missing_ok=True)
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    def wanted(self, scope) -> bool:
+        if profile_sampler.busy:
+            return False
+        if profile_sampler.until and profile_sampler.picks(scope["path"]):
+            return True
+        if PROFILE_SECRET:
+            for key, value in scope["headers"]:
+                if key == PROFILE_HEADER:
+                    return profile_token_valid(value)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.wanted(scope):
+            return await self.app(scope, receive, send)
+        # one profile at a time: both profilers hook the whole thread
+        profile_sampler.busy = True
+        started = time.perf_counter()
+        data, prof = None, None
+        try:
+            if InstrumentProfiler:
+                profiler = InstrumentProfiler(async_mode="enabled")
+                profiler.start()
+                try:
+                    await self.app(scope, receive, send)
+                finally:
+                    profiler.stop()
+                data, ext = profiler.output(SpeedscopeRenderer()).encode(), "speedscope.json"
+            else:
+                prof = cProfile.Profile()
+                prof.enable()
+                try:
+                    await self.app(scope, receive, send)
+                finally:
+                    prof.disable()
+                ext = "prof"
+        finally:
+            profile_sampler.busy = False
+        elapsed_ms = int((time.perf_counter() - started) * 1000)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_")[:60]
+        name = f"{int(time.time() * 1000)}-{scope['method']}-{slug}-{elapsed_ms}ms.{ext}"
+        profile_sampler.captured += 1
+        await asyncio.to_thread(store_profile, name, data, prof)
+
+# ---------------------
+# Memory profiling
+# ---------------------
+# tracemalloc is off unless started through /api/admin/memory/start. While it traces, a sample of requests
+# (one at a time, since the peak counter is process-wide) records its allocation peak per route template.
+MEMORY_SNAPSHOTS_KEEP = 5
+
+class MemoryTracker:
+    def __init__(self):
+        self.rate = 0.0
+        self.busy = False
+        self.snapshots: "OrderedDict[int, tuple]" = OrderedDict()
+        self.next_id = 1
+        self.routes: Dict[str, Dict[str, Any]] = {}
+
+    def start(self, frames: int, rate: float):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.rate = max(0.0, min(rate, 1.0))
+
+    def stop(self):
+        tracemalloc.stop()
+        self.snapshots.clear()
+        self.rate = 0.0
+
+    def snapshot(self) -> int:
+        # blocking: callers run it in a thread
+        snap = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        snap_id = self.next_id
+        self.next_id += 1
+        self.snapshots[snap_id] = (time.time(), snap)
+        while len(self.snapshots) > MEMORY_SNAPSHOTS_KEEP:
+            self.snapshots.popitem(last=False)
+        return snap_id
+
+    def diff(self, base_id: int, target_id: int, limit: int) -> List[Dict[str, Any]]:
+        stats = self.snapshots[target_id][1].compare_to(self.snapshots[base_id][1], "lineno")
+        return [
+            {"where": str(st.traceback[0]), "sizeDiff": st.size_diff, "size": st.size, "countDiff": st.count_diff}
+            for st in stats[:limit]
+        ]
+
+    def record(self, route: str, peak: int):
+        r = self.routes.setdefault(route, {"samples": 0, "maxPeak": 0, "lastPeak": 0})
+        r["samples"] += 1
+        r["lastPeak"] = peak
+        r["maxPeak"] = max(r["maxPeak"], peak)
+
+memory_tracker = MemoryTracker()
+
+def process_memory() -> Dict[str, int]:
+    out = {"peakRssBytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024}
+    try:
+        with open("/proc/self/statm") as f:
+            out["rssBytes"] = int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        pass
+    return out
+
+class MemorySamplingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or not memory_tracker.rate or memory_tracker.busy
+                or not tracemalloc.is_tracing() or random.random() >= memory_tracker.rate):
+            return await self.app(scope, receive, send)
+        memory_tracker.busy = True
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            memory_tracker.busy = False
+            if tracemalloc.is_tracing():
+                # concurrent requests allocate into the same peak; treat it as an upper bound
+                peak = tracemalloc.get_traced_memory()[1] - before
+                memory_tracker.record(f'{scope["method"]} {getattr(scope.get("route"), "path", "unmatched")}', peak)
+
+# ---------------------
+# Event-loop watchdog
+# ---------------------
+# A task measures how late the loop wakes it (lag); a thread watches that task's heartbeat and, when the loop
+# stops beating for longer than the threshold, logs the loop thread's stack: the code that is blocking it.
+LOOP_LAG_INTERVAL = float(os.environ.get("LOOP_LAG_INTERVAL", "0.5"))
+LOOP_BLOCK_THRESHOLD = float(os.environ.get("LOOP_BLOCK_THRESHOLD", "0.1"))
+
+class LoopWatchdog:
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self.beat = time.monotonic()
+        self.loop_thread: Optional[int] = None
+        self.stopped = threading.Event()
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.beat = time.monotonic()
+        # a fresh event per run: a restarted app (same process, new loop) must not inherit the last shutdown's
+        self.stopped = stopped = threading.Event()
+        threading.Thread(target=self.watch, args=(stopped,), name="loop-watchdog", daemon=True).start()
+        try:
+            while True:
+                started = loop.time()
+                await asyncio.sleep(self.interval)
+                self.last_lag = max(0.0, loop.time() - started - self.interval)
+                self.max_lag = max(self.max_lag, self.last_lag)
+                loop_lag.observe((), self.last_lag)
+                self.beat = time.monotonic()
+        finally:
+            stopped.set()
+
+    def watch(self, stopped: threading.Event):
+        reported = None
+        while not stopped.wait(self.threshold / 2):
+            beat = self.beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked < self.threshold or reported == beat:
+                continue
+            # one report per stall: the same heartbeat is not reported twice
+            reported = beat
+            self.stalls += 1
+            loop_stalls.inc()
+            frame = sys._current_frames().get(self.loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<loop thread not found>"
+            logger.warning("Event loop blocked for %.0f ms; loop thread stack:\n%s", blocked * 1000, stack)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"lastLagMs": round(self.last_lag * 1000, 3), "maxLagMs": round(self.max_lag * 1000, 3), "stalls": self.stalls}
+
+loop_watchdog = LoopWatchdog(LOOP_LAG_INTERVAL, LOOP_BLOCK_THRESHOLD)
+
 # MongoDB connection - MUST use existing envs
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandMetrics()])
 db = client[os.environ.get('DB_NAME', 'first')]
 
 app = FastAPI()
@@ -53,6 +512,8 @@ class NumberModel(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     phone: str
     operatorKey: str
+    usedCount: int = 0
+    lastEventAt: Optional[datetime] = None
     createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class PlaceModel(BaseModel):
@@ -63,6 +524,7 @@ class PlaceModel(BaseModel):
     promoCode: Optional[str] = None
     promoUrl: Optional[str] = None
     comment: Optional[str] = None
+    usageCount: int = 0
     createdAt: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class OperatorModel(BaseModel):
@@ -86,6 +548,9 @@ class UsageSet(BaseModel):
 class SearchResult(BaseModel):
     numbers: List[Dict[str, Any]]
     places: List[Dict[str, Any]]
+    operators: List[Dict[str, Any]] = []
+    categories: List[Dict[str, Any]] = []
+    timings: Dict[str, float] = {}
 
 # ---------------------
 # Phone utils
@@ -131,16 +596,407 @@ def format_ru_phone_partial(raw: str) -> str:
         out += " " + rest[8:10]
     return out
 
-async def find_number_by_digits(digits: str) -> Optional[Dict[str, Any]]:
-    doc = await db.numbers.find_one({"phoneDigits": digits})
-    if doc:
-        return doc
-    items = await db.numbers.find({}).to_list(2000)
-    for it in items:
-        p = it.get("phone", "")
-        if extract_ru_digits(p) == digits:
-            return it
-    return None
+async def backfill_phone_digits() -> int:
+    """Fill phoneDigits on legacy numbers and build the unique index that replaces the O(N) digits scan."""
+    count = 0
+    if "phoneDigits_1" not in await db.numbers.index_information():
+        # equal phoneDigits written before the index existed would stop it from building:
+        # the oldest number keeps its digits, the others get suffixed ones like the legacy duplicates below
+        dupes = db.numbers.aggregate([
+            {"$match": {"phoneDigits": {"$type": "string"}}},
+            {"$sort": {"createdAt": 1}},
+            {"$group": {"_id": "$phoneDigits", "ids": {"$push": "$id"}, "n": {"$sum": 1}}},
+            {"$match": {"n": {"$gt": 1}}},
+        ])
+        async for d in dupes:
+            for number_id in d["ids"][1:]:
+                logger.warning("Duplicate phoneDigits %r (id=%s) suffixed", d["_id"], number_id)
+                await db.numbers.update_one({"id": number_id}, {"$set": {"phoneDigits": f"{d['_id']}#{number_id}"}})
+                count += 1
+    seen = set()
+    async for d in db.numbers.find({"phoneDigits": {"$type": "string"}}, {"_id": 0, "phoneDigits": 1}):
+        seen.add(d["phoneDigits"])
+    async for doc in db.numbers.find({"phoneDigits": {"$not": {"$type": "string"}}}, {"_id": 0, "id": 1, "phone": 1}).sort("createdAt", 1):
+        digits = extract_ru_digits(doc.get("phone", ""))
+        if digits in seen:
+            # keeps prefix search working while letting the unique index build
+            logger.warning("Duplicate phone %r (id=%s) kept with a suffixed phoneDigits", doc.get("phone"), doc["id"])
+            digits = f"{digits}#{doc['id']}"
+        seen.add(digits)
+        await db.numbers.update_one({"id": doc["id"]}, {"$set": {"phoneDigits": digits}})
+        count += 1
+    await db.numbers.create_index("phoneDigits", unique=True, partialFilterExpression={"phoneDigits": {"$type": "string"}})
+    return count
+
+# ---------------------
+# Name utils
+# ---------------------
+def name_key(raw: Optional[str]) -> str:
+    # NFKC + casefold + collapsed whitespace: "  Кафе   ПУШКИН " -> "кафе пушкин"
+    if not raw:
+        return ""
+    return " ".join(unicodedata.normalize("NFKC", raw).casefold().split())
+
+NAMED_COLLECTIONS = ("places", "operators", "categories")
+
+async def backfill_name_keys() -> Dict[str, int]:
+    """Give every named document a nameKey and put the unique index on it.
+
+    Pre-existing case-insensitive duplicates keep their name but get a nameKey suffixed with their id
+    (oldest one keeps the plain key), otherwise the unique index could not be built.
+    """
+    fixed: Dict[str, int] = {}
+    for coll_name in NAMED_COLLECTIONS:
+        coll = db[coll_name]
+        seen = set()
+        async for d in coll.find({"nameKey": {"$type": "string"}}, {"_id": 0, "nameKey": 1}):
+            seen.add(d["nameKey"])
+        count = 0
+        async for doc in coll.find({"nameKey": {"$exists": False}}, {"_id": 0, "id": 1, "name": 1}).sort("createdAt", 1):
+            key = name_key(doc.get("name"))
+            if key in seen:
+                logger.warning("Duplicate %s name %r (id=%s) kept with a suffixed nameKey", coll_name, doc.get("name"), doc["id"])
+                key = f"{key}#{doc['id']}"
+            seen.add(key)
+            await coll.update_one({"id": doc["id"]}, {"$set": {"nameKey": key}})
+            count += 1
+        await coll.create_index("nameKey", unique=True, partialFilterExpression={"nameKey": {"$type": "string"}})
+        fixed[coll_name] = count
+    return fixed
+
+# ---------------------
+# Suggest index
+# ---------------------
+SUGGEST_CACHE_SIZE = 512
+
+class PrefixIndex:
+    """Sorted (key, id) pairs; prefix lookups are two bisects instead of a collection scan."""
+
+    def __init__(self):
+        self.entries: List[tuple] = []
+        self.keys_by_id: Dict[str, List[str]] = {}
+
+    def clear(self):
+        self.entries = []
+        self.keys_by_id = {}
+
+    def load(self, items: Iterable[Tuple[str, List[str]]]):
+        """Replace the contents with (id, keys) items: one sort, where a put per item would be O(n^2)."""
+        self.keys_by_id = {item_id: sorted(set(k for k in keys if k)) for item_id, keys in items}
+        self.entries = sorted((k, item_id) for item_id, keys in self.keys_by_id.items() for k in keys)
+
+    def put(self, item_id: str, keys: List[str]):
+        self.remove(item_id)
+        keys = sorted(set(k for k in keys if k))
+        for k in keys:
+            bisect.insort(self.entries, (k, item_id))
+        self.keys_by_id[item_id] = keys
+
+    def remove(self, item_id: str):
+        for k in self.keys_by_id.pop(item_id, []):
+            i = bisect.bisect_left(self.entries, (k, item_id))
+            if i < len(self.entries) and self.entries[i] == (k, item_id):
+                del self.entries[i]
+
+    def prefix(self, p: str, limit: int) -> List[str]:
+        out: List[str] = []
+        i = bisect.bisect_left(self.entries, (p, ""))
+        while i < len(self.entries) and len(out) < limit:
+            k, item_id = self.entries[i]
+            if not k.startswith(p):
+                break
+            if item_id not in out:
+                out.append(item_id)
+            i += 1
+        return out
+
+class SuggestIndex:
+    """In-memory autocomplete over place names and phone digits, kept current by the write handlers and the event feed."""
+
+    def __init__(self, cache_size: int = SUGGEST_CACHE_SIZE):
+        self.places = PrefixIndex()
+        self.numbers = PrefixIndex()
+        self.place_docs: Dict[str, Dict[str, Any]] = {}
+        self.number_docs: Dict[str, Dict[str, Any]] = {}
+        self.cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self.cache_size = cache_size
+        self.loaded = False
+
+    async def load(self):
+        places = await db.places.find({}, {"_id": 0, "id": 1, "name": 1, "category": 1}).to_list(None)
+        numbers = await db.numbers.find({}, {"_id": 0, "id": 1, "phone": 1, "phoneDigits": 1, "operatorKey": 1}).to_list(None)
+        self.places.load((p["id"], self.place_keys(p)) for p in places)
+        self.numbers.load((n["id"], self.number_keys(n)) for n in numbers)
+        self.place_docs = {p["id"]: self.place_doc(p) for p in places}
+        self.number_docs = {n["id"]: self.number_doc(n) for n in numbers}
+        self.cache.clear()
+        self.loaded = True
+
+    @staticmethod
+    def place_keys(doc: Dict[str, Any]) -> List[str]:
+        # Index every word start so "пушк" finds "Кафе Пушкин"
+        words = name_key(doc.get("name")).split(" ")
+        return [" ".join(words[i:]) for i in range(len(words))]
+
+    @staticmethod
+    def place_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+        return {"type": "place", "id": doc["id"], "name": doc.get("name"), "category": doc.get("category")}
+
+    @staticmethod
+    def number_keys(doc: Dict[str, Any]) -> List[str]:
+        return [doc.get("phoneDigits") or extract_ru_digits(doc.get("phone", ""))]
+
+    @staticmethod
+    def number_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+        return {"type": "number", "id": doc["id"], "phone": doc.get("phone"), "operatorKey": doc.get("operatorKey")}
+
+    def put_place(self, doc: Dict[str, Any]):
+        self.places.put(doc["id"], self.place_keys(doc))
+        self.place_docs[doc["id"]] = self.place_doc(doc)
+        self.cache.clear()
+
+    def drop_place(self, place_id: str):
+        self.places.remove(place_id)
+        self.place_docs.pop(place_id, None)
+        self.cache.clear()
+
+    def put_number(self, doc: Dict[str, Any]):
+        self.numbers.put(doc["id"], self.number_keys(doc))
+        self.number_docs[doc["id"]] = self.number_doc(doc)
+        self.cache.clear()
+
+    def drop_number(self, number_id: str):
+        self.numbers.remove(number_id)
+        self.number_docs.pop(number_id, None)
+        self.cache.clear()
+
+    def apply(self, event: Dict[str, Any]):
+        """Follow a place or number change made by another worker, as an /events change event."""
+        kind, item_id, fields = event["kind"], event["id"], event.get("fields") or {}
+        if kind == "places":
+            if event["op"] == "delete":
+                self.drop_place(item_id)
+            elif "name" in fields or "category" in fields:
+                # an update event carries only the changed fields
+                self.put_place({**self.place_docs.get(item_id, {}), **fields, "id": item_id})
+        elif kind == "numbers":
+            if event["op"] == "delete":
+                self.drop_number(item_id)
+            elif "phone" in fields or "operatorKey" in fields:
+                self.put_number({**self.number_docs.get(item_id, {}), **fields, "id": item_id})
+
+    def suggest(self, q: str, limit: int) -> Dict[str, Any]:
+        q = q.strip()
+        digits = extract_ru_digits(q) if PHONE_ONLY_RE.match(q) else ""
+        key = name_key(q)
+        cache_key = (digits, key, limit)
+        hit = self.cache.get(cache_key)
+        if hit is not None:
+            self.cache.move_to_end(cache_key)
+            return hit
+        numbers = [self.number_docs[i] for i in self.numbers.prefix(digits, limit)] if digits else []
+        places = [self.place_docs[i] for i in self.places.prefix(key, limit)] if key else []
+        out = {"numbers": numbers, "places": places}
+        self.cache[cache_key] = out
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return out
+
+suggest_index = SuggestIndex()
+
+# ---------------------
+# Write generations & query cache
+# ---------------------
+# Every write bumps its collection's generation; cached reads key on the generations they depend on,
+# so a write makes older entries unreachable and they age out of the LRU. Generations are per worker: the
+# event feed bumps them again for every change it sees, which carries other workers' writes over too.
+generations: Dict[str, int] = {"numbers": 0, "places": 0, "usages": 0, "operators": 0, "categories": 0}
+
+def bump_generation(*names: str):
+    for name in names:
+        generations[name] += 1
+
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", "256"))
+QUERY_CACHE_TTL = float(os.environ.get("QUERY_CACHE_TTL", "30"))
+
+class ResponseCache:
+    """Bounded LRU of pre-serialised JSON bodies with a per-entry TTL."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, body = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key: tuple, body: bytes):
+        self.entries[key] = (time.monotonic() + self.ttl, body)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "bytes": sum(len(body) for _, body in self.entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+query_cache = ResponseCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
+
+class SingleFlight:
+    """Concurrent callers with the same key await one shared task instead of each querying Mongo."""
+
+    def __init__(self):
+        self.inflight: Dict[tuple, asyncio.Task] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: tuple, fn):
+        task = self.inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self.inflight[key] = task
+            task.add_done_callback(lambda _t: self.inflight.pop(key, None))
+        else:
+            self.shared += 1
+        # shield: a disconnecting caller must not cancel the query the others are waiting on
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"inflight": len(self.inflight), "leaders": self.leaders, "shared": self.shared}
+
+single_flight = SingleFlight()
+
+def dump_json(content: Any) -> bytes:
+    # Same encoding as JSONResponse.render, done once so the bytes can be cached
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def cached_json(body: bytes, hit: bool, request: Optional[Request] = None) -> Response:
+    headers = {"X-Cache": "HIT" if hit else "MISS"}
+    if request is not None:
+        # revalidated lists: clients (and the service worker) keep the body and ask with If-None-Match
+        etag = body_etag(body)
+        headers.update({"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"})
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# ---------------------
+# HTTP caching
+# ---------------------
+# Logos and icons carry a content hash; URLs with ?v=<hash> never change, so they are cached for a year
+MEDIA_IMMUTABLE = "public, max-age=31536000, immutable"
+
+def body_etag(body: bytes) -> str:
+    # content hash rather than generation numbers: generations are per worker, the body is not
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return any(t.strip().removeprefix("W/") == etag for t in header.split(","))
+
+def media_hash(content: bytes) -> str:
+    return hashlib.blake2b(content, digest_size=8).hexdigest()
+
+def media_version(media: Optional[Dict[str, Any]]) -> Optional[str]:
+    return media.get("hash") if media else None
+
+# base64 of a multi-megabyte image stalls every request on the worker; big payloads go to a thread
+MEDIA_OFFLOAD_BYTES = int(os.environ.get("MEDIA_OFFLOAD_BYTES", str(64 * 1024)))
+
+async def encode_media(content: bytes) -> str:
+    if len(content) < MEDIA_OFFLOAD_BYTES:
+        return base64.b64encode(content).decode('utf-8')
+    return await asyncio.to_thread(lambda: base64.b64encode(content).decode('utf-8'))
+
+async def decode_media(data: str) -> bytes:
+    if len(data) < MEDIA_OFFLOAD_BYTES:
+        return base64.b64decode(data)
+    return await asyncio.to_thread(base64.b64decode, data)
+
+async def media_response(request: Request, media: Dict[str, Any]) -> Response:
+    digest = media.get("hash")
+    headers = {"Cache-Control": MEDIA_IMMUTABLE if digest and request.query_params.get("v") == digest else "no-cache"}
+    if digest:
+        headers["ETag"] = f'"{digest}"'
+        if etag_matches(request, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+    data = await decode_media(media.get("data", ""))
+    return Response(content=data, media_type=media.get("contentType", "image/png"), headers=headers)
+
+async def ensure_media_hashes():
+    # one-off backfill for logos/icons stored before they carried a hash
+    for coll, field in (("places", "logo"), ("operators", "logo"), ("categories", "icon")):
+        query = {f"{field}.data": {"$exists": True}, f"{field}.hash": {"$exists": False}}
+        async for d in db[coll].find(query, {"_id": 1, f"{field}.data": 1}):
+            digest = media_hash(base64.b64decode(d[field]["data"]))
+            await db[coll].update_one({"_id": d["_id"]}, {"$set": {f"{field}.hash": digest}})
+
+# ---------------------
+# Facet counts
+# ---------------------
+# Filter-chip counts for list endpoints: one $facet aggregation per (filter, generation), cached as bytes
+def count_by(field: str) -> List[Dict[str, Any]]:
+    return [{"$group": {"_id": f"${field}", "n": {"$sum": 1}}}]
+
+def count_where(cond: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"$match": cond}, {"$count": "n"}]
+
+PLACE_FACETS = {
+    "category": count_by("category"),
+    "hasPromo": count_where({"$or": [{"promoCode": {"$nin": [None, ""]}}, {"promoUrl": {"$nin": [None, ""]}}]}),
+    "hasLogo": count_where({"logo": {"$ne": None}}),
+}
+NUMBER_FACETS = {"operatorKey": count_by("operatorKey")}
+
+async def load_facets(collection, match: Dict[str, Any], facets: Dict[str, List[Dict[str, Any]]], cache_key: tuple) -> bytes:
+    rows = await collection.aggregate([{"$match": match}, {"$facet": facets}]).to_list(1)
+    row = rows[0] if rows else {}
+    out: Dict[str, Any] = {}
+    for name, stages in facets.items():
+        buckets = row.get(name, [])
+        if "$count" in stages[-1]:
+            out[name] = buckets[0]["n"] if buckets else 0
+        else:
+            out[name] = {("" if b["_id"] is None else str(b["_id"])): b["n"] for b in buckets}
+    body = dump_json(out)
+    query_cache.put(cache_key, body)
+    return body
+
+async def facet_body(collection, match: Dict[str, Any], facets: Dict[str, List[Dict[str, Any]]], cache_key: tuple) -> bytes:
+    body = query_cache.get(cache_key)
+    if body is None:
+        body = await single_flight.do(cache_key, lambda: load_facets(collection, match, facets, cache_key))
+    return body
+
+def with_facets(items: bytes, facets: bytes) -> bytes:
+    return b'{"items":' + items + b',"facets":' + facets + b'}'
 
 # ---------------------
 # Root
@@ -149,6 +1005,186 @@ async def find_number_by_digits(digits: str) -> Optional[Dict[str, Any]]:
 async def root():
     return {"message": "FIRST API ready"}
 
+@api_router.post("/admin/backfill_name_keys")
+async def admin_backfill_name_keys(secret: Optional[str] = None):
+    expected = os.environ.get("ADMIN_FIX_SECRET")
+    if expected and secret != expected:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    fixed = await backfill_name_keys()
+    bump_generation(*NAMED_COLLECTIONS)
+    return {"ok": True, **fixed}
+
+@api_router.post("/admin/reconcile_usage")
+async def admin_reconcile_usage(secret: Optional[str] = None):
+    expected = os.environ.get("ADMIN_FIX_SECRET")
+    if expected and secret != expected:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    fixed = await reconcile_usage()
+    return {"ok": True, **fixed}
+
+@api_router.post("/admin/compact_usages")
+async def admin_compact_usages(secret: Optional[str] = None):
+    expected = os.environ.get("ADMIN_FIX_SECRET")
+    if expected and secret != expected:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    result = await compact_usages()
+    return {"ok": True, **result}
+
+def memory_report() -> Dict[str, Any]:
+    traced = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+    return {
+        "process": process_memory(),
+        "tracemalloc": {
+            "tracing": tracemalloc.is_tracing(), "currentBytes": traced[0], "peakBytes": traced[1],
+            "sampleRate": memory_tracker.rate,
+            "snapshots": [{"id": i, "takenAt": t} for i, (t, _) in memory_tracker.snapshots.items()],
+        },
+        "routes": memory_tracker.routes,
+        "caches": {
+            "query": {k: v for k, v in query_cache.stats().items() if k in ("size", "maxsize", "bytes")},
+            "suggest": {
+                "places": len(suggest_index.place_docs), "numbers": len(suggest_index.number_docs),
+                "cached": len(suggest_index.cache), "maxsize": suggest_index.cache_size,
+            },
+            "singleflight": {"inflight": len(single_flight.inflight)},
+            "events": {"clients": len(event_hub.clients), "queued": sum(q.qsize() for q in event_hub.clients)},
+        },
+    }
+
+@api_router.get("/admin/memory")
+async def admin_memory(secret: Optional[str] = None):
+    expected = os.environ.get("ADMIN_FIX_SECRET")
+    if expected and secret != expected:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return memory_report()
+
+@api_router.post("/admin/memory/start")
+async def admin_memory_start(secret: Optional[str] = None, frames: int = 10, rate: float = 0.1):
+    expected = os.environ.get("ADMIN_FIX_SECRET")
+    if expected and secret != expected:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if not expected:
+        # tracing slows every allocation and the report exposes source lines: never start it on an open admin API
+        raise HTTPException(status_code=403, detail="tracemalloc requires ADMIN_FIX_SECRET to be configured")
+    memory_tracker.start(max(1, min(frames, 50)), rate)
+    snap_id = await asyncio.to_thread(memory_tracker.snapshot)
+    return {"ok": True, "baseline": snap_id, **memory_report()["tracemalloc"]}
+
+@api_router.post("/admin/memory/snapshot")
+async def admin_memory_snapshot(secret: Optional[str] = None):
+    expected = os.environ.get("ADMIN_FIX_SECRET")
+    if expected and secret != expected:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if not tracemalloc.is_tracing():
+        raise HTTPException(status_code=409, detail="tracemalloc is not running")
+    return {"ok": True, "id": await asyncio.to_thread(memory_tracker.snapshot)}
+
+@api_router.get("/admin/memory/diff")
+async def admin_memory_diff(secret: Optional[str] = None, base: Optional[int] = None, target: Optional[int] = None, limit: int = 25):
+    expected = os.environ.get("ADMIN_FIX_SECRET")
+    if expected and secret != expected:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    ids = list(memory_tracker.snapshots)
+    base = base if base is not None else (ids[0] if ids else None)
+    target = target if target is not None else (ids[-1] if ids else None)
+    if base not in memory_tracker.snapshots or target not in memory_tracker.snapshots:
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    top = await asyncio.to_thread(memory_tracker.diff, base, target, max(1, min(limit, 200)))
+    return {"base": base, "target": target, "top": top}
+
+@api_router.post("/admin/memory/stop")
+async def admin_memory_stop(secret: Optional[str] = None):
+    expected = os.environ.get("ADMIN_FIX_SECRET")
+    if expected and secret != expected:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    memory_tracker.stop()
+    return {"ok": True}
+
+@api_router.post("/admin/profiling")
+async def admin_profiling(secret: Optional[str] = None, rate: float = 0.0, route: str = "/api", seconds: float = 300):
+    expected = os.environ.get("ADMIN_FIX_SECRET")
+    if expected and secret != expected:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if rate > 0 and not expected:
+        # sampled profiles are readable through /admin/profiles: never collect them on an open admin API
+        raise HTTPException(status_code=403, detail="Profiling requires ADMIN_FIX_SECRET to be configured")
+    profile_sampler.configure(rate, route, min(seconds, 3600))
+    return {"ok": True, **profile_sampler.state()}
+
+@api_router.get("/admin/profiles")
+async def admin_list_profiles(secret: Optional[str] = None):
+    expected = os.environ.get("ADMIN_FIX_SECRET")
+    if expected and secret != expected:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    files = sorted(PROFILE_DIR.iterdir(), key=lambda f: f.stat().st_mtime, reverse=True) if PROFILE_DIR.is_dir() else []
+    return {"sampler": profile_sampler.state(), "profiles": [{"name": f.name, "bytes": f.stat().st_size} for f in files]}
+
+@api_router.get("/admin/profiles/{name}")
+async def admin_get_profile(name: str, secret: Optional[str] = None):
+    expected = os.environ.get("ADMIN_FIX_SECRET")
+    if expected and secret != expected:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    path = PROFILE_DIR / name
+    if Path(name).name != name or not path.is_file():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    data = await asyncio.to_thread(path.read_bytes)
+    media_type = "application/json" if name.endswith(".json") else "application/octet-stream"
+    return Response(content=data, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{name}"'})
+
+@api_router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(secret: Optional[str] = None):
+    # scrape with `params: {secret: [...]}` in the Prometheus job when ADMIN_FIX_SECRET is set
+    expected = os.environ.get("ADMIN_FIX_SECRET")
+    if expected and secret != expected:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    lines: List[str] = []
+    for metric in (http_requests, http_in_flight, http_latency, http_size, mongo_latency, mongo_failures, loop_lag, loop_stalls):
+        lines.extend(metric.render())
+    query = query_cache.stats()
+    flights = single_flight.stats()
+    hub = event_hub.stats()
+    loop = loop_watchdog.stats()
+    lines += [
+        "# HELP first_cache_requests_total Response cache lookups by cache and result.",
+        "# TYPE first_cache_requests_total counter",
+        f'first_cache_requests_total{{cache="query",result="hit"}} {query["hits"]}',
+        f'first_cache_requests_total{{cache="query",result="miss"}} {query["misses"]}',
+        "# HELP first_cache_entries Entries held by each in-process cache.",
+        "# TYPE first_cache_entries gauge",
+        f'first_cache_entries{{cache="query"}} {query["size"]}',
+        f'first_cache_entries{{cache="suggest"}} {len(suggest_index.cache)}',
+        "# HELP first_cache_bytes Bytes held by the response cache.",
+        "# TYPE first_cache_bytes gauge",
+        f'first_cache_bytes{{cache="query"}} {query["bytes"]}',
+        "# HELP first_cache_evictions_total Response cache evictions and expirations.",
+        "# TYPE first_cache_evictions_total counter",
+        f'first_cache_evictions_total{{cache="query",reason="lru"}} {query["evictions"]}',
+        f'first_cache_evictions_total{{cache="query",reason="ttl"}} {query["expirations"]}',
+        "# HELP first_singleflight_calls_total Coalesced loads by role.",
+        "# TYPE first_singleflight_calls_total counter",
+        f'first_singleflight_calls_total{{role="leader"}} {flights["leaders"]}',
+        f'first_singleflight_calls_total{{role="shared"}} {flights["shared"]}',
+        "# HELP first_singleflight_inflight Loads currently shared by concurrent requests.",
+        "# TYPE first_singleflight_inflight gauge",
+        f"first_singleflight_inflight {flights['inflight']}",
+        "# HELP first_event_loop_lag_max_seconds Largest event loop lag seen since start.",
+        "# TYPE first_event_loop_lag_max_seconds gauge",
+        f"first_event_loop_lag_max_seconds {loop['maxLagMs'] / 1000}",
+        "# HELP first_event_clients Connected /api/events clients.",
+        "# TYPE first_event_clients gauge",
+        f"first_event_clients {hub['clients']}",
+        "# HELP first_event_overflows_total Event clients reset to resync after falling behind.",
+        "# TYPE first_event_overflows_total counter",
+        f"first_event_overflows_total {hub['overflows']}",
+        "# HELP first_events_published_total Change events published to /api/events clients.",
+        "# TYPE first_events_published_total counter",
+        f"first_events_published_total {hub['published']}",
+        "# HELP first_event_feed_mode Source of /api/events: change_stream or polling.",
+        "# TYPE first_event_feed_mode gauge",
+        f'first_event_feed_mode{{mode="{hub["mode"]}"}} 1',
+    ]
+    return Response(content="\n".join(lines) + "\n", media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @api_router.post("/admin/fix_timestamps")
 async def admin_fix_timestamps(secret: Optional[str] = None):
     expected = os.environ.get("ADMIN_FIX_SECRET")
@@ -189,13 +1225,57 @@ async def admin_fix_timestamps(secret: Optional[str] = None):
         new_dt = d + shift
         await db.places.update_one({"id": doc["id"]}, {"$set": {"createdAt": new_dt}})
         fixed_places += 1
+    bump_generation("numbers", "places")
     return {"ok": True, "numbers": fixed_numbers, "places": fixed_places}
 
 # ---------------------
 # Numbers
 # ---------------------
+async def rebuild_usage_summaries(number_ids: Optional[List[str]] = None) -> int:
+    """Recompute numbers.usedCount from usages, for every number or just number_ids.
+
+    lastEventAt only moves forward: un-marked rows are deleted, so usages alone cannot lower it correctly.
+    """
+    match: Dict[str, Any] = {} if number_ids is None else {"numberId": {"$in": number_ids}}
+    summaries = {d["_id"]: d async for d in db.usages.aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": "$numberId",
+            "usedCount": {"$sum": {"$cond": ["$used", 1, 0]}},
+            "lastEventAt": {"$max": "$updatedAt"},
+        }},
+    ])}
+    if number_ids is None:
+        empty: Dict[str, Any] = {"id": {"$nin": list(summaries)}}
+    else:
+        empty = {"id": {"$in": [i for i in number_ids if i not in summaries]}}
+    await db.numbers.update_many(empty, {"$set": {"usedCount": 0}})
+    if summaries:
+        await db.numbers.bulk_write([
+            UpdateOne({"id": nid}, {"$set": {"usedCount": d["usedCount"]}, "$max": {"lastEventAt": d["lastEventAt"]}})
+            for nid, d in summaries.items()
+        ], ordered=False)
+    return len(summaries)
+
+async def reconcile_usage() -> Dict[str, int]:
+    numbers = await rebuild_usage_summaries()
+    places = await rebuild_place_usage_counts()
+    bump_generation("numbers", "places", "usages")
+    return {"numbers": numbers, "places": places}
+
+USAGE_RECONCILE_INTERVAL = float(os.environ.get("USAGE_RECONCILE_INTERVAL", "0"))
+
+async def usage_reconcile_loop():
+    while True:
+        await asyncio.sleep(USAGE_RECONCILE_INTERVAL)
+        try:
+            fixed = await reconcile_usage()
+            logger.info("Usage counters reconciled: %s", fixed)
+        except Exception:
+            logger.exception("Usage counter reconciliation failed")
+
 @api_router.get("/numbers", response_model=List[NumberModel])
-async def list_numbers(q: Optional[str] = None):
+async def list_numbers(request: Request, q: Optional[str] = None, facets: bool = False):
     query: Dict[str, Any] = {}
     if q:
         q = q.strip()
@@ -205,8 +1285,16 @@ async def list_numbers(q: Optional[str] = None):
                 query = {"phoneDigits": {"$regex": f"^{re.escape(d)}"}}
         else:
             query = {"phone": {"$regex": re.escape(q), "$options": "i"}}
-    items = await db.numbers.find(query).sort("createdAt", -1).to_list(1000)
-    return [NumberModel(**i) for i in items]
+    if not facets:
+        items = await db.numbers.find(query, {"_id": 0}).sort("createdAt", -1).to_list(1000)
+        return cached_json(dump_json([NumberModel(**i).model_dump() for i in items]), hit=False, request=request)
+    # {"items", "facets"}: the page and its operator counts in one response instead of a client-side scan
+    facet_key = ("number_facets", (q or "").lower(), generations["numbers"])
+    items, counts = await asyncio.gather(
+        db.numbers.find(query, {"_id": 0}).sort("createdAt", -1).to_list(1000),
+        facet_body(db.numbers, query, NUMBER_FACETS, facet_key),
+    )
+    return cached_json(with_facets(dump_json([NumberModel(**i).model_dump() for i in items]), counts), hit=False, request=request)
 
 @api_router.post("/numbers", response_model=NumberModel)
 async def create_number(payload: NumberCreate):
@@ -215,13 +1303,17 @@ async def create_number(payload: NumberCreate):
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid phone format. Expect +7 777 777 77 77")
     digits = extract_ru_digits(formatted)
-    existing = await find_number_by_digits(digits)
-    if existing:
-        raise HTTPException(status_code=409, detail="Phone already exists")
     number = NumberModel(phone=formatted, operatorKey=payload.operatorKey)
-    doc = number.model_dump()
+    # a never-used number has no lastEventAt at all; missing sorts like null, and $max needs no null to compare
+    doc = number.model_dump(exclude_none=True)
     doc["phoneDigits"] = digits
-    await db.numbers.insert_one(doc)
+    doc["rev"] = next_rev()
+    try:
+        await db.numbers.insert_one(doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Phone already exists")
+    bump_generation("numbers")
+    suggest_index.put_number(doc)
     return number
 
 @api_router.get("/numbers/{number_id}", response_model=NumberModel)
@@ -233,32 +1325,58 @@ async def get_number(number_id: str):
 
 @api_router.put("/numbers/{number_id}", response_model=NumberModel)
 async def update_number(number_id: str, payload: NumberCreate):
-    cur = await db.numbers.find_one({"id": number_id})
-    if not cur:
-        raise HTTPException(status_code=404, detail="Number not found")
     try:
         formatted = format_ru_phone_strict(payload.phone)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid phone format. Expect +7 777 777 77 77")
     digits = extract_ru_digits(formatted)
-    existing = await find_number_by_digits(digits)
-    if existing and existing.get("id") != number_id:
+    update_doc = {"$set": {"phone": formatted, "phoneDigits": digits, "operatorKey": payload.operatorKey, "rev": next_rev()}}
+    try:
+        updated = await db.numbers.find_one_and_update(
+            {"id": number_id}, update_doc, projection={"_id": 0}, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
         raise HTTPException(status_code=409, detail="Phone already exists")
-    update_doc = {"$set": {"phone": formatted, "phoneDigits": digits, "operatorKey": payload.operatorKey}}
-    await db.numbers.update_one({"id": number_id}, update_doc)
-    updated = await db.numbers.find_one({"id": number_id})
+    if not updated:
+        raise HTTPException(status_code=404, detail="Number not found")
+    bump_generation("numbers")
+    suggest_index.put_number(updated)
     return NumberModel(**updated)
 
 @api_router.delete("/numbers/{number_id}")
 async def delete_number(number_id: str):
-    await db.usages.delete_many({"numberId": number_id})
-    res = await db.numbers.delete_one({"id": number_id})
+    # Two round trips, as in delete_place: the number delete (deleted_count is the existence check) goes out
+    # with the read of its usage rows, then exactly those rows go with their places' counters and the tombstones
+    res, usages = await asyncio.gather(
+        db.numbers.delete_one({"id": number_id}),
+        db.usages.find({"numberId": number_id}, {"_id": 1, "id": 1, "placeId": 1, "used": 1}).to_list(None),
+    )
     if res.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Number not found")
+    used_place_ids = [u["placeId"] for u in usages if u.get("used")]
+    rev = next_rev()
+    writes = [
+        db.usages.delete_many({"_id": {"$in": [u["_id"] for u in usages]}}),
+        record_tombstones("numbers", [number_id], rev),
+        record_tombstones("usages", [u["id"] for u in usages if u.get("id")], rev),
+    ]
+    if used_place_ids:
+        writes.append(db.places.update_many({"id": {"$in": used_place_ids}}, {"$inc": {"usageCount": -1}, "$set": {"rev": rev}}))
+    removed = (await asyncio.gather(*writes))[0]
+    if removed.deleted_count != len(usages):
+        # some rows were un-marked (and counted down) in between: recount those places instead
+        await rebuild_place_usage_counts(used_place_ids)
+    bump_generation("numbers", "usages")
+    suggest_index.drop_number(number_id)
     return {"ok": True}
 
 @api_router.get("/numbers/{number_id}/usage")
 async def number_usage(number_id: str):
+    key = ("number_usage", number_id, generations["numbers"], generations["places"], generations["usages"])
+    body = await single_flight.do(key, lambda: load_number_usage(number_id))
+    return Response(content=body, media_type="application/json")
+
+async def load_number_usage(number_id: str) -> bytes:
     doc = await db.numbers.find_one({"id": number_id})
     if not doc:
         raise HTTPException(status_code=404, detail="Number not found")
@@ -273,6 +1391,7 @@ async def number_usage(number_id: str):
       if p["id"] in used_place_ids:
         base = {k: v for k, v in p.items() if k not in ["logo", "_id"]}
         base["hasLogo"] = bool(p.get("logo"))
+        base["logoHash"] = media_version(p.get("logo"))
         ua = usage_map.get(p["id"])  # datetime
         base["usedAt"] = ua.isoformat() if ua else None
         used.append(base)
@@ -281,19 +1400,102 @@ async def number_usage(number_id: str):
       if p["id"] in unused_place_ids:
         base = {k: v for k, v in p.items() if k not in ["logo", "_id"]}
         base["hasLogo"] = bool(p.get("logo"))
+        base["logoHash"] = media_version(p.get("logo"))
         unused.append(base)
-    # Compute last event time = latest usage.updatedAt (if any)
-    last_event_dt = None
+    # Last event time = latest usage.updatedAt; un-marks delete their row, so start from the number's own lastEventAt
+    last_event_dt = ensure_utc(doc.get("lastEventAt"))
     for u in usage_list:
         dt = ensure_utc(u.get("updatedAt"))
         if dt and (last_event_dt is None or dt > last_event_dt):
             last_event_dt = dt
     last_event = last_event_dt.isoformat() if last_event_dt else None
-    return {"used": used, "unused": unused, "lastEventAt": last_event}
+    return dump_json({"used": used, "unused": unused, "lastEventAt": last_event})
+
+RECOMMEND_WEIGHTS = {"popularity": 1.0, "promo": 1.5, "category": 1.0}
+RECOMMEND_CANDIDATES = 200
+
+@api_router.get("/numbers/{number_id}/recommendations")
+async def number_recommendations(number_id: str, limit: int = 10):
+    limit = max(1, min(limit, 50))
+    doc, used_ids = await asyncio.gather(
+        db.numbers.find_one({"id": number_id}, {"_id": 1}),
+        db.usages.distinct("placeId", {"numberId": number_id, "used": True}),
+    )
+    if not doc:
+        raise HTTPException(status_code=404, detail="Number not found")
+    # Category affinity: share of this number's used places per category
+    affinity: Dict[str, float] = {}
+    if used_ids:
+        async for p in db.places.find({"id": {"$in": used_ids}}, {"_id": 0, "category": 1}):
+            affinity[p.get("category")] = affinity.get(p.get("category"), 0) + 1 / len(used_ids)
+    top_categories = sorted(affinity, key=affinity.get, reverse=True)[:3]
+
+    # Candidates come off the usageCount-ordered indexes instead of joining every place with usages
+    projection = {"_id": 0, "logo.data": 0}
+    popular_sort = PLACE_SORTS["popular"]
+    unused = {"id": {"$nin": used_ids}}
+    has_promo = {"$or": [{"promoCode": {"$nin": [None, ""]}}, {"promoUrl": {"$nin": [None, ""]}}]}
+    pools = await asyncio.gather(
+        db.places.find(unused, projection).sort(popular_sort).limit(RECOMMEND_CANDIDATES).to_list(RECOMMEND_CANDIDATES),
+        db.places.find({**unused, **has_promo}, projection).sort(popular_sort).limit(RECOMMEND_CANDIDATES).to_list(RECOMMEND_CANDIDATES),
+        db.places.find({**unused, "category": {"$in": top_categories}}, projection).sort(popular_sort).limit(RECOMMEND_CANDIDATES).to_list(RECOMMEND_CANDIDATES),
+    )
+    candidates = {p["id"]: p for pool in pools for p in pool}
+    max_usage = max([p.get("usageCount", 0) for p in candidates.values()] + [1])
+
+    ranked = []
+    for p in candidates.values():
+        out = strip_place(p)
+        score = (
+            RECOMMEND_WEIGHTS["popularity"] * p.get("usageCount", 0) / max_usage
+            + RECOMMEND_WEIGHTS["promo"] * out["hasPromo"]
+            + RECOMMEND_WEIGHTS["category"] * affinity.get(p.get("category"), 0)
+        )
+        out["score"] = round(score, 4)
+        ranked.append(out)
+    ranked.sort(key=lambda p: (-p["score"], p.get("nameKey") or ""))
+    return {"places": ranked[:limit]}
 
 # ---------------------
 # Places
 # ---------------------
+# Every mode is served by an index (see ensure_place_sort_indexes); "old" walks the "new" index backwards
+PLACE_SORTS = {
+    "new": [("createdAt", -1)],
+    "old": [("createdAt", 1)],
+    "popular": [("usageCount", -1), ("createdAt", -1)],
+    # id only gives the sort a key pattern of its own: the unique nameKey index is partial, so an unfiltered
+    # listing cannot use it and would sort in memory
+    "name": [("nameKey", 1), ("id", 1)],
+    "category": [("category", 1), ("nameKey", 1)],
+}
+
+async def ensure_place_sort_indexes():
+    for mode, spec in PLACE_SORTS.items():
+        if mode == "old":
+            continue
+        await db.places.create_index(spec)
+        if spec[0][0] != "category":
+            # filtered listings: equality on category, then the sort keys
+            await db.places.create_index([("category", 1)] + spec)
+    await db.numbers.create_index([("createdAt", -1)])
+
+async def rebuild_place_usage_counts(place_ids: Optional[List[str]] = None) -> int:
+    """Recompute places.usageCount (the "popular" sort key) from the usages collection, for every place or just place_ids."""
+    match: Dict[str, Any] = {"used": True} if place_ids is None else {"used": True, "placeId": {"$in": place_ids}}
+    counts = {d["_id"]: d["count"] async for d in db.usages.aggregate([
+        {"$match": match},
+        {"$group": {"_id": "$placeId", "count": {"$sum": 1}}},
+    ])}
+    if place_ids is None:
+        empty: Dict[str, Any] = {"id": {"$nin": list(counts)}}
+    else:
+        empty = {"id": {"$in": [i for i in place_ids if i not in counts]}}
+    await db.places.update_many(empty, {"$set": {"usageCount": 0}})
+    if counts:
+        await db.places.bulk_write([UpdateOne({"id": pid}, {"$set": {"usageCount": c}}) for pid, c in counts.items()], ordered=False)
+    return len(counts)
+
 @api_router.get("/places/{place_id}/usage")
 async def place_usage(place_id: str):
     cur = await db.places.find_one({"id": place_id})
@@ -312,38 +1514,46 @@ async def place_usage(place_id: str):
     return {"used": used, "unused": unused}
 
 @api_router.get("/places")
-async def list_places(q: Optional[str] = None, category: Optional[str] = None, sort: Optional[str] = None):
+async def list_places(request: Request, q: Optional[str] = None, category: Optional[str] = None, sort: Optional[str] = None, facets: bool = False):
+    # one stripped q for the cache keys and the queries alike, so " кафе" cannot be served "кафе"'s entry
+    q = (q or "").strip()
+    sort_mode = "old" if sort == "asc" else (sort if sort in PLACE_SORTS else "new")
+    cache_key = ("places", q.lower(), category or "", sort_mode, generations["places"], generations["usages"])
+    body = query_cache.get(cache_key)
+    hit = body is not None
+    if not hit:
+        body = await single_flight.do(cache_key, lambda: load_places(q, category, sort_mode, cache_key))
+    if facets:
+        # counts ignore the category filter so every category chip keeps showing its total for the search
+        match = {"name": {"$regex": re.escape(q), "$options": "i"}} if q else {}
+        facet_key = ("place_facets", q.lower(), generations["places"])
+        body = with_facets(body, await facet_body(db.places, match, PLACE_FACETS, facet_key))
+    return cached_json(body, hit, request)
+
+async def load_places(q: Optional[str], category: Optional[str], sort_mode: str, cache_key: tuple) -> bytes:
     query: Dict[str, Any] = {}
     if q:
         query["name"] = {"$regex": re.escape(q), "$options": "i"}
     if category:
         query["category"] = category
 
-    items = await db.places.find(query).to_list(5000)
-
-    if sort == "old" or sort == "asc":
-        items.sort(key=lambda p: p.get("createdAt", datetime.now(timezone.utc)))
-    elif sort == "popular":
-        agg = db.usages.aggregate([
-            {"$match": {"used": True}},
-            {"$group": {"_id": "$placeId", "count": {"$sum": 1}}}
-        ])
-        counts = {doc["_id"]: doc["count"] async for doc in agg}
-        items.sort(key=lambda p: (counts.get(p["id"], 0), p.get("createdAt", datetime.now(timezone.utc))), reverse=True)
-    else:
-        items.sort(key=lambda p: p.get("createdAt", datetime.now(timezone.utc)), reverse=True)
+    # Sorted by Mongo on the matching (category-prefixed) index; logo bytes never leave the server
+    items = await db.places.find(query, {"_id": 0, "logo.data": 0}).sort(PLACE_SORTS[sort_mode]).to_list(5000)
 
     def strip_logo(p: Dict[str, Any]):
         p2 = dict(p)
         p2.pop("_id", None)
         if "logo" in p2:
             p2["hasLogo"] = bool(p2["logo"])
+            p2["logoHash"] = media_version(p2["logo"])
             p2.pop("logo", None)
         else:
             p2["hasLogo"] = False
         p2["hasPromo"] = bool(p2.get("promoCode") or p2.get("promoUrl"))
         return p2
-    return [strip_logo(p) for p in items]
+    body = dump_json([strip_logo(p) for p in items])
+    query_cache.put(cache_key, body)
+    return body
 
 @api_router.post("/places")
 async def create_place(
@@ -357,9 +1567,6 @@ async def create_place(
     name = name.strip()
     if not name:
         raise HTTPException(status_code=400, detail="Name required")
-    exist = await db.places.find_one({"name": {"$regex": f"^{re.escape(name)}$", "$options": "i"}})
-    if exist:
-        raise HTTPException(status_code=409, detail="Place already exists")
     doc = PlaceModel(
         name=name, 
         category=category, 
@@ -367,46 +1574,55 @@ async def create_place(
         promoUrl=(promoUrl or None),
         comment=(comment or None)
     ).model_dump()
+    doc["nameKey"] = name_key(name)
     if logo is not None:
         content = await logo.read()
         if len(content) > 2 * 1024 * 1024:
             raise HTTPException(status_code=413, detail="Logo too large (max 2MB)")
         doc["logo"] = {
             "contentType": logo.content_type or "image/png",
-            "data": base64.b64encode(content).decode('utf-8')
+            "data": await encode_media(content),
+            "hash": media_hash(content),
         }
+    doc["rev"] = next_rev()
     # Copy BEFORE insert to avoid in-place _id injection by Mongo driver
     resp_base = dict(doc)
-    await db.places.insert_one(doc)
+    try:
+        await db.places.insert_one(doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Place already exists")
+    bump_generation("places")
+    suggest_index.put_place(doc)
     resp = dict(resp_base)
     resp.pop("_id", None)
     resp.pop("logo", None)
     resp["hasLogo"] = "logo" in doc and bool(doc.get("logo"))
+    resp["logoHash"] = media_version(doc.get("logo"))
     resp["hasPromo"] = bool(doc.get("promoCode") or doc.get("promoUrl"))
     return resp
 
 @api_router.get("/places/{place_id}")
 async def get_place(place_id: str):
-    doc = await db.places.find_one({"id": place_id})
+    doc = await db.places.find_one({"id": place_id}, {"_id": 0, "logo.data": 0})
     if not doc:
         raise HTTPException(status_code=404, detail="Place not found")
     resp = dict(doc)
     resp.pop("_id", None)
     resp.pop("logo", None)
     resp["hasLogo"] = "logo" in doc and bool(doc["logo"])
+    resp["logoHash"] = media_version(doc.get("logo"))
     resp["hasPromo"] = bool(doc.get("promoCode") or doc.get("promoUrl"))
     return resp
 
 @api_router.get("/places/{place_id}/logo")
-async def get_place_logo(place_id: str):
-    doc = await db.places.find_one({"id": place_id})
-    if not doc:
+async def get_place_logo(place_id: str, request: Request):
+    doc = await db.places.find_one({"id": place_id}, {"_id": 0, "logo": 1})
+    if doc is None:
         raise HTTPException(status_code=404, detail="Place not found")
     logo = doc.get("logo")
     if not logo:
         raise HTTPException(status_code=404, detail="Logo not set")
-    data = base64.b64decode(logo.get("data", ""))
-    return Response(content=data, media_type=logo.get("contentType", "image/png"))
+    return await media_response(request, logo)
 
 @api_router.put("/places/{place_id}")
 async def update_place(
@@ -419,18 +1635,13 @@ async def update_place(
     logo: Optional[UploadFile] = File(None),
     removeLogo: Optional[bool] = Form(False)
 ):
-    cur = await db.places.find_one({"id": place_id})
-    if not cur:
-        raise HTTPException(status_code=404, detail="Place not found")
     update: Dict[str, Any] = {}
     if name is not None:
         n = name.strip()
         if not n:
             raise HTTPException(status_code=400, detail="Name required")
-        dup = await db.places.find_one({"name": {"$regex": f"^{re.escape(n)}$", "$options": "i"}, "id": {"$ne": place_id}})
-        if dup:
-            raise HTTPException(status_code=409, detail="Place already exists")
         update["name"] = n
+        update["nameKey"] = name_key(n)
     if category is not None:
         update["category"] = category
     if promoCode is not None:
@@ -446,7 +1657,8 @@ async def update_place(
             raise HTTPException(status_code=413, detail="Logo too large (max 2MB)")
         logo_doc = {
             "contentType": logo.content_type or "image/png",
-            "data": base64.b64encode(content).decode('utf-8')
+            "data": await encode_media(content),
+            "hash": media_hash(content),
         }
     set_obj: Dict[str, Any] = {}
     unset_obj: Dict[str, Any] = {}
@@ -462,30 +1674,55 @@ async def update_place(
     if unset_obj:
         update_cmd["$unset"] = unset_obj
     if not update_cmd:
+        if not await db.places.find_one({"id": place_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Place not found")
         return JSONResponse({"updated": False})
-    res = await db.places.update_one({"id": place_id}, update_cmd)
-    if res.matched_count == 0:
+    update_cmd.setdefault("$set", {})["rev"] = next_rev()
+    try:
+        doc = await db.places.find_one_and_update(
+            {"id": place_id}, update_cmd, projection={"_id": 0, "logo.data": 0}, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Place already exists")
+    if not doc:
         raise HTTPException(status_code=404, detail="Place not found")
-    doc = await db.places.find_one({"id": place_id})
+    bump_generation("places")
+    suggest_index.put_place(doc)
     resp = dict(doc)
     resp.pop("_id", None)
     resp.pop("logo", None)
     resp["hasLogo"] = "logo" in doc and bool(doc["logo"])
+    resp["logoHash"] = media_version(doc.get("logo"))
     resp["hasPromo"] = bool(doc.get("promoCode") or doc.get("promoUrl"))
     return resp
 
 @api_router.delete("/places/{place_id}")
 async def delete_place(place_id: str):
-    # Check if place exists
-    place = await db.places.find_one({"id": place_id})
-    if not place:
+    # Delete the place (deleted_count doubles as the existence check) while its usage rows are read.
+    # Exactly those rows are then deleted and taken off their numbers' counters, as delete_number does for
+    # places; a row set_usage writes after the read finds the place gone and takes itself back out.
+    # A lastEventAt that came from this place is left for the reconcile job
+    res, usages = await asyncio.gather(
+        db.places.delete_one({"id": place_id}),
+        db.usages.find({"placeId": place_id}, {"_id": 1, "id": 1, "numberId": 1, "used": 1}).to_list(None),
+    )
+    if res.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Place not found")
-    
-    # Delete the place
-    await db.places.delete_one({"id": place_id})
-    
-    # Also delete all usage records for this place
-    await db.usages.delete_many({"placeId": place_id})
+    used_number_ids = list({u["numberId"] for u in usages if u.get("used")})
+    rev = next_rev()
+    writes = [
+        db.usages.delete_many({"_id": {"$in": [u["_id"] for u in usages]}}),
+        record_tombstones("places", [place_id], rev),
+        record_tombstones("usages", [u["id"] for u in usages if u.get("id")], rev),
+    ]
+    if used_number_ids:
+        writes.append(db.numbers.update_many({"id": {"$in": used_number_ids}}, {"$inc": {"usedCount": -1}, "$set": {"rev": rev}}))
+    removed = (await asyncio.gather(*writes))[0]
+    if removed.deleted_count != len(usages):
+        # some rows were un-marked (and counted down) in between: recount those numbers instead
+        await rebuild_usage_summaries(used_number_ids)
+    bump_generation("places", "usages", "numbers")
+    suggest_index.drop_place(place_id)
     
     return {"ok": True, "message": "Place deleted successfully"}
 
@@ -496,51 +1733,390 @@ async def delete_place(place_id: str):
 # ---------------------
 @api_router.post("/usage")
 async def set_usage(payload: UsageSet):
-    num = await db.numbers.find_one({"id": payload.numberId})
-    plc = await db.places.find_one({"id": payload.placeId})
+    # The pair lookups go out with the usage write: one round trip of latency, then one for the counters,
+    # the event and the tombstone. Only a write for a pair that does not exist costs a third, to undo it
+    now = datetime.now(timezone.utc)
+    rev = next_rev()
+    pair = {"numberId": payload.numberId, "placeId": payload.placeId}
+    row_id = str(uuid.uuid4())
+    if payload.used:
+        write = db.usages.find_one_and_update(
+            pair,
+            {"$set": {"used": True, "updatedAt": now, "rev": rev}, "$setOnInsert": {"id": row_id}},
+            upsert=True,
+            projection={"_id": 0, "id": 1, "used": 1},
+            return_document=ReturnDocument.BEFORE,
+        )
+    else:
+        # Only positive usage is stored: un-marking removes the row (the event time lives on in numbers.lastEventAt)
+        write = db.usages.find_one_and_delete(pair, projection={"_id": 0, "id": 1, "used": 1})
+    num, plc, prev = await asyncio.gather(
+        db.numbers.find_one({"id": payload.numberId}, {"_id": 1, "operatorKey": 1}),
+        db.places.find_one({"id": payload.placeId}, {"_id": 1, "category": 1}),
+        write,
+    )
+    if prev and prev.get("id"):
+        row_id = prev["id"]
+    # The BEFORE image is atomic per pair, so concurrent toggles still net out on the counters
+    delta = 0
+    if bool(prev and prev.get("used")) != payload.used:
+        delta = 1 if payload.used else -1
     if not num or not plc:
+        # No such pair: a row this call marked goes back out uncounted; a stray row it removed is counted down
+        if delta > 0:
+            await asyncio.gather(db.usages.delete_one({"id": row_id}), record_tombstones("usages", [row_id], next_rev()))
+        elif prev:
+            await asyncio.gather(
+                apply_usage_delta(payload.numberId, payload.placeId, delta, now, rev),
+                record_tombstones("usages", [prev["id"]] if prev.get("id") else [], rev),
+            )
+        bump_generation("usages", "numbers")
         raise HTTPException(status_code=404, detail="Pair not found")
-    now = datetime.now(timezone.utc)
-    await db.usages.update_one(
-        {"numberId": payload.numberId, "placeId": payload.placeId},
-        {"$set": {"used": payload.used, "updatedAt": now}, "$setOnInsert": {"id": str(uuid.uuid4())}},
-        upsert=True,
+    counted, *_ = await asyncio.gather(
+        apply_usage_delta(payload.numberId, payload.placeId, delta, now, rev),
+        record_usage_event(payload.numberId, payload.placeId, num.get("operatorKey"), plc.get("category"), payload.used, bool(delta), now),
+        record_tombstones("usages", [prev["id"]] if not payload.used and prev and prev.get("id") else [], rev),
     )
+    if delta > 0 and not counted:
+        # The number or place was deleted after the lookup, and its delete read the usages before this row
+        # landed: take the row back out and undo the count on whichever side is left
+        removed = await db.usages.delete_one({"id": row_id})
+        if removed.deleted_count:
+            undo_rev = next_rev()
+            await asyncio.gather(
+                apply_usage_delta(payload.numberId, payload.placeId, -1, now, undo_rev),
+                record_tombstones("usages", [row_id], undo_rev),
+            )
+        bump_generation("usages", "numbers")
+        raise HTTPException(status_code=404, detail="Pair not found")
+    bump_generation("usages", "numbers")
     return {"ok": True}
 
+async def apply_usage_delta(number_id: str, place_id: str, delta: int, now: datetime, rev: int) -> bool:
+    """Keep numbers.usedCount/lastEventAt and places.usageCount in step with one usage row change.
+
+    Returns False when the number or place the row counts against no longer exists.
+    """
+    number_update: Dict[str, Any] = {"$max": {"lastEventAt": now}, "$set": {"rev": rev}}
+    writes = []
+    if delta:
+        number_update["$inc"] = {"usedCount": delta}
+        writes.append(db.places.update_one({"id": place_id}, {"$inc": {"usageCount": delta}, "$set": {"rev": rev}}))
+    writes.append(db.numbers.update_one({"id": number_id}, number_update))
+    return all(r.matched_count for r in await asyncio.gather(*writes))
+
+USAGE_COMPACTION_BATCH = int(os.environ.get("USAGE_COMPACTION_BATCH", "500"))
+
+async def compact_usages(batch_size: int = USAGE_COMPACTION_BATCH, pause: float = 0.05) -> Dict[str, int]:
+    """Purge legacy used=false rows in batches; returns rows deleted and BSON bytes reclaimed."""
+    deleted = 0
+    reclaimed = 0
+    batches = 0
+    while True:
+        rows = await db.usages.find({"used": False}).limit(batch_size).to_list(batch_size)
+        if not rows:
+            break
+        # Carry the rows' event times onto their numbers before the rows disappear
+        last_events: Dict[str, datetime] = {}
+        for r in rows:
+            dt = r.get("updatedAt")
+            if isinstance(dt, datetime) and (r["numberId"] not in last_events or dt > last_events[r["numberId"]]):
+                last_events[r["numberId"]] = dt
+        if last_events:
+            await db.numbers.bulk_write([UpdateOne({"id": nid}, {"$max": {"lastEventAt": dt}}) for nid, dt in last_events.items()], ordered=False)
+        res = await db.usages.delete_many({"_id": {"$in": [r["_id"] for r in rows]}})
+        deleted += res.deleted_count
+        reclaimed += sum(len(bson.encode(r)) for r in rows)
+        batches += 1
+        # yield between batches so the purge never monopolises the worker or the primary
+        await asyncio.sleep(pause)
+    if deleted:
+        bump_generation("usages", "numbers")
+    return {"deleted": deleted, "batches": batches, "bytesReclaimed": reclaimed}
+
+async def usage_compaction_job():
+    try:
+        result = await compact_usages()
+        if result["deleted"]:
+            logger.info("Usage compaction purged %(deleted)d used=false rows in %(batches)d batches, %(bytesReclaimed)d bytes", result)
+    except Exception:
+        logger.exception("Usage compaction failed")
+
+# ---------------------
+# Usage events & daily rollups
+# ---------------------
+# usage_events is append-only (a time-series collection when the server supports it); usage_daily holds one
+# document per (day, dim, key) rebuilt from the events by usage_rollup_loop, so stats read O(days) documents.
+USAGE_ROLLUP_INTERVAL = float(os.environ.get("USAGE_ROLLUP_INTERVAL", "60"))
+USAGE_ROLLUP_LAG = timedelta(seconds=5)
+ROLLUP_DIMS = {"place": "$meta.placeId", "operator": "$meta.operatorKey", "category": "$meta.category"}
+
+async def ensure_usage_event_collections():
+    if "usage_events" not in await db.list_collection_names():
+        try:
+            await db.create_collection("usage_events", timeseries={"timeField": "ts", "metaField": "meta", "granularity": "hours"})
+        except Exception as e:
+            # pre-5.0 server (or a stand-in): a plain collection with a ts index does the same job
+            logger.info("usage_events created as a regular collection: %s", e)
+            await db.usage_events.create_index("ts")
+    await db.usage_daily.create_index([("dim", 1), ("key", 1), ("day", 1)], unique=True)
+    await db.usage_daily.create_index([("day", 1)])
+    # keyless rankings match a dimension over a window of days
+    await db.usage_daily.create_index([("dim", 1), ("day", 1)])
+
+async def record_usage_event(number_id: str, place_id: str, operator: Optional[str], category: Optional[str], used: bool, changed: bool, now: datetime):
+    await db.usage_events.insert_one({
+        "ts": now,
+        "meta": {"numberId": number_id, "placeId": place_id, "operatorKey": operator, "category": category},
+        "used": used,
+        "changed": changed,
+    })
+
+def utc_day(dt: datetime) -> datetime:
+    dt = ensure_utc(dt)
+    return datetime(dt.year, dt.month, dt.day, tzinfo=timezone.utc)
+
+async def rollup_usage_day(day: datetime) -> int:
+    """Recount one UTC day of events into usage_daily; idempotent, so a crashed run is simply repeated."""
+    match = {"$match": {"ts": {"$gte": day, "$lt": day + timedelta(days=1)}, "changed": True}}
+    ops = []
+    totals = {"marked": 0, "unmarked": 0}
+    for dim, field in ROLLUP_DIMS.items():
+        async for g in db.usage_events.aggregate([match, {"$group": {"_id": {"key": field, "used": "$used"}, "n": {"$sum": 1}}}]):
+            if g["_id"].get("key") is None:
+                continue
+            counter = "marked" if g["_id"].get("used") else "unmarked"
+            ops.append(UpdateOne({"dim": dim, "key": g["_id"]["key"], "day": day}, {"$set": {counter: g["n"]}}, upsert=True))
+            if dim == "place":
+                totals[counter] += g["n"]
+    ops.append(UpdateOne({"dim": "total", "key": "all", "day": day}, {"$set": totals}, upsert=True))
+    await db.usage_daily.bulk_write(ops, ordered=False)
+    return len(ops)
+
+async def rollup_usage_events() -> Dict[str, Any]:
+    state = await db.meta.find_one({"_id": "usage_rollup"}) or {}
+    since = ensure_utc(state.get("upTo")) or datetime(1970, 1, 1, tzinfo=timezone.utc)
+    until = datetime.now(timezone.utc) - USAGE_ROLLUP_LAG
+    days = set()
+    async for e in db.usage_events.find({"ts": {"$gt": since, "$lte": until}}, {"_id": 0, "ts": 1}):
+        days.add(utc_day(e["ts"]))
+    for day in sorted(days):
+        await rollup_usage_day(day)
+    await db.meta.update_one({"_id": "usage_rollup"}, {"$set": {"upTo": until}}, upsert=True)
+    return {"days": len(days), "upTo": until}
+
+async def usage_rollup_loop():
+    while True:
+        try:
+            await rollup_usage_events()
+        except Exception:
+            logger.exception("Usage rollup failed")
+        await asyncio.sleep(USAGE_ROLLUP_INTERVAL)
+
+@api_router.get("/stats/usage")
+async def usage_stats(dim: str = "total", key: Optional[str] = None, days: int = 30, bucket: str = "day", limit: int = 100):
+    if dim not in ("total", *ROLLUP_DIMS):
+        raise HTTPException(status_code=400, detail="dim must be total, place, operator or category")
+    if bucket not in ("day", "week"):
+        raise HTTPException(status_code=400, detail="bucket must be day or week")
+    days = max(1, min(days, 366))
+    limit = max(1, min(limit, 1000))
+    start = utc_day(datetime.now(timezone.utc)) - timedelta(days=days - 1)
+    query: Dict[str, Any] = {"dim": dim, "day": {"$gte": start}}
+    if dim == "total":
+        key = "all"
+    elif dim == "operator" and key:
+        key = operator_key(key) or key
+    if not key:
+        # no key: rank the dimension's keys over the window, summed, sorted and cut in Mongo
+        keys, state = await asyncio.gather(
+            db.usage_daily.aggregate([
+                {"$match": query},
+                {"$group": {"_id": "$key", "marked": {"$sum": "$marked"}, "unmarked": {"$sum": "$unmarked"}}},
+                {"$sort": {"marked": -1, "_id": 1}},
+                {"$limit": limit},
+                {"$project": {"_id": 0, "key": "$_id", "marked": 1, "unmarked": 1}},
+            ]).to_list(limit),
+            db.meta.find_one({"_id": "usage_rollup"}),
+        )
+        updated_through = ensure_utc(state.get("upTo")) if state else None
+        return {"dim": dim, "days": days, "keys": keys, "updatedThrough": updated_through}
+    query["key"] = key
+    rows, state = await asyncio.gather(
+        db.usage_daily.find(query, {"_id": 0}).sort("day", 1).to_list(days),
+        db.meta.find_one({"_id": "usage_rollup"}),
+    )
+    updated_through = ensure_utc(state.get("upTo")) if state else None
+    series: Dict[datetime, Dict[str, Any]] = {}
+    for r in rows:
+        day = ensure_utc(r["day"])
+        period = day - timedelta(days=day.weekday()) if bucket == "week" else day
+        acc = series.setdefault(period, {"period": period.date().isoformat(), "marked": 0, "unmarked": 0})
+        acc["marked"] += r.get("marked", 0)
+        acc["unmarked"] += r.get("unmarked", 0)
+    return {"dim": dim, "key": key, "bucket": bucket, "series": [series[k] for k in sorted(series)], "updatedThrough": updated_through}
+
+# ---------------------
+# Next free number
+# ---------------------
+# Least used overall first, then the one idle longest (never used = null sorts first)
+ALLOCATION_SORT = [("usedCount", 1), ("lastEventAt", 1), ("createdAt", 1)]
+
+async def ensure_allocation_indexes():
+    await db.numbers.create_index(ALLOCATION_SORT)
+    await db.numbers.create_index([("operatorKey", 1)] + ALLOCATION_SORT)
+    await db.usages.create_index([("placeId", 1), ("used", 1)])
+    # stays empty once compact_usages has run, so the startup purge check is an index probe, not a scan
+    await db.usages.create_index("used", partialFilterExpression={"used": False}, name="used_false")
+
+USAGE_PAIR_INDEX = "numberId_1_placeId_1"
+
+async def ensure_usage_pair_index():
+    """Build the unique (numberId, placeId) index, first deleting legacy duplicate pairs from racing upserts.
+
+    reserve_number relies on it: without it the used != true upsert inserts a second row instead of failing,
+    and the same number is handed out twice. Of each duplicated pair the newest row is kept.
+    """
+    if USAGE_PAIR_INDEX in await db.usages.index_information():
+        return
+    extra: List[Dict[str, Any]] = []
+    async for d in db.usages.aggregate([
+        {"$sort": {"updatedAt": -1}},
+        {"$group": {"_id": {"numberId": "$numberId", "placeId": "$placeId"}, "rows": {"$push": {"_id": "$_id", "id": "$id"}}}},
+        {"$match": {"rows.1": {"$exists": True}}},
+    ], allowDiskUse=True):
+        extra.extend({**row, **d["_id"]} for row in d["rows"][1:])
+    if extra:
+        logger.warning("Deleting %d duplicate usage rows before building the (numberId, placeId) index", len(extra))
+        await db.usages.delete_many({"_id": {"$in": [row["_id"] for row in extra]}})
+        await record_tombstones("usages", [row["id"] for row in extra if row.get("id")], next_rev())
+        await rebuild_usage_summaries(list({row["numberId"] for row in extra}))
+        await rebuild_place_usage_counts(list({row["placeId"] for row in extra}))
+    await db.usages.create_index([("numberId", 1), ("placeId", 1)], unique=True, name=USAGE_PAIR_INDEX)
+
+async def free_number_candidates(place_id: str, operator: Optional[str], limit: int) -> List[Dict[str, Any]]:
+    plc, used_ids = await asyncio.gather(
+        db.places.find_one({"id": place_id}, {"_id": 1}),
+        db.usages.distinct("numberId", {"placeId": place_id, "used": True}),
+    )
+    if not plc:
+        raise HTTPException(status_code=404, detail="Place not found")
+    query: Dict[str, Any] = {"id": {"$nin": used_ids}}
+    if operator:
+        query["operatorKey"] = operator_key(operator) or operator
+    # Walks the allocation index in order and stops after `limit` numbers not used at this place
+    return await db.numbers.find(query, {"_id": 0}).sort(ALLOCATION_SORT).limit(limit).to_list(limit)
+
+async def reserve_number(number_id: str, place_id: str, now: datetime, operator: Optional[str] = None, category: Optional[str] = None) -> bool:
+    """Atomically mark the pair used unless it already is; False means another request got it first."""
+    rev = next_rev()
+    try:
+        await db.usages.find_one_and_update(
+            {"numberId": number_id, "placeId": place_id, "used": {"$ne": True}},
+            {"$set": {"used": True, "updatedAt": now, "rev": rev}, "$setOnInsert": {"id": str(uuid.uuid4())}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # the pair exists with used=True, so the upsert collided with the (numberId, placeId) index
+        return False
+    await asyncio.gather(
+        apply_usage_delta(number_id, place_id, 1, now, rev),
+        record_usage_event(number_id, place_id, operator, category, True, True, now),
+    )
+    return True
+
+@api_router.get("/places/{place_id}/next-free")
+async def next_free_numbers(place_id: str, operator: Optional[str] = None, limit: int = 5):
+    limit = max(1, min(limit, 100))
+    numbers = await free_number_candidates(place_id, operator, limit)
+    return {"numbers": [NumberModel(**n).model_dump() for n in numbers], "reserved": False}
+
+@api_router.post("/places/{place_id}/next-free")
+async def reserve_next_free_numbers(place_id: str, operator: Optional[str] = None, limit: int = 1):
+    # Reserve-and-mark: concurrent callers never receive the same number for this place
+    limit = max(1, min(limit, 20))
+    now = datetime.now(timezone.utc)
+    # category is only needed for the usage event; candidates re-check existence on every pass
+    plc = await db.places.find_one({"id": place_id}, {"_id": 1, "category": 1}) or {}
+    reserved: List[Dict[str, Any]] = []
+    while len(reserved) < limit:
+        candidates = await free_number_candidates(place_id, operator, (limit - len(reserved)) * 2)
+        if not candidates:
+            break
+        for n in candidates:
+            if len(reserved) >= limit:
+                break
+            if await reserve_number(n["id"], place_id, now, n.get("operatorKey"), plc.get("category")):
+                n["usedCount"] = n.get("usedCount", 0) + 1
+                n["lastEventAt"] = now
+                reserved.append(n)
+    if reserved:
+        bump_generation("usages", "numbers")
+    return {"numbers": [NumberModel(**n).model_dump() for n in reserved], "reserved": True}
+
 # ---------------------
 # Operators CRUD
 # ---------------------
+# Mirrors OPERATORS in frontend/src/App.js: numbers store the frontend key, not the operator id
+OPERATOR_KEYS = {
+    "мегафон": "megafon", "билайн": "beeline", "мтс": "mts", "t2": "t2", "t-mobile": "t",
+    "сбер-mobile": "sber", "альфа-mobile": "alfa", "газпром-mobile": "gazprom", "yota": "yota",
+    "мотив": "motiv", "ростелеком": "rt",
+}
+
+DEFAULT_OPERATORS = [
+    "МегаФон", "Билайн", "МТС", "T2", "T-Mobile", "СБЕР-Mobile", "Альфа-Mobile", "Газпром-Mobile", "YOTA", "Мотив", "Ростелеком"
+]
+
+def operator_key(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    return OPERATOR_KEYS.get(name.strip().lower())
+
+async def seed_default_operators():
+    now = datetime.now(timezone.utc)
+    rev = next_rev()
+    docs = []
+    for n in DEFAULT_OPERATORS:
+        d = OperatorModel(name=n, createdAt=now).model_dump()
+        d["nameKey"] = name_key(n)
+        d["rev"] = rev
+        docs.append(d)
+    try:
+        await db.operators.insert_many(docs, ordered=False)
+    except BulkWriteError:
+        # another worker seeded concurrently; the nameKey index rejected the duplicates
+        pass
+    bump_generation("operators")
+
 @api_router.get("/operators")
-async def list_operators():
+async def list_operators(request: Request):
+    body = await single_flight.do(("operators", generations["operators"]), load_operators)
+    return cached_json(body, hit=False, request=request)
+
+async def load_operators() -> bytes:
     items = await db.operators.find({}).sort("createdAt", -1).to_list(2000)
     out = []
     for it in items:
         d = dict(it)
         d.pop("_id", None)
         has_logo = bool(d.get("logo"))
-        d.pop("logo", None)
+        d["logoHash"] = media_version(d.pop("logo", None))
         d["hasLogo"] = has_logo
         out.append(d)
     # Seed defaults if empty
     if not out:
-        defaults = [
-            "МегаФон", "Билайн", "МТС", "T2", "T-Mobile", "СБЕР-Mobile", "Альфа-Mobile", "Газпром-Mobile", "YOTA", "Мотив", "Ростелеком"
-        ]
-        now = datetime.now(timezone.utc)
-        docs = [OperatorModel(name=n, createdAt=now).model_dump() for n in defaults]
-        if docs:
-            await db.operators.insert_many(docs)
-            items = await db.operators.find({}).sort("createdAt", -1).to_list(2000)
-            out = []
-            for it in items:
-                d = dict(it)
-                d.pop("_id", None)
-                has_logo = bool(d.get("logo"))
-                d.pop("logo", None)
-                d["hasLogo"] = has_logo
-                out.append(d)
-    return out
+        await seed_default_operators()
+        items = await db.operators.find({}).sort("createdAt", -1).to_list(2000)
+        out = []
+        for it in items:
+            d = dict(it)
+            d.pop("_id", None)
+            has_logo = bool(d.get("logo"))
+            d["logoHash"] = media_version(d.pop("logo", None))
+            d["hasLogo"] = has_logo
+            out.append(d)
+    return dump_json(out)
 
 @api_router.post("/operators")
 async def create_operator(
@@ -550,22 +2126,27 @@ async def create_operator(
     name = name.strip()
     if not name:
         raise HTTPException(status_code=400, detail="Name required")
-    dup = await db.operators.find_one({"name": {"$regex": f"^{re.escape(name)}$", "$options": "i"}})
-    if dup:
-        raise HTTPException(status_code=409, detail="Operator already exists")
     doc = OperatorModel(name=name).model_dump()
+    doc["nameKey"] = name_key(name)
     if logo is not None:
         content = await logo.read()
         if len(content) > 2 * 1024 * 1024:
             raise HTTPException(status_code=413, detail="Logo too large (max 2MB)")
         doc["logo"] = {
             "contentType": logo.content_type or "image/png",
-            "data": base64.b64encode(content).decode('utf-8')
+            "data": await encode_media(content),
+            "hash": media_hash(content),
         }
-    await db.operators.insert_one(doc)
+    doc["rev"] = next_rev()
+    try:
+        await db.operators.insert_one(doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Operator already exists")
+    bump_generation("operators")
     resp = dict(doc)
     resp.pop("_id", None)
     resp["hasLogo"] = "logo" in doc and bool(doc.get("logo"))
+    resp["logoHash"] = media_version(doc.get("logo"))
     resp.pop("logo", None)
     return resp
 
@@ -578,18 +2159,18 @@ async def get_operator(op_id: str):
     resp.pop("_id", None)
     resp.pop("logo", None)
     resp["hasLogo"] = "logo" in doc and bool(doc["logo"])
+    resp["logoHash"] = media_version(doc.get("logo"))
     return resp
 
 @api_router.get("/operators/{op_id}/logo")
-async def get_operator_logo(op_id: str):
-    doc = await db.operators.find_one({"id": op_id})
-    if not doc:
+async def get_operator_logo(op_id: str, request: Request):
+    doc = await db.operators.find_one({"id": op_id}, {"_id": 0, "logo": 1})
+    if doc is None:
         raise HTTPException(status_code=404, detail="Operator not found")
     lg = doc.get("logo")
     if not lg:
         raise HTTPException(status_code=404, detail="Logo not set")
-    data = base64.b64decode(lg.get("data", ""))
-    return Response(content=data, media_type=lg.get("contentType", "image/png"))
+    return await media_response(request, lg)
 
 @api_router.put("/operators/{op_id}")
 async def update_operator(
@@ -598,18 +2179,13 @@ async def update_operator(
     logo: Optional[UploadFile] = File(None),
     removeLogo: Optional[bool] = Form(False)
 ):
-    cur = await db.operators.find_one({"id": op_id})
-    if not cur:
-        raise HTTPException(status_code=404, detail="Operator not found")
     update: Dict[str, Any] = {}
     if name is not None:
         n = name.strip()
         if not n:
             raise HTTPException(status_code=400, detail="Name required")
-        dup = await db.operators.find_one({"name": {"$regex": f"^{re.escape(n)}$", "$options": "i"}, "id": {"$ne": op_id}})
-        if dup:
-            raise HTTPException(status_code=409, detail="Operator already exists")
         update["name"] = n
+        update["nameKey"] = name_key(n)
     logo_doc = None
     if logo is not None:
         content = await logo.read()
@@ -617,7 +2193,8 @@ async def update_operator(
             raise HTTPException(status_code=413, detail="Logo too large (max 2MB)")
         logo_doc = {
             "contentType": logo.content_type or "image/png",
-            "data": base64.b64encode(content).decode('utf-8')
+            "data": await encode_media(content),
+            "hash": media_hash(content),
         }
     set_obj: Dict[str, Any] = {}
     unset_obj: Dict[str, Any] = {}
@@ -633,13 +2210,24 @@ async def update_operator(
     if unset_obj:
         update_cmd["$unset"] = unset_obj
     if not update_cmd:
+        if not await db.operators.find_one({"id": op_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Operator not found")
         return JSONResponse({"updated": False})
-    await db.operators.update_one({"id": op_id}, update_cmd)
-    doc = await db.operators.find_one({"id": op_id})
+    update_cmd.setdefault("$set", {})["rev"] = next_rev()
+    try:
+        doc = await db.operators.find_one_and_update(
+            {"id": op_id}, update_cmd, projection={"_id": 0, "logo.data": 0}, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Operator already exists")
+    if not doc:
+        raise HTTPException(status_code=404, detail="Operator not found")
+    bump_generation("operators")
     resp = dict(doc)
     resp.pop("_id", None)
     resp.pop("logo", None)
     resp["hasLogo"] = "logo" in doc and bool(doc["logo"])
+    resp["logoHash"] = media_version(doc.get("logo"))
     return resp
 
 @api_router.delete("/operators/{op_id}")
@@ -647,82 +2235,84 @@ async def delete_operator_endpoint(op_id: str):
     res = await db.operators.delete_one({"id": op_id})
     if res.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Operator not found")
+    await record_tombstones("operators", [op_id], next_rev())
+    bump_generation("operators")
     return {"ok": True}
 
 # ---------------------
 # Categories CRUD
 # ---------------------
 @api_router.get("/categories/{cat_id}/icon")
-async def get_category_icon(cat_id: str):
-    doc = await db.categories.find_one({"id": cat_id})
-    if not doc:
+async def get_category_icon(cat_id: str, request: Request):
+    doc = await db.categories.find_one({"id": cat_id}, {"_id": 0, "icon": 1})
+    if doc is None:
         raise HTTPException(status_code=404, detail="Category not found")
     ic = doc.get("icon")
     if not ic:
         raise HTTPException(status_code=404, detail="Icon not set")
-    data = base64.b64decode(ic.get("data", ""))
-    return Response(content=data, media_type=ic.get("contentType", "image/png"))
+    return await media_response(request, ic)
 
 @api_router.get("/categories")
-async def list_categories():
+async def list_categories(request: Request):
     items = await db.categories.find({}).sort("createdAt", -1).to_list(2000)
     out = []
     for it in items:
         d = dict(it)
         d.pop("_id", None)
         has_icon = bool(d.get("icon"))
-        d.pop("icon", None)
+        d["iconHash"] = media_version(d.pop("icon", None))
         d["hasIcon"] = has_icon
         out.append(d)
-    return out
+    return cached_json(dump_json(out), hit=False, request=request)
 
 @api_router.post("/categories")
 async def create_category(name: str = Form(...), icon: Optional[UploadFile] = File(None)):
     n = (name or '').strip()
     if not n:
         raise HTTPException(status_code=400, detail="Name required")
-    dup = await db.categories.find_one({"name": {"$regex": f"^{re.escape(n)}$", "$options": "i"}})
-    if dup:
-        raise HTTPException(status_code=409, detail="Category already exists")
     doc = CategoryModel(name=n).model_dump()
+    doc["nameKey"] = name_key(n)
     if icon is not None:
         content = await icon.read()
         if len(content) > 2 * 1024 * 1024:
             raise HTTPException(status_code=413, detail="Icon too large (max 2MB)")
         doc["icon"] = {
             "contentType": icon.content_type or "image/png",
-            "data": base64.b64encode(content).decode('utf-8')
+            "data": await encode_media(content),
+            "hash": media_hash(content),
         }
-    await db.categories.insert_one(doc)
+    doc["rev"] = next_rev()
+    try:
+        await db.categories.insert_one(doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Category already exists")
+    bump_generation("categories")
     resp = dict(doc)
     resp.pop("_id", None)
     has_icon = bool(resp.get("icon"))
     resp.pop("icon", None)
     resp["hasIcon"] = has_icon
+    resp["iconHash"] = media_version(doc.get("icon"))
     return resp
 
 @api_router.put("/categories/{cat_id}")
 async def update_category(cat_id: str, name: Optional[str] = Form(None), icon: Optional[UploadFile] = File(None), removeIcon: Optional[bool] = Form(False)):
-    cur = await db.categories.find_one({"id": cat_id})
-    if not cur:
-        raise HTTPException(status_code=404, detail="Category not found")
     set_obj: Dict[str, Any] = {}
     unset_obj: Dict[str, Any] = {}
     if name is not None:
         n = (name or '').strip()
         if not n:
             raise HTTPException(status_code=400, detail="Name required")
-        dup = await db.categories.find_one({"name": {"$regex": f"^{re.escape(n)}$", "$options": "i"}, "id": {"$ne": cat_id}})
-        if dup:
-            raise HTTPException(status_code=409, detail="Category already exists")
         set_obj["name"] = n
+        set_obj["nameKey"] = name_key(n)
     if icon is not None:
         content = await icon.read()
         if len(content) > 2 * 1024 * 1024:
             raise HTTPException(status_code=413, detail="Icon too large (max 2MB)")
         set_obj["icon"] = {
             "contentType": icon.content_type or "image/png",
-            "data": base64.b64encode(content).decode('utf-8')
+            "data": await encode_media(content),
+            "hash": media_hash(content),
         }
     if removeIcon:
         unset_obj["icon"] = ""
@@ -732,14 +2322,25 @@ async def update_category(cat_id: str, name: Optional[str] = Form(None), icon: O
     if unset_obj:
         update_cmd["$unset"] = unset_obj
     if not update_cmd:
+        if not await db.categories.find_one({"id": cat_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Category not found")
         return JSONResponse({"updated": False})
-    await db.categories.update_one({"id": cat_id}, update_cmd)
-    doc = await db.categories.find_one({"id": cat_id})
+    update_cmd.setdefault("$set", {})["rev"] = next_rev()
+    try:
+        doc = await db.categories.find_one_and_update(
+            {"id": cat_id}, update_cmd, projection={"_id": 0, "icon.data": 0}, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Category already exists")
+    if not doc:
+        raise HTTPException(status_code=404, detail="Category not found")
+    bump_generation("categories")
     resp = dict(doc)
     resp.pop("_id", None)
     has_icon = bool(resp.get("icon"))
     resp.pop("icon", None)
     resp["hasIcon"] = has_icon
+    resp["iconHash"] = media_version(doc.get("icon"))
     return resp
 
 @api_router.delete("/categories/{cat_id}")
@@ -747,6 +2348,8 @@ async def delete_category(cat_id: str):
     res = await db.categories.delete_one({"id": cat_id})
     if res.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
+    await record_tombstones("categories", [cat_id], next_rev())
+    bump_generation("categories")
     return {"ok": True}
 
 async def delete_operator(op_id: str):
@@ -760,46 +2363,516 @@ async def delete_operator(op_id: str):
 # ---------------------
 # Search
 # ---------------------
+SEARCH_SOURCE_LIMIT = 10
+SEARCH_EXPAND_LIMIT = 20
+
+def strip_place(p: Dict[str, Any]):
+    p2 = dict(p)
+    p2.pop("_id", None)
+    p2["hasLogo"] = bool(p.get("logo"))
+    p2["logoHash"] = media_version(p.get("logo"))
+    p2["hasPromo"] = bool(p.get("promoCode") or p.get("promoUrl"))
+    p2.pop("logo", None)
+    return p2
+
+def strip_operator(o: Dict[str, Any]):
+    o2 = dict(o)
+    o2.pop("_id", None)
+    o2["hasLogo"] = bool(o.get("logo"))
+    o2["logoHash"] = media_version(o.get("logo"))
+    o2.pop("logo", None)
+    return o2
+
+def strip_category(c: Dict[str, Any]):
+    c2 = dict(c)
+    c2.pop("_id", None)
+    c2["hasIcon"] = bool(c.get("icon"))
+    c2["iconHash"] = media_version(c.get("icon"))
+    c2.pop("icon", None)
+    return c2
+
+def text_match_score(name: str, q: str) -> int:
+    # exact > prefix > substring, all case-insensitive
+    n = (name or "").lower()
+    ql = q.lower()
+    if n == ql:
+        return 3
+    if n.startswith(ql):
+        return 2
+    return 1
+
+SEARCH_OUTPUT = {
+    "numbers": lambda n: NumberModel(**n).model_dump(),
+    "places": strip_place,
+    "operators": strip_operator,
+    "categories": strip_category,
+}
+
+async def timed(timings: Dict[str, float], source: str, coro):
+    t0 = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        timings[source] = round((time.perf_counter() - t0) * 1000, 3)
+
+def search_phone_prefixes(q: str) -> List[str]:
+    digits = extract_ru_digits(q)
+    if not digits:
+        return []
+    # A fragment shorter than a full number may start inside it: "888777" is also +7 888 777 ..., not only 8 -> +7
+    raw = re.sub(DIGIT_RE, "", q)
+    national = "7" + raw if len(raw) < 11 and not q.lstrip().startswith("+") else digits
+    return sorted({digits, national})
+
+async def search_numbers_source(prefixes: List[str]) -> List[Dict[str, Any]]:
+    if not prefixes:
+        return []
+    # phoneDigits is backfilled at startup, so anchored regexes on its index are enough
+    query = {"$or": [{"phoneDigits": {"$regex": f"^{re.escape(p)}"}} for p in prefixes]}
+    return await db.numbers.find(query, {"_id": 0}).limit(SEARCH_SOURCE_LIMIT).to_list(SEARCH_SOURCE_LIMIT)
+
+async def search_by_name(collection, q: str, projection: Dict[str, Any]) -> List[Dict[str, Any]]:
+    query = {"name": {"$regex": re.escape(q), "$options": "i"}}
+    return await collection.find(query, projection).limit(SEARCH_SOURCE_LIMIT).to_list(SEARCH_SOURCE_LIMIT)
+
+async def expand_operators(operators: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    keys = [k for k in (operator_key(o.get("name")) for o in operators) if k]
+    if not keys:
+        return []
+    return await db.numbers.find({"operatorKey": {"$in": keys}}, {"_id": 0}).sort("createdAt", -1).limit(SEARCH_EXPAND_LIMIT).to_list(SEARCH_EXPAND_LIMIT)
+
+async def expand_categories(categories: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    names = [c["name"] for c in categories if c.get("name")]
+    if not names:
+        return []
+    return await db.places.find({"category": {"$in": names}}, {"_id": 0, "logo.data": 0}).sort("createdAt", -1).limit(SEARCH_EXPAND_LIMIT).to_list(SEARCH_EXPAND_LIMIT)
+
 @api_router.get("/search", response_model=SearchResult)
-async def search(q: str):
+async def search(q: str, limit: int = 20):
+    started = time.perf_counter()
     q = q.strip()
+    limit = max(1, min(limit, 100))
+    cache_key = ("search", q.lower(), limit) + tuple(generations[g] for g in ("numbers", "places", "usages", "operators", "categories"))
+    body = query_cache.get(cache_key)
+    if body is not None:
+        return cached_json(body, hit=True)
+    timings: Dict[str, float] = {}
     is_phone_like = bool(PHONE_ONLY_RE.match(q))
-    numbers: List[Dict[str, Any]] = []
-    places: List[Dict[str, Any]] = []
-    if is_phone_like:
-        d = extract_ru_digits(q)
-        if d:
-            numbers = await db.numbers.find({"phoneDigits": {"$regex": f"^{re.escape(d)}"}}).limit(10).to_list(10)
-        if not numbers:
-            all_nums = await db.numbers.find({}).limit(1000).to_list(1000)
-            for n in all_nums:
-                if extract_ru_digits(n.get("phone", "")).startswith(d):
-                    numbers.append(n)
-                    if len(numbers) >= 10:
-                        break
-    else:
-        places = await db.places.find({"name": {"$regex": re.escape(q), "$options": "i"}}).limit(10).to_list(10)
-    def strip_place(p: Dict[str, Any]):
-        p2 = dict(p)
-        p2.pop("_id", None)
-        p2["hasLogo"] = bool(p.get("logo"))
-        p2["hasPromo"] = bool(p.get("promoCode") or p.get("promoUrl"))
-        p2.pop("logo", None)
-        return p2
-    clean_numbers = []
+    prefixes = search_phone_prefixes(q) if is_phone_like else []
+    # Direct matches: every entity source runs concurrently
+    numbers, places, operators, categories = await asyncio.gather(
+        timed(timings, "numbers", search_numbers_source(prefixes)),
+        timed(timings, "places", search_by_name(db.places, q, {"_id": 0, "logo.data": 0})),
+        timed(timings, "operators", search_by_name(db.operators, q, {"_id": 0, "logo.data": 0})),
+        timed(timings, "categories", search_by_name(db.categories, q, {"_id": 0, "icon.data": 0})),
+    )
+    # Expansion: matched operators -> their numbers, matched categories -> their places
+    op_numbers, cat_places = await asyncio.gather(
+        timed(timings, "operators.numbers", expand_operators(operators)),
+        timed(timings, "categories.places", expand_categories(categories)),
+    )
+
+    # Rank every source together under one limit: direct hits beat expanded ones; phone-like queries favour numbers
+    ranked: List[tuple] = []
     for n in numbers:
-        nn = dict(n)
-        nn.pop("_id", None)
-        clean_numbers.append(nn)
-    return {"numbers": [NumberModel(**n).model_dump() for n in clean_numbers], "places": [strip_place(p) for p in places]}
+        ranked.append((4 if is_phone_like else 1, n.get("phone", ""), "numbers", n))
+    for kind, docs in (("places", places), ("operators", operators), ("categories", categories)):
+        for d in docs:
+            ranked.append((text_match_score(d.get("name"), q), d.get("name", ""), kind, d))
+    for n in op_numbers:
+        ranked.append((0, n.get("phone", ""), "numbers", n))
+    for p in cat_places:
+        ranked.append((0, p.get("name", ""), "places", p))
+    ranked.sort(key=lambda r: (-r[0], r[1].lower()))
+
+    out: Dict[str, List[Dict[str, Any]]] = {"numbers": [], "places": [], "operators": [], "categories": []}
+    seen = set()
+    for _, _, kind, doc in ranked:
+        if len(seen) >= limit:
+            break
+        if (kind, doc["id"]) in seen:
+            continue
+        seen.add((kind, doc["id"]))
+        out[kind].append(SEARCH_OUTPUT[kind](doc))
+    timings["total"] = round((time.perf_counter() - started) * 1000, 3)
+    body = dump_json({**out, "timings": timings})
+    query_cache.put(cache_key, body)
+    return cached_json(body, hit=False)
+
+@api_router.get("/suggest")
+async def suggest(q: str, limit: int = 8):
+    # Served from the in-memory prefix index; Mongo is only touched on the first call of a cold worker
+    limit = max(1, min(limit, 50))
+    if not suggest_index.loaded:
+        await suggest_index.load()
+    return suggest_index.suggest(q, limit)
+
+# ---------------------
+# Bootstrap
+# ---------------------
+# Everything the first screen needs in one response; serialised once per generation set
+BOOTSTRAP_PAGE = int(os.environ.get("BOOTSTRAP_PAGE", "100"))
+
+def json_object(parts: Dict[str, bytes]) -> bytes:
+    return b"{" + b",".join(json.dumps(k).encode() + b":" + v for k, v in parts.items()) + b"}"
+
+async def load_bootstrap(cache_key: tuple) -> bytes:
+    gens = dict(generations)
+    # a /sync token taken before the reads, so the client can catch up from this snapshot
+    token = current_rev()
+    operators, categories, places, numbers, place_facets, number_facets = await asyncio.gather(
+        single_flight.do(("operators", gens["operators"]), load_operators),
+        db.categories.find({}, {"_id": 0, "icon.data": 0}).sort("createdAt", -1).to_list(2000),
+        db.places.find({}, {"_id": 0, "logo.data": 0}).sort(PLACE_SORTS["new"]).limit(BOOTSTRAP_PAGE).to_list(BOOTSTRAP_PAGE),
+        db.numbers.find({}, {"_id": 0}).sort("createdAt", -1).limit(BOOTSTRAP_PAGE).to_list(BOOTSTRAP_PAGE),
+        facet_body(db.places, {}, PLACE_FACETS, ("place_facets", "", gens["places"])),
+        facet_body(db.numbers, {}, NUMBER_FACETS, ("number_facets", "", gens["numbers"])),
+    )
+    body = json_object({
+        "token": dump_json(str(token)),
+        "operators": operators,
+        "categories": dump_json([strip_category(c) for c in categories]),
+        "places": dump_json([strip_place(p) for p in places]),
+        "numbers": dump_json([NumberModel(**n).model_dump() for n in numbers]),
+        "facets": json_object({"places": place_facets, "numbers": number_facets}),
+    })
+    query_cache.put(cache_key, body)
+    return body
+
+@api_router.get("/bootstrap")
+async def bootstrap(request: Request):
+    cache_key = ("bootstrap", tuple(sorted(generations.items())))
+    body = query_cache.get(cache_key)
+    hit = body is not None
+    if not hit:
+        body = await single_flight.do(cache_key, lambda: load_bootstrap(cache_key))
+    return cached_json(body, hit, request)
+
+# ---------------------
+# Revisions & delta sync
+# ---------------------
+# Every entity write stamps a revision; deletes leave a tombstone with theirs.
+# GET /sync?since=<token> returns what changed after the token, so a warm client syncs in kilobytes.
+SYNC_KINDS = ("numbers", "places", "operators", "categories", "usages")
+SYNC_LIMIT = int(os.environ.get("SYNC_LIMIT", "5000"))
+# Revisions are microseconds of the worker's own clock, kept strictly increasing within the worker, so a write
+# stamps one without a round trip. A revision is taken just before its write lands and workers' clocks drift
+# a little apart, so a lower rev can commit after a higher one was served; re-reading the revisions of the
+# last few seconds picks such stragglers up.
+SYNC_OVERLAP_MS = int(os.environ.get("SYNC_OVERLAP_MS", "5000"))
+SYNC_REV_OVERLAP = SYNC_OVERLAP_MS * 1000
+# Tombstones are kept this long (a TTL index on deletedAt); a client that last synced before that cannot
+# learn what was deleted since, so its token is answered with a full snapshot instead
+SYNC_TOMBSTONE_DAYS = int(os.environ.get("SYNC_TOMBSTONE_DAYS", "30"))
+SYNC_TOMBSTONE_TTL = SYNC_TOMBSTONE_DAYS * 86400
+SYNC_STRIP = {"places": strip_place, "operators": strip_operator, "categories": strip_category}
+SYNC_PROJECTIONS = {"places": {"_id": 0, "logo.data": 0}, "operators": {"_id": 0, "logo.data": 0}, "categories": {"_id": 0, "icon.data": 0}}
+
+last_rev = 0
+# revisions this worker stamped lately: its own writes already bumped its generations when they landed
+# (another worker stamping the very same microsecond is left to the cache TTL)
+local_revs: set = set()
+
+def next_rev() -> int:
+    global last_rev
+    last_rev = max(time.time_ns() // 1000, last_rev + 1)
+    local_revs.add(last_rev)
+    return last_rev
+
+def current_rev() -> int:
+    """A token at or past every revision this worker has handed out."""
+    return max(time.time_ns() // 1000, last_rev)
+
+async def record_tombstones(kind: str, ids: List[str], rev: int):
+    if ids:
+        now = datetime.now(timezone.utc)
+        await db.tombstones.insert_many([{"kind": kind, "id": i, "rev": rev, "deletedAt": now} for i in ids])
+
+# Pages are cut on (rev, id), so documents sharing a revision (one update_many) never stall the cursor
+SYNC_ORDER = [("rev", 1), ("id", 1)]
+
+async def ensure_sync_indexes():
+    for kind in SYNC_KINDS:
+        # documents written before revisions existed page in first
+        await db[kind].update_many({"rev": {"$exists": False}}, {"$set": {"rev": 0}})
+        await db[kind].create_index(SYNC_ORDER)
+    await db.tombstones.create_index(SYNC_ORDER)
+    # a changed SYNC_TOMBSTONE_DAYS needs the TTL index rebuilt: create_index refuses different options
+    ttl_index = (await db.tombstones.index_information()).get("deletedAt_1")
+    if ttl_index and ttl_index.get("expireAfterSeconds") != SYNC_TOMBSTONE_TTL:
+        await db.tombstones.drop_index("deletedAt_1")
+    await db.tombstones.create_index("deletedAt", expireAfterSeconds=SYNC_TOMBSTONE_TTL)
+
+def sync_horizon() -> int:
+    """The oldest settled token whose overlap window is still fully covered by kept tombstones."""
+    return current_rev() - SYNC_TOMBSTONE_TTL * 1_000_000 + SYNC_REV_OVERLAP
+
+def parse_sync_token(since: Optional[str]) -> Tuple[int, Optional[str]]:
+    """A token is a revision to sync from (its overlap window is re-read) or "rev:id", a cursor to resume after."""
+    if not since:
+        return 0, None
+    rev, sep, after_id = since.partition(":")
+    try:
+        if (sep and not after_id) or int(rev) < 0:
+            raise ValueError(since)
+        return int(rev), after_id or None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+@api_router.get("/sync")
+async def sync(since: Optional[str] = None, limit: int = SYNC_LIMIT):
+    since_rev, after_id = parse_sync_token(since)
+    if after_id is None and 0 < since_rev < sync_horizon():
+        # deletes that old have no tombstone left: start the client over. A "rev:id" cursor is only held
+        # between the pages of one sync, so it is always resumed.
+        since_rev = 0
+    # a client may ask for smaller pages, never larger ones
+    body = dump_json(await collect_changes(since_rev, after_id, limit=max(1, min(limit, SYNC_LIMIT))))
+    return Response(content=body, media_type="application/json")
+
+async def collect_changes(since_rev: int, after_id: Optional[str] = None, raw_tombstones: bool = False, limit: Optional[int] = None) -> Dict[str, Any]:
+    limit = limit or SYNC_LIMIT
+    full = not since_rev and after_id is None
+    if after_id is not None:
+        # the next page: exactly what sorts after the cursor
+        query: Dict[str, Any] = {"$or": [{"rev": {"$gt": since_rev}}, {"rev": since_rev, "id": {"$gt": after_id}}]}
+    elif since_rev:
+        query = {"rev": {"$gt": max(0, since_rev - SYNC_REV_OVERLAP)}}
+    else:
+        # the first page of a full snapshot
+        query = {}
+
+    async def changed(collection, projection: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return await collection.find(query, projection).sort(SYNC_ORDER).limit(limit).to_list(limit)
+
+    async def no_tombstones() -> List[Dict[str, Any]]:
+        return []
+
+    # taken before the reads: whatever commits during them is re-read next time
+    token = current_rev()
+    results = await asyncio.gather(
+        *(changed(db[kind], SYNC_PROJECTIONS.get(kind, {"_id": 0})) for kind in SYNC_KINDS),
+        no_tombstones() if full else changed(db.tombstones, {"_id": 0}),
+    )
+    # truncated sources: the next page resumes after the lowest last (rev, id) among them; the others'
+    # documents past that point come again, which a client applying upserts and deletes does not notice
+    cursor = min(((d[-1].get("rev", 0), d[-1]["id"]) for d in results if len(d) >= limit), default=None)
+    changes: Dict[str, List[Dict[str, Any]]] = {}
+    for kind, docs in zip(SYNC_KINDS, results):
+        strip = SYNC_STRIP.get(kind)
+        if kind == "numbers":
+            changes[kind] = [{**NumberModel(**d).model_dump(), "rev": d.get("rev", 0)} for d in docs]
+        else:
+            changes[kind] = [strip(d) if strip else d for d in docs]
+    deleted: Dict[str, List[str]] = {kind: [] for kind in SYNC_KINDS}
+    for t in results[len(SYNC_KINDS)]:
+        deleted.setdefault(t["kind"], []).append({"id": t["id"], "rev": t["rev"]} if raw_tombstones else t["id"])
+    token = f"{cursor[0]}:{cursor[1]}" if cursor else str(max(token, since_rev))
+    return {"token": token, "full": full, "more": cursor is not None, "changes": changes, "deleted": deleted}
+
+# ---------------------
+# Live events (SSE)
+# ---------------------
+# One feed per worker (a change stream, or revision polling on a standalone mongod) fans compact diff
+# events out to every /events client. Each event is serialised once; each client gets a bounded queue and
+# a client that falls behind gets a single "resync" event in place of its backlog.
+EVENTS_QUEUE_SIZE = int(os.environ.get("EVENTS_QUEUE_SIZE", "256"))
+EVENTS_POLL_INTERVAL = float(os.environ.get("EVENTS_POLL_INTERVAL", "1"))
+# longest backoff between change stream reconnects
+EVENTS_RETRY_MAX = float(os.environ.get("EVENTS_RETRY_MAX", "30"))
+EVENTS_HEARTBEAT = float(os.environ.get("EVENTS_HEARTBEAT", "15"))
+BINARY_FIELDS = {"places": ("logo", "hasLogo", "logoHash"), "operators": ("logo", "hasLogo", "logoHash"), "categories": ("icon", "hasIcon", "iconHash")}
+
+def sse_frame(event: str, data: Dict[str, Any]) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dump_json(data) + b"\n\n"
+
+class EventHub:
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.clients: set = set()
+        self.mode = "idle"
+        self.published = 0
+        self.overflows = 0
+
+    def subscribe(self) -> asyncio.Queue:
+        q: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self.clients.add(q)
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue):
+        self.clients.discard(q)
+
+    def publish(self, frame: bytes):
+        self.published += 1
+        for q in self.clients:
+            try:
+                q.put_nowait(frame)
+            except asyncio.QueueFull:
+                # slow consumer: drop its backlog, it refetches via /sync instead
+                self.overflows += 1
+                while not q.empty():
+                    q.get_nowait()
+                q.put_nowait(sse_frame("resync", {}))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"clients": len(self.clients), "mode": self.mode, "published": self.published, "overflows": self.overflows}
+
+event_hub = EventHub(EVENTS_QUEUE_SIZE)
+
+def change_event(change: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    kind = change["ns"]["coll"]
+    op = change["operationType"]
+    doc = change.get("fullDocument")
+    if kind == "tombstones":
+        return {"kind": doc["kind"], "op": "delete", "id": doc["id"], "rev": doc["rev"]} if op == "insert" else None
+    if not doc:
+        # deleted before the update lookup ran; its tombstone event follows
+        return None
+    if op == "update":
+        desc = change.get("updateDescription") or {}
+        fields = {k: v for k, v in desc.get("updatedFields", {}).items() if "." not in k}
+        fields.update({k: None for k in desc.get("removedFields", []) if "." not in k})
+        binary = BINARY_FIELDS.get(kind)
+        if binary and any(k.split(".")[0] == binary[0] for k in [*desc.get("updatedFields", {}), *desc.get("removedFields", [])]):
+            fields.pop(binary[0], None)
+            fields[binary[1]] = bool(doc.get(binary[0]))
+            fields[binary[2]] = media_version(doc.get(binary[0]))
+    else:
+        strip = SYNC_STRIP.get(kind)
+        fields = strip(doc) if strip else {k: v for k, v in doc.items() if k != "_id"}
+    fields.pop("_id", None)
+    return {"kind": kind, "op": "upsert", "id": doc.get("id"), "rev": doc.get("rev"), "fields": fields}
+
+# Media bytes stay on the server: a usage toggle bumps its place's rev, and the update lookup would otherwise
+# ship the whole base64 logo with it. Events only need the media hash (hasLogo/logoHash)
+CHANGE_PIPELINE = [
+    {"$match": {
+        "ns.coll": {"$in": [*SYNC_KINDS, "tombstones"]},
+        "operationType": {"$in": ["insert", "update", "replace"]},
+    }},
+    {"$project": {
+        f"{path}.{field}.data": 0
+        for path in ("fullDocument", "updateDescription.updatedFields") for field in ("logo", "icon")
+    }},
+]
+
+LOCAL_REVS_MAX = 10000
+
+def observe_changes(events: List[Dict[str, Any]]):
+    """Bring this worker's caches and suggest index up to date with changes other workers made, as seen on the feed."""
+    remote = [e for e in events if e["rev"] not in local_revs]
+    bump_generation(*{e["kind"] for e in remote if e["kind"] in generations})
+    for e in remote:
+        suggest_index.apply(e)
+    if len(local_revs) > LOCAL_REVS_MAX:
+        # a revision's event arrives within a poll or two; anything older than the overlap is done with
+        horizon = current_rev() - SYNC_REV_OVERLAP
+        local_revs.difference_update([r for r in local_revs if r < horizon])
+
+async def watch_changes():
+    pipeline = CHANGE_PIPELINE
+    resume_token = None
+    failures = 0
+    while True:
+        try:
+            async with db.watch(pipeline, full_document="updateLookup", resume_after=resume_token) as stream:
+                event_hub.mode = "change_stream"
+                failures = 0
+                async for change in stream:
+                    resume_token = stream.resume_token
+                    event = change_event(change)
+                    if event:
+                        observe_changes([event])
+                        event_hub.publish(sse_frame("change", event))
+        except OperationFailure as e:
+            if e.code in (40573, 40324):
+                # standalone mongod: change streams need a replica set
+                logger.info("Change streams unavailable (%s); polling revisions for /events", e)
+                return await poll_changes()
+            if e.code == 286:
+                # the resume point fell off the oplog: start afresh, clients refetch what they missed via /sync
+                resume_token = None
+                event_hub.publish(sse_frame("resync", {}))
+            logger.warning("Change stream failed, resuming: %s", e)
+        except PyMongoError as e:
+            # AutoReconnect, ServerSelectionTimeoutError, ...: the server is away for now, the stream is not broken
+            logger.warning("Change stream interrupted, resuming: %s", e)
+        except Exception:
+            # not a server error: this client cannot open change streams at all
+            logger.exception("Change streams unusable; polling revisions for /events")
+            return await poll_changes()
+        failures += 1
+        await asyncio.sleep(min(EVENTS_RETRY_MAX, 2 ** (failures - 1)))
+
+async def poll_changes():
+    event_hub.mode = "polling"
+    baseline = current_rev()
+    cursor: Tuple[int, Optional[str]] = (baseline, None)
+    sent: Dict[tuple, int] = {}
+    while True:
+        # polls with nobody listening too: the changes still invalidate this worker's caches
+        await asyncio.sleep(EVENTS_POLL_INTERVAL)
+        try:
+            result = await collect_changes(*cursor, raw_tombstones=True)
+        except Exception:
+            logger.exception("Event polling failed")
+            continue
+        events = []
+        for kind, docs in result["changes"].items():
+            for d in docs:
+                events.append({"kind": kind, "op": "upsert", "id": d.get("id"), "rev": d.get("rev"), "fields": d})
+        for kind, tombs in result["deleted"].items():
+            for t in tombs:
+                events.append({"kind": kind, "op": "delete", "id": t["id"], "rev": t["rev"]})
+        # the sync overlap re-reads recent revisions; only what has not been seen goes out
+        fresh = []
+        for e in sorted(events, key=lambda e: e["rev"] or 0):
+            key = (e["kind"], e["id"], e["op"])
+            if (e["rev"] or 0) <= baseline or sent.get(key) == e["rev"]:
+                continue
+            sent[key] = e["rev"]
+            fresh.append(e)
+        observe_changes(fresh)
+        if event_hub.clients:
+            for e in fresh:
+                event_hub.publish(sse_frame("change", e))
+        cursor = parse_sync_token(result["token"])
+        horizon = cursor[0] - SYNC_REV_OVERLAP
+        sent = {k: r for k, r in sent.items() if (r or 0) > horizon}
+
+@api_router.get("/events")
+async def events(request: Request):
+    q = event_hub.subscribe()
+    token = current_rev()
+
+    async def stream():
+        try:
+            # the token lets a client fetch /sync?since= for anything before it connected
+            yield sse_frame("hello", {"token": str(token), "mode": event_hub.mode})
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(q.get(), timeout=EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+        finally:
+            event_hub.unsubscribe(q)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 app.include_router(api_router)
+
+
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MemorySamplingMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    # the service worker revalidates cross-origin list responses by their ETag
+    expose_headers=["ETag", "X-Cache"],
 )
 
 logging.basicConfig(
@@ -808,23 +2881,44 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+background_tasks: List[asyncio.Task] = []
+
+def start_background(coro):
+    background_tasks.append(asyncio.create_task(coro))
+
 @app.on_event("startup")
 async def startup_seed():
     # ensure indexes
     await db.numbers.create_index("id", unique=True)
     await db.places.create_index("id", unique=True)
     await db.operators.create_index("id", unique=True)
+    await db.categories.create_index("id", unique=True)
+    await backfill_name_keys()
+    await backfill_phone_digits()
+    await ensure_usage_pair_index()
+    if await db.places.count_documents({"usageCount": {"$exists": False}}, limit=1):
+        await rebuild_place_usage_counts()
+    if await db.numbers.count_documents({"usedCount": {"$exists": False}}, limit=1):
+        await rebuild_usage_summaries()
+    await ensure_place_sort_indexes()
+    await ensure_allocation_indexes()
+    await ensure_usage_event_collections()
+    await ensure_sync_indexes()
+    await ensure_media_hashes()
     # seed operators if empty
     cnt = await db.operators.count_documents({})
     if cnt == 0:
-        defaults = [
-            "МегаФон", "Билайн", "МТС", "T2", "T-Mobile", "СБЕР-Mobile", "Альфа-Mobile", "Газпром-Mobile", "YOTA", "Мотив", "Ростелеком"
-        ]
-        now = datetime.now(timezone.utc)
-        docs = [OperatorModel(name=n, createdAt=now).model_dump() for n in defaults]
-        if docs:
-            await db.operators.insert_many(docs)
+        await seed_default_operators()
+    await suggest_index.load()
+    start_background(usage_compaction_job())
+    start_background(usage_rollup_loop())
+    start_background(watch_changes())
+    start_background(loop_watchdog.run())
+    if USAGE_RECONCILE_INTERVAL > 0:
+        start_background(usage_reconcile_loop())
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for task in background_tasks:
+        task.cancel()
     client.close()
\ No newline at end of file
@@ -1,17 +1,28 @@
 #!/usr/bin/env python3
 
-import requests
+import asyncio
+import httpx
+import os
 import sys
 import json
 from pathlib import Path
+from urllib.parse import quote
 import time
 
+DEFAULT_BASE_URL = "https://promophone-plus.preview.emergentagent.com"
+ROOT_DIR = Path(__file__).resolve().parent
+
 class FIRSTAPITester:
-    def __init__(self, base_url="https://promophone-plus.preview.emergentagent.com"):
+    def __init__(self, base_url=DEFAULT_BASE_URL, client=None, admin_secret=None):
         self.base_url = base_url
         self.api_url = f"{base_url}/api"
+        # any httpx.AsyncClient: a plain one for a deployed URL, or one bound to the ASGI app in-process
+        self.client = client
+        self.admin_secret = admin_secret or os.environ.get("ADMIN_FIX_SECRET")
         self.tests_run = 0
         self.tests_passed = 0
+        # checks that returned False or raised, even when all of their requests got the expected status
+        self.failed_checks = []
         self.created_number_id = None
         self.created_place_id = None
         self.created_operator_id = None
@@ -22,7 +33,40 @@ class FIRSTAPITester:
     def log(self, message):
         print(f"🔍 {message}")
 
-    def run_test(self, name, method, endpoint, expected_status, data=None, files=None, is_multipart=False):
+    def admin(self, endpoint):
+        """Append the admin secret to an /admin or /metrics endpoint when one is configured"""
+        if not self.admin_secret:
+            return endpoint
+        return f"{endpoint}{'&' if '?' in endpoint else '?'}secret={self.admin_secret}"
+
+    async def metrics(self):
+        """GET /api/metrics and return {series: value}, e.g. 'first_event_clients' -> 0.0"""
+        r = await self.client.get(f"{self.api_url}{self.admin('/metrics')}")
+        if r.status_code != 200:
+            print(f"❌ /api/metrics unavailable: {r.status_code}")
+            return {}
+        series = {}
+        for line in r.text.splitlines():
+            if line and not line.startswith('#'):
+                name, _, value = line.rpartition(' ')
+                series[name] = float(value)
+        return series
+
+    async def run_checks(self, tests):
+        """Run check coroutines in order; returns the names of those that returned False or raised"""
+        failed = []
+        for test in tests:
+            try:
+                if not await test():
+                    failed.append(test.__name__)
+            except Exception as e:
+                print(f"❌ Test {test.__name__} failed with exception: {e}")
+                failed.append(test.__name__)
+            print("-" * 30)
+        self.failed_checks.extend(failed)
+        return failed
+
+    async def run_test(self, name, method, endpoint, expected_status, data=None, files=None, is_multipart=False):
         """Run a single API test"""
         url = f"{self.api_url}{endpoint}"
         headers = {}
@@ -36,16 +80,16 @@ class FIRSTAPITester:
         
         try:
             if method == 'GET':
-                response = requests.get(url, headers=headers)
+                response = await self.client.get(url, headers=headers)
             elif method == 'POST':
                 if is_multipart:
-                    response = requests.post(url, data=data, files=files)
+                    response = await self.client.post(url, data=data, files=files)
                 else:
-                    response = requests.post(url, json=data, headers=headers)
+                    response = await self.client.post(url, json=data, headers=headers)
             elif method == 'PUT':
-                response = requests.put(url, json=data, headers=headers)
+                response = await self.client.put(url, json=data, headers=headers)
             elif method == 'DELETE':
-                response = requests.delete(url, headers=headers)
+                response = await self.client.delete(url, headers=headers)
 
             success = response.status_code == expected_status
             if success:
@@ -67,25 +111,25 @@ class FIRSTAPITester:
             print(f"❌ FAILED - Error: {str(e)}")
             return False, {}
 
-    def test_root_endpoint(self):
+    async def test_root_endpoint(self):
         """Test GET /api/ - should return ready message"""
-        return self.run_test("Root endpoint", "GET", "/", 200)
+        return await self.run_test("Root endpoint", "GET", "/", 200)
 
-    def test_create_number(self):
+    async def test_create_number(self):
         """Test POST /api/numbers - create a number"""
         data = {
             "phone": f"+7999000{self.timestamp[-4:]}",  # Use timestamp for unique phone
             "operatorKey": "mts"
         }
-        success, response = self.run_test("Create number", "POST", "/numbers", 200, data)
+        success, response = await self.run_test("Create number", "POST", "/numbers", 200, data)
         if success and 'id' in response:
             self.created_number_id = response['id']
             self.log(f"Created number with ID: {self.created_number_id}")
         return success
 
-    def test_list_numbers(self):
+    async def test_list_numbers(self):
         """Test GET /api/numbers - should include created number"""
-        success, response = self.run_test("List numbers", "GET", "/numbers", 200)
+        success, response = await self.run_test("List numbers", "GET", "/numbers", 200)
         if success and self.created_number_id:
             # Check if our created number is in the list
             found = any(n.get('id') == self.created_number_id for n in response)
@@ -96,10 +140,10 @@ class FIRSTAPITester:
                 return False
         return success
 
-    def test_create_place_with_logo(self):
+    async def test_create_place_with_logo(self):
         """Test POST /api/places with multipart form data including logo"""
         # Use the MTS logo from the operators directory
-        logo_path = Path("/app/frontend/public/operators/mts.png")
+        logo_path = ROOT_DIR / "frontend" / "public" / "operators" / "mts.png"
         
         if not logo_path.exists():
             print(f"❌ Logo file not found at {logo_path}")
@@ -114,7 +158,7 @@ class FIRSTAPITester:
             files = {
                 'logo': ('mts.png', logo_file, 'image/png')
             }
-            success, response = self.run_test(
+            success, response = await self.run_test(
                 "Create place with logo", 
                 "POST", 
                 "/places", 
@@ -135,9 +179,9 @@ class FIRSTAPITester:
                 return False
         return success
 
-    def test_list_places(self):
+    async def test_list_places(self):
         """Test GET /api/places - should include created place"""
-        success, response = self.run_test("List places", "GET", "/places", 200)
+        success, response = await self.run_test("List places", "GET", "/places", 200)
         if success and self.created_place_id:
             # Check if our created place is in the list
             found = any(p.get('id') == self.created_place_id for p in response)
@@ -148,7 +192,7 @@ class FIRSTAPITester:
                 return False
         return success
 
-    def test_get_place_logo(self):
+    async def test_get_place_logo(self):
         """Test GET /api/places/{id}/logo - should return image"""
         if not self.created_place_id:
             print(f"❌ No place ID available for logo test")
@@ -159,7 +203,7 @@ class FIRSTAPITester:
         self.log(f"URL: {url}")
         
         try:
-            response = requests.get(url)
+            response = await self.client.get(url)
             self.tests_run += 1
             
             if response.status_code == 200:
@@ -178,7 +222,7 @@ class FIRSTAPITester:
             print(f"❌ FAILED - Error: {str(e)}")
             return False
 
-    def test_create_usage(self):
+    async def test_create_usage(self):
         """Test POST /api/usage - link number and place"""
         if not self.created_number_id or not self.created_place_id:
             print(f"❌ Missing number ID or place ID for usage test")
@@ -189,15 +233,15 @@ class FIRSTAPITester:
             "placeId": self.created_place_id,
             "used": True
         }
-        return self.run_test("Create usage", "POST", "/usage", 200, data)
+        return await self.run_test("Create usage", "POST", "/usage", 200, data)
 
-    def test_number_usage(self):
+    async def test_number_usage(self):
         """Test GET /api/numbers/{id}/usage - should show place in used"""
         if not self.created_number_id:
             print(f"❌ No number ID available for usage test")
             return False
             
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Get number usage", 
             "GET", 
             f"/numbers/{self.created_number_id}/usage", 
@@ -214,13 +258,13 @@ class FIRSTAPITester:
                 return False
         return success
 
-    def test_place_usage(self):
+    async def test_place_usage(self):
         """Test GET /api/places/{id}/usage - should show number in used"""
         if not self.created_place_id:
             print(f"❌ No place ID available for usage test")
             return False
             
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Get place usage", 
             "GET", 
             f"/places/{self.created_place_id}/usage", 
@@ -237,11 +281,11 @@ class FIRSTAPITester:
                 return False
         return success
 
-    def test_specific_place_neftl_promo(self):
+    async def test_specific_place_neftl_promo(self):
         """Test GET /api/places/{id} for НЕФТЛ place - should have hasPromo=true"""
         neftl_id = "c4c95482-5229-40bc-a5d1-9b555035235a"
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Get НЕФТЛ place details", 
             "GET", 
             f"/places/{neftl_id}", 
@@ -264,7 +308,7 @@ class FIRSTAPITester:
                 return False
         return success
 
-    def test_create_place_with_promo_code(self):
+    async def test_create_place_with_promo_code(self):
         """Test POST /api/places with promoCode - should have hasPromo=true"""
         data = {
             "name": f"PromoTest-Code-{self.timestamp}",
@@ -272,7 +316,7 @@ class FIRSTAPITester:
             "promoCode": "TEST123"
         }
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Create place with promo code", 
             "POST", 
             "/places", 
@@ -298,7 +342,7 @@ class FIRSTAPITester:
                 return False
         return success
 
-    def test_create_place_with_promo_url(self):
+    async def test_create_place_with_promo_url(self):
         """Test POST /api/places with promoUrl - should have hasPromo=true"""
         data = {
             "name": f"PromoTest-URL-{self.timestamp}",
@@ -306,7 +350,7 @@ class FIRSTAPITester:
             "promoUrl": "https://example.com/promo"
         }
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Create place with promo URL", 
             "POST", 
             "/places", 
@@ -332,7 +376,7 @@ class FIRSTAPITester:
                 return False
         return success
 
-    def test_create_place_with_both_promo_fields(self):
+    async def test_create_place_with_both_promo_fields(self):
         """Test POST /api/places with both promoCode and promoUrl - should have hasPromo=true"""
         data = {
             "name": f"PromoTest-Both-{self.timestamp}",
@@ -341,7 +385,7 @@ class FIRSTAPITester:
             "promoUrl": "https://example.com/both"
         }
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Create place with both promo fields", 
             "POST", 
             "/places", 
@@ -369,14 +413,14 @@ class FIRSTAPITester:
                 return False
         return success
 
-    def test_create_place_without_promo(self):
+    async def test_create_place_without_promo(self):
         """Test POST /api/places without promo fields - should have hasPromo=false"""
         data = {
             "name": f"NoPromoTest-{self.timestamp}",
             "category": "Тест"
         }
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Create place without promo", 
             "POST", 
             "/places", 
@@ -403,9 +447,9 @@ class FIRSTAPITester:
                 return False
         return success
 
-    def test_list_places_promo_flag(self):
+    async def test_list_places_promo_flag(self):
         """Test GET /api/places to verify hasPromo flag in list view"""
-        success, response = self.run_test("List places for promo check", "GET", "/places", 200)
+        success, response = await self.run_test("List places for promo check", "GET", "/places", 200)
         
         if success:
             # Look for places with and without promo
@@ -423,10 +467,10 @@ class FIRSTAPITester:
                 
         return success
 
-    def test_get_places_with_promo_details(self):
+    async def test_get_places_with_promo_details(self):
         """Test GET /api/places/{id} for places with different promo configurations"""
         # First get the list to find places with different promo setups
-        success, places_list = self.run_test("Get places list", "GET", "/places", 200)
+        success, places_list = await self.run_test("Get places list", "GET", "/places", 200)
         
         if not success:
             return False
@@ -451,7 +495,7 @@ class FIRSTAPITester:
         
         # Test place with only promoCode
         if place_with_code:
-            success, response = self.run_test(
+            success, response = await self.run_test(
                 f"Get place with promoCode ({place_with_code['name']})", 
                 "GET", 
                 f"/places/{place_with_code['id']}", 
@@ -466,7 +510,7 @@ class FIRSTAPITester:
         
         # Test place with only promoUrl
         if place_with_url:
-            success, response = self.run_test(
+            success, response = await self.run_test(
                 f"Get place with promoUrl ({place_with_url['name']})", 
                 "GET", 
                 f"/places/{place_with_url['id']}", 
@@ -481,7 +525,7 @@ class FIRSTAPITester:
         
         # Test place with both fields
         if place_with_both:
-            success, response = self.run_test(
+            success, response = await self.run_test(
                 f"Get place with both promo fields ({place_with_both['name']})", 
                 "GET", 
                 f"/places/{place_with_both['id']}", 
@@ -498,7 +542,7 @@ class FIRSTAPITester:
         
         # Test place without promo
         if place_without_promo:
-            success, response = self.run_test(
+            success, response = await self.run_test(
                 f"Get place without promo ({place_without_promo['name']})", 
                 "GET", 
                 f"/places/{place_without_promo['id']}", 
@@ -515,7 +559,7 @@ class FIRSTAPITester:
         
         return all_passed
 
-    def run_all_tests(self):
+    async def run_all_tests(self):
         """Run all API tests in sequence"""
         print("🚀 Starting FIRST API Tests")
         print("=" * 50)
@@ -532,62 +576,60 @@ class FIRSTAPITester:
             self.test_place_usage,
         ]
         
-        for test in tests:
-            try:
-                test()
-                print("-" * 30)
-            except Exception as e:
-                print(f"❌ Test {test.__name__} failed with exception: {e}")
-                print("-" * 30)
+        failed = await self.run_checks(tests)
         
         print("📊 Test Results:")
         print(f"   Tests run: {self.tests_run}")
         print(f"   Tests passed: {self.tests_passed}")
         print(f"   Success rate: {(self.tests_passed/self.tests_run*100):.1f}%")
         
-        return self.tests_passed == self.tests_run
+        return self.tests_passed == self.tests_run and not failed
 
-    def test_search_with_digits(self):
-        """Test GET /api/search with digit query - should return numbers"""
-        # Test with phone number digits
-        test_queries = ["79990001234", "999", "+7 999 000 12 34", "8 999 000 12 34"]
-        
-        for query in test_queries:
-            success, response = self.run_test(
-                f"Search with digits: '{query}'", 
-                "GET", 
-                f"/search?q={query}", 
-                200
-            )
-            
-            if success:
+    async def test_search_with_digits(self):
+        """Test GET /api/search with digit query - numbers by phone, plus places whose name contains the digits"""
+        # a place named with the digits must be found alongside numbers
+        created = await self.client.post(f"{self.api_url}/places", data={"name": f"Аптека {self.timestamp}", "category": "Магазины"})
+        test_queries = ["79990001234", "999", "+7 999 000 12 34", "8 999 000 12 34", self.timestamp]
+
+        try:
+            for query in test_queries:
+                success, response = await self.run_test(
+                    f"Search with digits: '{query}'", 
+                    "GET", 
+                    f"/search?q={quote(query)}", 
+                    200
+                )
+
+                if not success:
+                    return False
                 numbers = response.get('numbers', [])
                 places = response.get('places', [])
-                
-                # For digit queries, we should get numbers (might be empty if no matches)
-                if isinstance(numbers, list) and isinstance(places, list):
-                    print(f"✅ Search returned proper structure - Numbers: {len(numbers)}, Places: {len(places)}")
-                    # For digit queries, places should be empty
-                    if len(places) == 0:
-                        print(f"✅ Digit query correctly returned no places")
-                    else:
-                        print(f"❌ Digit query should not return places, got {len(places)}")
-                        return False
-                else:
+                if not isinstance(numbers, list) or not isinstance(places, list):
                     print(f"❌ Search response structure invalid")
                     return False
-            else:
+                print(f"✅ Search returned proper structure - Numbers: {len(numbers)}, Places: {len(places)}")
+                # digit queries may match places, but only by name or through a matched category
+                categories = {c.get('name') for c in response.get('categories', [])}
+                strays = [p['name'] for p in places if query.lower() not in p.get('name', '').lower() and p.get('category') not in categories]
+                if strays:
+                    print(f"❌ Digit query returned unrelated places: {strays}")
+                    return False
+            if created.status_code == 200 and not any(p['id'] == created.json()['id'] for p in places):
+                print(f"❌ Place named with the digits not found by '{self.timestamp}'")
                 return False
-        
+        finally:
+            if created.status_code == 200:
+                await self.client.delete(f"{self.api_url}/places/{created.json()['id']}")
+
         return True
 
-    def test_search_with_text(self):
+    async def test_search_with_text(self):
         """Test GET /api/search with text query - should return places"""
         # Test with place names
         test_queries = ["магнит", "Нефтл", "кафе", "test"]
         
         for query in test_queries:
-            success, response = self.run_test(
+            success, response = await self.run_test(
                 f"Search with text: '{query}'", 
                 "GET", 
                 f"/search?q={query}", 
@@ -615,7 +657,7 @@ class FIRSTAPITester:
         
         return True
 
-    def test_search_edge_cases(self):
+    async def test_search_edge_cases(self):
         """Test GET /api/search with edge cases"""
         edge_cases = [
             ("", "empty query"),
@@ -626,7 +668,7 @@ class FIRSTAPITester:
         ]
         
         for query, description in edge_cases:
-            success, response = self.run_test(
+            success, response = await self.run_test(
                 f"Search edge case - {description}: '{query}'", 
                 "GET", 
                 f"/search?q={query}", 
@@ -647,7 +689,7 @@ class FIRSTAPITester:
         
         return True
 
-    def test_search_partial_matches(self):
+    async def test_search_partial_matches(self):
         """Test GET /api/search with partial matches"""
         # First create some test data to search for
         test_number_phone = f"+7999888{self.timestamp[-4:]}"
@@ -658,7 +700,7 @@ class FIRSTAPITester:
             "phone": test_number_phone,
             "operatorKey": "mts"
         }
-        success, number_response = self.run_test("Create test number for search", "POST", "/numbers", 200, number_data)
+        success, number_response = await self.run_test("Create test number for search", "POST", "/numbers", 200, number_data)
         if not success:
             return False
         
@@ -667,7 +709,7 @@ class FIRSTAPITester:
             "name": test_place_name,
             "category": "Тест"
         }
-        success, place_response = self.run_test(
+        success, place_response = await self.run_test(
             "Create test place for search", 
             "POST", 
             "/places", 
@@ -681,7 +723,7 @@ class FIRSTAPITester:
         
         # Test partial number search
         partial_digits = test_number_phone.replace("+7", "").replace(" ", "")[:6]  # First 6 digits
-        success, response = self.run_test(
+        success, response = await self.run_test(
             f"Search partial number: '{partial_digits}'", 
             "GET", 
             f"/search?q={partial_digits}", 
@@ -690,7 +732,7 @@ class FIRSTAPITester:
         
         if success:
             numbers = response.get('numbers', [])
-            found = any(n.get('phone') == test_number_phone for n in numbers)
+            found = any(n.get('id') == number_response.get('id') for n in numbers)
             if found:
                 print(f"✅ Partial number search found created number")
             else:
@@ -701,7 +743,7 @@ class FIRSTAPITester:
         
         # Test partial place search
         partial_name = test_place_name[:8]  # First 8 characters
-        success, response = self.run_test(
+        success, response = await self.run_test(
             f"Search partial place: '{partial_name}'", 
             "GET", 
             f"/search?q={partial_name}", 
@@ -721,7 +763,7 @@ class FIRSTAPITester:
         
         return True
 
-    def test_create_number_from_search(self):
+    async def test_create_number_from_search(self):
         """Test POST /api/numbers - create number from search dialog"""
         # Test creating a number as would happen from search dialog
         search_phone = f"+7888777{self.timestamp[-4:]}"
@@ -731,7 +773,7 @@ class FIRSTAPITester:
             "operatorKey": "beeline"
         }
         
-        success, response = self.run_test("Create number from search dialog", "POST", "/numbers", 200, data)
+        success, response = await self.run_test("Create number from search dialog", "POST", "/numbers", 200, data)
         
         if success:
             # Verify the created number has correct format
@@ -741,7 +783,7 @@ class FIRSTAPITester:
                 
                 # Verify it can be found in search
                 digits = created_phone.replace('+7', '').replace(' ', '')[:6]
-                search_success, search_response = self.run_test(
+                search_success, search_response = await self.run_test(
                     f"Search for created number: '{digits}'", 
                     "GET", 
                     f"/search?q={digits}", 
@@ -766,7 +808,7 @@ class FIRSTAPITester:
         
         return True
 
-    def test_create_place_from_search(self):
+    async def test_create_place_from_search(self):
         """Test POST /api/places - create place from search dialog with all fields"""
         # Test creating a place as would happen from search dialog
         search_place_name = f"SearchPlace-{self.timestamp}"
@@ -778,7 +820,7 @@ class FIRSTAPITester:
             "promoUrl": "https://example.com/search-promo"
         }
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Create place from search dialog", 
             "POST", 
             "/places", 
@@ -804,7 +846,7 @@ class FIRSTAPITester:
                 print(f"✅ Place created with all correct fields")
                 
                 # Verify it can be found in search
-                search_success, search_response = self.run_test(
+                search_success, search_response = await self.run_test(
                     f"Search for created place: '{search_place_name[:8]}'", 
                     "GET", 
                     f"/search?q={search_place_name[:8]}", 
@@ -831,7 +873,7 @@ class FIRSTAPITester:
         
         return True
 
-    def test_search_differentiation(self):
+    async def test_search_differentiation(self):
         """Test that search correctly differentiates between number and place queries"""
         test_cases = [
             ("79990001234", "digits", "numbers"),
@@ -844,7 +886,7 @@ class FIRSTAPITester:
         ]
         
         for query, description, expected_type in test_cases:
-            success, response = self.run_test(
+            success, response = await self.run_test(
                 f"Search differentiation - {description}: '{query}'", 
                 "GET", 
                 f"/search?q={query}", 
@@ -872,7 +914,54 @@ class FIRSTAPITester:
         
         return True
 
-    def run_search_tests(self):
+    async def test_search_federated(self):
+        """Test GET /api/search matches operators/categories and reports per-source timings"""
+        success, response = await self.run_test("Federated search by operator name: 'МТС'", "GET", "/search?q=МТС", 200)
+        if not success:
+            return False
+        for key in ['numbers', 'places', 'operators', 'categories', 'timings']:
+            if key not in response:
+                print(f"❌ Missing '{key}' in search response")
+                return False
+        if not any(o.get('name') == 'МТС' for o in response['operators']):
+            print(f"❌ Operator МТС not matched")
+            return False
+        if any(n.get('operatorKey') != 'mts' for n in response['numbers']):
+            print(f"❌ Operator expansion returned numbers of another operator")
+            return False
+        for source in ['numbers', 'places', 'operators', 'categories', 'total']:
+            if source not in response['timings']:
+                print(f"❌ Missing timing for source '{source}'")
+                return False
+        print(f"✅ Federated search returned operators, expanded numbers and timings")
+
+        success, response = await self.run_test("Federated search global limit", "GET", "/search?q=а&limit=3", 200)
+        if success and sum(len(response.get(k, [])) for k in ['numbers', 'places', 'operators', 'categories']) > 3:
+            print(f"❌ Global limit not applied")
+            return False
+        return success
+
+    async def test_suggest(self):
+        """Test GET /api/suggest - prefix autocomplete over place names and phone digits"""
+        success, response = await self.run_test("Suggest by phone prefix: '999'", "GET", "/suggest?q=999", 200)
+        if not success:
+            return False
+        if 'numbers' not in response or 'places' not in response:
+            print(f"❌ Suggest response missing numbers/places")
+            return False
+        if any(not n.get('phone', '').startswith('+7 999') for n in response['numbers']):
+            print(f"❌ Suggest returned a number outside the prefix")
+            return False
+
+        success, response = await self.run_test("Suggest by place prefix: 'маг'", "GET", "/suggest?q=маг&limit=5", 200)
+        if success:
+            if len(response.get('places', [])) > 5:
+                print(f"❌ Suggest limit not applied")
+                return False
+            print(f"✅ Suggest returned {len(response.get('places', []))} places")
+        return success
+
+    async def run_search_tests(self):
         """Run search functionality tests as requested in review"""
         print("🔍 Starting Search Functionality Tests")
         print("=" * 50)
@@ -885,31 +974,27 @@ class FIRSTAPITester:
             self.test_create_number_from_search,
             self.test_create_place_from_search,
             self.test_search_differentiation,
+            self.test_search_federated,
+            self.test_suggest,
         ]
         
-        for test in search_tests:
-            try:
-                test()
-                print("-" * 30)
-            except Exception as e:
-                print(f"❌ Test {test.__name__} failed with exception: {e}")
-                print("-" * 30)
+        failed = await self.run_checks(search_tests)
         
         print("📊 Search Test Results:")
         print(f"   Tests run: {self.tests_run}")
         print(f"   Tests passed: {self.tests_passed}")
         print(f"   Success rate: {(self.tests_passed/self.tests_run*100):.1f}%")
         
-        return self.tests_passed == self.tests_run
+        return self.tests_passed == self.tests_run and not failed
 
-    def test_admin_fix_timestamps(self):
+    async def test_admin_fix_timestamps(self):
         """Test POST /api/admin/fix_timestamps - shift legacy timestamps by +3h"""
         # First, let's get some existing records to check timestamps before fix
         print("📅 Getting existing records before timestamp fix...")
         
         # Get some numbers and places to check their timestamps
-        numbers_success, numbers_before = self.run_test("Get numbers before fix", "GET", "/numbers", 200)
-        places_success, places_before = self.run_test("Get places before fix", "GET", "/places", 200)
+        numbers_success, numbers_before = await self.run_test("Get numbers before fix", "GET", "/numbers", 200)
+        places_success, places_before = await self.run_test("Get places before fix", "GET", "/places", 200)
         
         if not numbers_success or not places_success:
             print("❌ Could not get existing records for timestamp comparison")
@@ -923,10 +1008,10 @@ class FIRSTAPITester:
             sample_timestamps_before['place_1'] = places_before[0].get('createdAt')
         
         # Call the admin fix endpoint
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Admin fix timestamps (+3h shift)", 
             "POST", 
-            "/admin/fix_timestamps", 
+            self.admin("/admin/fix_timestamps"),
             200
         )
         
@@ -959,11 +1044,11 @@ class FIRSTAPITester:
         print(f"✅ Timestamp fix completed: {numbers_fixed} numbers, {places_fixed} places")
         
         # Now fetch some records to verify timestamps are shifted by +3h
-        success, numbers_after = self.run_test("Get numbers after fix", "GET", "/numbers", 200)
+        success, numbers_after = await self.run_test("Get numbers after fix", "GET", "/numbers", 200)
         if not success:
             return False
         
-        success, places_after = self.run_test("Get places after fix", "GET", "/places", 200)
+        success, places_after = await self.run_test("Get places after fix", "GET", "/places", 200)
         if not success:
             return False
         
@@ -1072,7 +1157,7 @@ class FIRSTAPITester:
             print("❌ Admin timestamp fix has issues")
             return False
 
-    def run_promo_tests(self):
+    async def run_promo_tests(self):
         """Run promo-specific API tests"""
         print("🎯 Starting Promo Feature Tests")
         print("=" * 50)
@@ -1088,24 +1173,18 @@ class FIRSTAPITester:
             # self.test_create_place_without_promo,
         ]
         
-        for test in promo_tests:
-            try:
-                test()
-                print("-" * 30)
-            except Exception as e:
-                print(f"❌ Test {test.__name__} failed with exception: {e}")
-                print("-" * 30)
+        failed = await self.run_checks(promo_tests)
         
         print("📊 Promo Test Results:")
         print(f"   Tests run: {self.tests_run}")
         print(f"   Tests passed: {self.tests_passed}")
         print(f"   Success rate: {(self.tests_passed/self.tests_run*100):.1f}%")
         
-        return self.tests_passed == self.tests_run
+        return self.tests_passed == self.tests_run and not failed
 
-    def test_list_operators(self):
+    async def test_list_operators(self):
         """Test GET /api/operators - should return list of operators with proper structure"""
-        success, response = self.run_test("List operators", "GET", "/operators", 200)
+        success, response = await self.run_test("List operators", "GET", "/operators", 200)
         
         if not success:
             return False
@@ -1169,10 +1248,10 @@ class FIRSTAPITester:
         
         return True
 
-    def test_get_operator_details(self):
+    async def test_get_operator_details(self):
         """Test GET /api/operators/{id} - should return operator details"""
         # First get the list to find an operator ID
-        success, operators_list = self.run_test("Get operators list for details test", "GET", "/operators", 200)
+        success, operators_list = await self.run_test("Get operators list for details test", "GET", "/operators", 200)
         
         if not success or not operators_list:
             print(f"❌ Could not get operators list for details test")
@@ -1182,7 +1261,7 @@ class FIRSTAPITester:
         first_operator = operators_list[0]
         operator_id = first_operator['id']
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             f"Get operator details ({first_operator['name']})", 
             "GET", 
             f"/operators/{operator_id}", 
@@ -1219,14 +1298,14 @@ class FIRSTAPITester:
         
         return True
 
-    def test_operators_consistency(self):
+    async def test_operators_consistency(self):
         """Test that operators list is consistent between calls"""
         # Get operators list twice and compare
-        success1, response1 = self.run_test("Get operators list (first call)", "GET", "/operators", 200)
+        success1, response1 = await self.run_test("Get operators list (first call)", "GET", "/operators", 200)
         if not success1:
             return False
         
-        success2, response2 = self.run_test("Get operators list (second call)", "GET", "/operators", 200)
+        success2, response2 = await self.run_test("Get operators list (second call)", "GET", "/operators", 200)
         if not success2:
             return False
         
@@ -1247,9 +1326,9 @@ class FIRSTAPITester:
         
         return True
 
-    def test_operators_for_frontend_sync(self):
+    async def test_operators_for_frontend_sync(self):
         """Test operators endpoint specifically for frontend sync functionality"""
-        success, response = self.run_test("Get operators for frontend sync", "GET", "/operators", 200)
+        success, response = await self.run_test("Get operators for frontend sync", "GET", "/operators", 200)
         
         if not success:
             return False
@@ -1295,13 +1374,13 @@ class FIRSTAPITester:
         
         return True
 
-    def test_create_operator_without_logo(self):
+    async def test_create_operator_without_logo(self):
         """Test POST /api/operators without logo"""
         data = {
             "name": f"ТестОператор-{self.timestamp}"
         }
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Create operator without logo", 
             "POST", 
             "/operators", 
@@ -1333,7 +1412,7 @@ class FIRSTAPITester:
         
         return success
 
-    def test_create_operator_with_logo(self):
+    async def test_create_operator_with_logo(self):
         """Test POST /api/operators with logo"""
         # Use a small test image (create a minimal PNG)
         import base64
@@ -1350,7 +1429,7 @@ class FIRSTAPITester:
             'logo': ('test.png', minimal_png, 'image/png')
         }
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Create operator with logo", 
             "POST", 
             "/operators", 
@@ -1375,7 +1454,7 @@ class FIRSTAPITester:
         
         return success
 
-    def test_get_operator_logo(self):
+    async def test_get_operator_logo(self):
         """Test GET /api/operators/{id}/logo when hasLogo is true"""
         if not hasattr(self, 'created_operator_with_logo_id') or not self.created_operator_with_logo_id:
             print(f"❌ No operator with logo available for logo test")
@@ -1386,7 +1465,7 @@ class FIRSTAPITester:
         self.log(f"URL: {url}")
         
         try:
-            response = requests.get(url)
+            response = await self.client.get(url)
             self.tests_run += 1
             
             if response.status_code == 200:
@@ -1405,7 +1484,7 @@ class FIRSTAPITester:
             print(f"❌ FAILED - Error: {str(e)}")
             return False
 
-    def test_update_operator_name(self):
+    async def test_update_operator_name(self):
         """Test PUT /api/operators/{id} to update name"""
         if not hasattr(self, 'created_operator_id') or not self.created_operator_id:
             print(f"❌ No operator available for update test")
@@ -1420,7 +1499,7 @@ class FIRSTAPITester:
         
         try:
             data = {"name": new_name}
-            response = requests.put(url, data=data)
+            response = await self.client.put(url, data=data)
             self.tests_run += 1
             
             if response.status_code == 200:
@@ -1444,12 +1523,12 @@ class FIRSTAPITester:
             print(f"❌ FAILED - Error: {str(e)}")
             return False
 
-    def test_delete_operator_main_flow(self):
+    async def test_delete_operator_main_flow(self):
         """Test DELETE /api/operators/{id} - main deletion flow as requested"""
         print("🗑️ Testing DELETE operator main flow...")
         
         # Step 1: List operators to get initial count
-        success, initial_list = self.run_test("List operators (before create)", "GET", "/operators", 200)
+        success, initial_list = await self.run_test("List operators (before create)", "GET", "/operators", 200)
         if not success:
             return False
         
@@ -1462,7 +1541,7 @@ class FIRSTAPITester:
             "name": temp_name
         }
         
-        success, create_response = self.run_test(
+        success, create_response = await self.run_test(
             "Create temp operator for deletion", 
             "POST", 
             "/operators", 
@@ -1480,7 +1559,7 @@ class FIRSTAPITester:
         print(f"✅ Created temp operator '{temp_name}' with ID: {temp_operator_id}")
         
         # Step 3: Ensure it appears in GET list
-        success, after_create_list = self.run_test("List operators (after create)", "GET", "/operators", 200)
+        success, after_create_list = await self.run_test("List operators (after create)", "GET", "/operators", 200)
         if not success:
             return False
         
@@ -1495,7 +1574,7 @@ class FIRSTAPITester:
         print(f"✅ Operators count after create: {after_create_count}")
         
         # Step 4: Delete it via DELETE /api/operators/{id}
-        success, delete_response = self.run_test(
+        success, delete_response = await self.run_test(
             f"Delete temp operator ({temp_name})", 
             "DELETE", 
             f"/operators/{temp_operator_id}", 
@@ -1513,7 +1592,7 @@ class FIRSTAPITester:
         print(f"✅ Temp operator deleted successfully")
         
         # Step 5: Ensure it no longer appears in GET list
-        success, after_delete_list = self.run_test("List operators (after delete)", "GET", "/operators", 200)
+        success, after_delete_list = await self.run_test("List operators (after delete)", "GET", "/operators", 200)
         if not success:
             return False
         
@@ -1535,12 +1614,12 @@ class FIRSTAPITester:
         print(f"✅ DELETE operator main flow completed successfully")
         return True
 
-    def test_delete_nonexistent_operator(self):
+    async def test_delete_nonexistent_operator(self):
         """Test DELETE /api/operators/{id} with non-existing ID - should return 404"""
         # Use a fake UUID that doesn't exist
         fake_id = "00000000-0000-0000-0000-000000000000"
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Delete non-existent operator (should fail)", 
             "DELETE", 
             f"/operators/{fake_id}", 
@@ -1557,7 +1636,7 @@ class FIRSTAPITester:
         
         return success
 
-    def run_operators_tests(self):
+    async def run_operators_tests(self):
         """Run operators-specific API tests for sync functionality"""
         print("📱 Starting Operators Sync Tests")
         print("=" * 50)
@@ -1569,22 +1648,16 @@ class FIRSTAPITester:
             self.test_operators_for_frontend_sync,
         ]
         
-        for test in operators_tests:
-            try:
-                test()
-                print("-" * 30)
-            except Exception as e:
-                print(f"❌ Test {test.__name__} failed with exception: {e}")
-                print("-" * 30)
+        failed = await self.run_checks(operators_tests)
         
         print("📊 Operators Test Results:")
         print(f"   Tests run: {self.tests_run}")
         print(f"   Tests passed: {self.tests_passed}")
         print(f"   Success rate: {(self.tests_passed/self.tests_run*100):.1f}%")
         
-        return self.tests_passed == self.tests_run
+        return self.tests_passed == self.tests_run and not failed
 
-    def test_create_place_without_logo_comprehensive(self):
+    async def test_create_place_without_logo_comprehensive(self):
         """Test POST /api/places - successful creation without logo (Review Request #1)"""
         place_name = f"МестоБезЛого-{self.timestamp}"
         
@@ -1594,7 +1667,7 @@ class FIRSTAPITester:
             "comment": "Тестовое место без логотипа"
         }
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Create place without logo (comprehensive)", 
             "POST", 
             "/places", 
@@ -1641,7 +1714,7 @@ class FIRSTAPITester:
         
         return success
 
-    def test_create_place_with_small_logo(self):
+    async def test_create_place_with_small_logo(self):
         """Test POST /api/places - creation with small logo <50KB (Review Request #2)"""
         place_name = f"МестоСЛого-{self.timestamp}"
         
@@ -1662,7 +1735,7 @@ class FIRSTAPITester:
             'logo': ('small_logo.png', minimal_png, 'image/png')
         }
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Create place with small logo (<50KB)", 
             "POST", 
             "/places", 
@@ -1704,13 +1777,13 @@ class FIRSTAPITester:
         
         return success
 
-    def test_get_place_details_no_id_no_logo(self):
+    async def test_get_place_details_no_id_no_logo(self):
         """Test GET /api/places/{id} - should not contain _id and logo (Review Request #4)"""
         if not hasattr(self, 'created_place_with_logo_id') or not self.created_place_with_logo_id:
             print(f"❌ No place with logo available for details test")
             return False
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Get place details (should exclude _id and logo)", 
             "GET", 
             f"/places/{self.created_place_with_logo_id}", 
@@ -1751,7 +1824,7 @@ class FIRSTAPITester:
         
         return success
 
-    def test_create_place_duplicate_name_case_insensitive(self):
+    async def test_create_place_duplicate_name_case_insensitive(self):
         """Test POST /api/places - duplicate name (case-insensitive) should return 409 (Review Request #5)"""
         # First create a place with a specific name
         original_name = f"ДубликатТест-{self.timestamp}"
@@ -1761,7 +1834,7 @@ class FIRSTAPITester:
             "category": "Тест"
         }
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Create original place for duplicate test", 
             "POST", 
             "/places", 
@@ -1782,7 +1855,9 @@ class FIRSTAPITester:
             original_name.upper(),  # ALL UPPERCASE
             original_name.lower(),  # all lowercase
             original_name.capitalize(),  # First letter capitalized
-            original_name  # Exact same name
+            original_name,  # Exact same name
+            f"  {original_name.upper()}  ",  # Surrounding whitespace (nameKey collapses it)
+            original_name.replace("-", "－"),  # Fullwidth hyphen (NFKC folds it)
         ]
         
         all_duplicates_rejected = True
@@ -1793,7 +1868,7 @@ class FIRSTAPITester:
                 "category": "Другая категория"
             }
             
-            success, response = self.run_test(
+            success, response = await self.run_test(
                 f"Try create duplicate place: '{duplicate_name}'", 
                 "POST", 
                 "/places", 
@@ -1821,24 +1896,24 @@ class FIRSTAPITester:
         
         return all_duplicates_rejected
 
-    def test_places_comprehensive_flow(self):
+    async def test_places_comprehensive_flow(self):
         """Test complete places flow covering all review requirements"""
         print("🏢 Testing comprehensive places flow as per review request...")
         
         # Test 1: Create place without logo
-        test1_success = self.test_create_place_without_logo_comprehensive()
+        test1_success = await self.test_create_place_without_logo_comprehensive()
         print(f"✅ Test 1 (Create without logo): {'PASSED' if test1_success else 'FAILED'}")
         
         # Test 2: Create place with small logo
-        test2_success = self.test_create_place_with_small_logo()
+        test2_success = await self.test_create_place_with_small_logo()
         print(f"✅ Test 2 (Create with small logo): {'PASSED' if test2_success else 'FAILED'}")
         
         # Test 3: Verify GET place details excludes _id and logo
-        test3_success = self.test_get_place_details_no_id_no_logo()
+        test3_success = await self.test_get_place_details_no_id_no_logo()
         print(f"✅ Test 3 (GET details excludes _id/logo): {'PASSED' if test3_success else 'FAILED'}")
         
         # Test 4: Test duplicate name rejection (case-insensitive)
-        test4_success = self.test_create_place_duplicate_name_case_insensitive()
+        test4_success = await self.test_create_place_duplicate_name_case_insensitive()
         print(f"✅ Test 4 (Duplicate name rejection): {'PASSED' if test4_success else 'FAILED'}")
         
         all_tests_passed = test1_success and test2_success and test3_success and test4_success
@@ -1849,7 +1924,7 @@ class FIRSTAPITester:
         
         return all_tests_passed
 
-    def run_places_review_tests(self):
+    async def run_places_review_tests(self):
         """Run places tests as specifically requested in the review"""
         print("🏢 Starting Places Review Tests (Russian Request)")
         print("=" * 50)
@@ -1866,7 +1941,7 @@ class FIRSTAPITester:
         initial_tests_passed = self.tests_passed
         
         # Run the comprehensive flow test
-        comprehensive_success = self.test_places_comprehensive_flow()
+        comprehensive_success = await self.test_places_comprehensive_flow()
         
         # Calculate results for this test suite only
         suite_tests_run = self.tests_run - initial_tests_run
@@ -1879,7 +1954,7 @@ class FIRSTAPITester:
         
         return comprehensive_success
 
-    def run_operators_delete_tests(self):
+    async def run_operators_delete_tests(self):
         """Run comprehensive DELETE operators tests as requested in review"""
         print("🗑️ Starting Operators DELETE Tests")
         print("=" * 50)
@@ -1904,13 +1979,7 @@ class FIRSTAPITester:
             self.test_delete_nonexistent_operator,
         ]
         
-        for test in delete_tests:
-            try:
-                test()
-                print("-" * 30)
-            except Exception as e:
-                print(f"❌ Test {test.__name__} failed with exception: {e}")
-                print("-" * 30)
+        failed = await self.run_checks(delete_tests)
         
         # Calculate results for this test suite only
         suite_tests_run = self.tests_run - initial_tests_run
@@ -1921,9 +1990,9 @@ class FIRSTAPITester:
         print(f"   Tests passed: {suite_tests_passed}")
         print(f"   Success rate: {(suite_tests_passed/suite_tests_run*100):.1f}%")
         
-        return suite_tests_passed == suite_tests_run
+        return suite_tests_passed == suite_tests_run and not failed
 
-    def run_admin_tests(self):
+    async def run_admin_tests(self):
         """Run admin-specific API tests"""
         print("🔧 Starting Admin Feature Tests")
         print("=" * 50)
@@ -1932,28 +2001,22 @@ class FIRSTAPITester:
             self.test_admin_fix_timestamps,
         ]
         
-        for test in admin_tests:
-            try:
-                test()
-                print("-" * 30)
-            except Exception as e:
-                print(f"❌ Test {test.__name__} failed with exception: {e}")
-                print("-" * 30)
+        failed = await self.run_checks(admin_tests)
         
         print("📊 Admin Test Results:")
         print(f"   Tests run: {self.tests_run}")
         print(f"   Tests passed: {self.tests_passed}")
         print(f"   Success rate: {(self.tests_passed/self.tests_run*100):.1f}%")
         
-        return self.tests_passed == self.tests_run
+        return self.tests_passed == self.tests_run and not failed
 
-    def test_create_category_temp(self):
+    async def test_create_category_temp(self):
         """Test POST /api/categories - create temporary category for deletion test"""
         data = {
             "name": "ТестКатегория_UD1"
         }
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Create temporary category (ТестКатегория_UD1)", 
             "POST", 
             "/categories", 
@@ -1985,9 +2048,9 @@ class FIRSTAPITester:
         
         return success
 
-    def test_list_categories_contains_temp(self):
+    async def test_list_categories_contains_temp(self):
         """Test GET /api/categories - should include created temporary category"""
-        success, response = self.run_test("List categories (should contain temp)", "GET", "/categories", 200)
+        success, response = await self.run_test("List categories (should contain temp)", "GET", "/categories", 200)
         
         if not success:
             return False
@@ -2009,13 +2072,13 @@ class FIRSTAPITester:
         print(f"✅ Categories list contains {len(response)} categories")
         return success
 
-    def test_delete_category_main_flow(self):
+    async def test_delete_category_main_flow(self):
         """Test DELETE /api/categories/{id} - main deletion flow as requested"""
         if not hasattr(self, 'created_category_id') or not self.created_category_id:
             print(f"❌ No category available for delete test")
             return False
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             f"Delete category (ТестКатегория_UD1)", 
             "DELETE", 
             f"/categories/{self.created_category_id}", 
@@ -2033,9 +2096,9 @@ class FIRSTAPITester:
         print(f"✅ Category deleted successfully")
         return True
 
-    def test_list_categories_after_delete(self):
+    async def test_list_categories_after_delete(self):
         """Test GET /api/categories - should NOT include deleted category"""
-        success, response = self.run_test("List categories (after delete)", "GET", "/categories", 200)
+        success, response = await self.run_test("List categories (after delete)", "GET", "/categories", 200)
         
         if not success:
             return False
@@ -2051,13 +2114,13 @@ class FIRSTAPITester:
         
         return success
 
-    def test_delete_category_again_404(self):
+    async def test_delete_category_again_404(self):
         """Test DELETE /api/categories/{id} again - should return 404"""
         if not hasattr(self, 'created_category_id') or not self.created_category_id:
             print(f"❌ No category ID available for 404 test")
             return False
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Delete same category again (should fail with 404)", 
             "DELETE", 
             f"/categories/{self.created_category_id}", 
@@ -2074,14 +2137,14 @@ class FIRSTAPITester:
         
         return success
 
-    def test_create_duplicate_category_409(self):
+    async def test_create_duplicate_category_409(self):
         """Test POST /api/categories with duplicate name - should return 409"""
         # Create first category
         data = {
             "name": f"ДубликатТест-{self.timestamp}"
         }
         
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Create category for duplicate test", 
             "POST", 
             "/categories", 
@@ -2095,7 +2158,7 @@ class FIRSTAPITester:
             return False
         
         # Try to create the same category again - should fail with 409
-        success, response = self.run_test(
+        success, response = await self.run_test(
             "Create duplicate category (should fail with 409)", 
             "POST", 
             "/categories", 
@@ -2115,14 +2178,14 @@ class FIRSTAPITester:
         
         return success
 
-    def test_update_category_success(self):
+    async def test_update_category_success(self):
         """Test PUT /api/categories/{id} with new name - should work"""
         # First create a category to update
         data = {
             "name": f"ОбновитьТест-{self.timestamp}"
         }
         
-        success, create_response = self.run_test(
+        success, create_response = await self.run_test(
             "Create category for update test", 
             "POST", 
             "/categories", 
@@ -2149,7 +2212,7 @@ class FIRSTAPITester:
         self.log(f"URL: {url}")
         
         try:
-            response = requests.put(url, data=update_data)
+            response = await self.client.put(url, data=update_data)
             self.tests_run += 1
             
             if response.status_code == 200:
@@ -2183,7 +2246,7 @@ class FIRSTAPITester:
         
         return success
 
-    def test_update_nonexistent_category_404(self):
+    async def test_update_nonexistent_category_404(self):
         """Test PUT /api/categories/{id} with non-existent ID - should return 404"""
         # Use a fake UUID that doesn't exist
         fake_id = "00000000-0000-0000-0000-000000000000"
@@ -2198,7 +2261,7 @@ class FIRSTAPITester:
         self.log(f"URL: {url}")
         
         try:
-            response = requests.put(url, data=data)
+            response = await self.client.put(url, data=data)
             self.tests_run += 1
             
             if response.status_code == 404:
@@ -2232,7 +2295,7 @@ class FIRSTAPITester:
         
         return success
 
-    def run_categories_delete_tests(self):
+    async def run_categories_delete_tests(self):
         """Run comprehensive Categories DELETE tests as requested in review"""
         print("🗂️ Starting Categories DELETE Tests")
         print("=" * 50)
@@ -2264,13 +2327,7 @@ class FIRSTAPITester:
             self.test_update_nonexistent_category_404,
         ]
         
-        for test in delete_tests:
-            try:
-                test()
-                print("-" * 30)
-            except Exception as e:
-                print(f"❌ Test {test.__name__} failed with exception: {e}")
-                print("-" * 30)
+        failed = await self.run_checks(delete_tests)
         
         # Calculate results for this test suite only
         suite_tests_run = self.tests_run - initial_tests_run
@@ -2281,37 +2338,540 @@ class FIRSTAPITester:
         print(f"   Tests passed: {suite_tests_passed}")
         print(f"   Success rate: {(suite_tests_passed/suite_tests_run*100):.1f}%")
         
-        return suite_tests_passed == suite_tests_run
+        return suite_tests_passed == suite_tests_run and not failed
+    async def test_query_cache(self):
+        """Test GET /api/places result cache: repeat is a HIT, a write invalidates, counters in /api/metrics"""
+        self.tests_run += 1
+        url = f"{self.api_url}/places?sort=popular"
+        await self.client.get(url)
+        second = await self.client.get(url)
+        if second.headers.get('X-Cache') != 'HIT':
+            print(f"❌ Repeated /places request was not served from cache (X-Cache={second.headers.get('X-Cache')})")
+            return False
+        created = await self.client.post(f"{self.api_url}/places", data={"name": f"Кэш-{self.timestamp}", "category": "Магазины"})
+        after_write = await self.client.get(url)
+        # a padded search shares the cache entry of the trimmed one, so both must find the place
+        searches = [(await self.client.get(f"{self.api_url}/places", params={"q": q})).json() for q in (f" Кэш-{self.timestamp}", f"Кэш-{self.timestamp}")]
+        if created.status_code == 200:
+            await self.client.delete(f"{self.api_url}/places/{created.json()['id']}")
+        if after_write.headers.get('X-Cache') != 'MISS':
+            print(f"❌ Write did not invalidate cached /places result")
+            return False
+        if created.status_code == 200 and not all(any(p.get('id') == created.json()['id'] for p in found) for found in searches):
+            print(f"❌ Padded and trimmed /places searches disagree: {[len(found) for found in searches]}")
+            return False
+        series = await self.metrics()
+        stats = {k: v for k, v in series.items() if 'cache="query"' in k}
+        for field in ['result="hit"', 'result="miss"', 'reason="lru"']:
+            if not any(field in k for k in stats):
+                print(f"❌ Missing query cache counter '{field}' in metrics")
+                return False
+        self.tests_passed += 1
+        print(f"✅ Query cache HIT/MISS and metrics counters OK: {stats}")
+        return True
+
+    async def test_single_flight_burst(self):
+        """Test a burst of identical concurrent reads returns identical bodies and reports coalescing stats"""
+        self.tests_run += 1
+        url = f"{self.api_url}/operators"
+        responses = await asyncio.gather(*(self.client.get(url) for _ in range(20)))
+        if any(r.status_code != 200 for r in responses):
+            print(f"❌ Burst request failed: {[r.status_code for r in responses]}")
+            return False
+        if len({r.content for r in responses}) != 1:
+            print(f"❌ Concurrent identical requests returned different bodies")
+            return False
+        series = await self.metrics()
+        stats = {k: v for k, v in series.items() if k.startswith('first_singleflight_')}
+        if 'first_singleflight_calls_total{role="leader"}' not in stats or 'first_singleflight_calls_total{role="shared"}' not in stats:
+            print(f"❌ Missing single-flight stats in metrics: {stats}")
+            return False
+        self.tests_passed += 1
+        print(f"✅ Burst of 20 identical reads OK, single-flight stats: {stats}")
+        return True
+
+    async def test_places_sort_modes(self):
+        """Test GET /api/places sort modes are ordered server-side (new/old/popular/name/category)"""
+        all_ok = True
+        for mode in ['new', 'old', 'asc', 'popular', 'name', 'category']:
+            success, response = await self.run_test(f"List places sorted by '{mode}'", "GET", f"/places?sort={mode}", 200)
+            if not success:
+                all_ok = False
+                continue
+            if mode == 'name':
+                keys = [p.get('nameKey') or '' for p in response]
+                ok = keys == sorted(keys)
+            elif mode == 'category':
+                keys = [(p.get('category') or '', p.get('nameKey') or '') for p in response]
+                ok = keys == sorted(keys)
+            elif mode == 'popular':
+                counts = [p.get('usageCount', 0) for p in response]
+                ok = counts == sorted(counts, reverse=True)
+            else:
+                ok = True
+            if ok:
+                print(f"✅ Sort '{mode}' returned {len(response)} places in order")
+            else:
+                print(f"❌ Sort '{mode}' returned places out of order")
+                all_ok = False
+        return all_ok
+
+    async def test_number_usage_summary(self):
+        """Test usedCount/lastEventAt on numbers follow POST /api/usage toggles"""
+        phone = f"+7999300{self.timestamp[-4:]}"
+        success, number = await self.run_test("Create number for usage summary", "POST", "/numbers", 200, {"phone": phone, "operatorKey": "mts"})
+        if not success:
+            return False
+        success, place = await self.run_test("Create place for usage summary", "POST", "/places", 200,
+                                       data={"name": f"Сводка-{self.timestamp}", "category": "Тест"}, is_multipart=True)
+        if not success:
+            return False
+        try:
+            if number.get('usedCount') != 0 or number.get('lastEventAt') is not None:
+                print(f"❌ New number should start with usedCount=0, lastEventAt=null: {number}")
+                return False
+            await self.run_test("Mark used", "POST", "/usage", 200, {"numberId": number['id'], "placeId": place['id'], "used": True})
+            success, after = await self.run_test("Get number after usage", "GET", f"/numbers/{number['id']}", 200)
+            if not success or after.get('usedCount') != 1 or not after.get('lastEventAt'):
+                print(f"❌ usedCount/lastEventAt not updated after marking used: {after}")
+                return False
+            await self.run_test("Unmark used", "POST", "/usage", 200, {"numberId": number['id'], "placeId": place['id'], "used": False})
+            success, listed = await self.run_test("List numbers with summaries", "GET", "/numbers", 200)
+            entry = next((n for n in listed if n.get('id') == number['id']), None) if success else None
+            if not entry or entry.get('usedCount') != 0:
+                print(f"❌ usedCount not decremented in list: {entry}")
+                return False
+            # deleting the place takes its usage off the number too
+            await self.run_test("Mark used again", "POST", "/usage", 200, {"numberId": number['id'], "placeId": place['id'], "used": True})
+            await self.run_test("Delete used place", "DELETE", f"/places/{place['id']}", 200)
+            place = None
+            success, after = await self.run_test("Get number after place delete", "GET", f"/numbers/{number['id']}", 200)
+            if not success or after.get('usedCount') != 0:
+                print(f"❌ usedCount not decremented after deleting the place: {after}")
+                return False
+            print(f"✅ usedCount/lastEventAt maintained on the number document")
+            return True
+        finally:
+            if place:
+                await self.run_test("Cleanup summary place", "DELETE", f"/places/{place['id']}", 200)
+            await self.run_test("Cleanup summary number", "DELETE", f"/numbers/{number['id']}", 200)
+
+    async def test_next_free_numbers(self):
+        """Test GET/POST /api/places/{id}/next-free - unused numbers, reserve never hands out the same one twice"""
+        success, place = await self.run_test("Create place for next-free", "POST", "/places", 200,
+                                       data={"name": f"Свободный-{self.timestamp}", "category": "Тест"}, is_multipart=True)
+        if not success:
+            return False
+        try:
+            success, response = await self.run_test("Next free numbers", "GET", f"/places/{place['id']}/next-free?limit=5", 200)
+            if not success:
+                return False
+            counts = [n.get('usedCount', 0) for n in response.get('numbers', [])]
+            if counts != sorted(counts):
+                print(f"❌ Next-free numbers not ordered by usedCount: {counts}")
+                return False
+            success, first = await self.run_test("Reserve next free number", "POST", f"/places/{place['id']}/next-free", 200)
+            success2, second = await self.run_test("Reserve another next free number", "POST", f"/places/{place['id']}/next-free", 200)
+            if not (success and success2):
+                return False
+            got = [n['id'] for n in first.get('numbers', []) + second.get('numbers', [])]
+            if len(got) != len(set(got)):
+                print(f"❌ The same number was reserved twice: {got}")
+                return False
+            print(f"✅ Reserved {len(got)} distinct numbers")
+            return True
+        finally:
+            await self.run_test("Cleanup next-free place", "DELETE", f"/places/{place['id']}", 200)
+
+    async def test_number_recommendations(self):
+        """Test GET /api/numbers/{id}/recommendations - unused places ranked by score"""
+        success, numbers = await self.run_test("List numbers for recommendations", "GET", "/numbers", 200)
+        if not success or not numbers:
+            print(f"❌ No numbers available for recommendations test")
+            return False
+        number_id = numbers[0]['id']
+        success, response = await self.run_test("Recommendations for number", "GET", f"/numbers/{number_id}/recommendations?limit=5", 200)
+        if not success:
+            return False
+        places = response.get('places', [])
+        if len(places) > 5:
+            print(f"❌ Recommendations limit not applied")
+            return False
+        scores = [p.get('score', 0) for p in places]
+        if scores != sorted(scores, reverse=True):
+            print(f"❌ Recommendations not ranked by score: {scores}")
+            return False
+        success, usage = await self.run_test("Usage for recommended number", "GET", f"/numbers/{number_id}/usage", 200)
+        used_ids = {p['id'] for p in usage.get('used', [])} if success else set()
+        if any(p['id'] in used_ids for p in places):
+            print(f"❌ Recommendations include a place the number already used")
+            return False
+        print(f"✅ {len(places)} unused places recommended in score order")
+        return (await self.run_test("Recommendations for missing number", "GET", "/numbers/nonexistent-id/recommendations", 404))[0]
+
+    async def test_unmark_deletes_usage_row(self):
+        """Test un-marking usage removes the pair and /api/admin/compact_usages reports reclaimed space"""
+        success, numbers = await self.run_test("List numbers for un-mark test", "GET", "/numbers", 200)
+        success2, places = await self.run_test("List places for un-mark test", "GET", "/places", 200)
+        if not (success and success2) or not numbers or not places:
+            print(f"❌ Need at least one number and one place")
+            return False
+        pair = {"numberId": numbers[0]['id'], "placeId": places[0]['id']}
+        await self.run_test("Mark pair used", "POST", "/usage", 200, {**pair, "used": True})
+        await self.run_test("Un-mark pair", "POST", "/usage", 200, {**pair, "used": False})
+        success, usage = await self.run_test("Number usage after un-mark", "GET", f"/numbers/{pair['numberId']}/usage", 200)
+        if not success or any(p['id'] == pair['placeId'] for p in usage.get('used', [])):
+            print(f"❌ Un-marked place still listed as used")
+            return False
+        if not usage.get('lastEventAt'):
+            print(f"❌ lastEventAt lost after un-mark")
+            return False
+        success, result = await self.run_test("Compact used=false usage rows", "POST", self.admin("/admin/compact_usages"), 200)
+        if not success or not all(k in result for k in ['deleted', 'batches', 'bytesReclaimed']):
+            print(f"❌ Compaction report incomplete: {result}")
+            return False
+        print(f"✅ Un-mark removed the pair; compaction report: {result}")
+        return True
+
+    async def test_usage_stats(self):
+        """Test GET /api/stats/usage reads daily rollups for totals, series and rankings"""
+        success, totals = await self.run_test("Usage stats totals", "GET", "/stats/usage?days=7", 200)
+        if not success or 'series' not in totals or 'updatedThrough' not in totals:
+            print(f"❌ Totals response incomplete: {totals}")
+            return False
+        success, weekly = await self.run_test("Usage stats weekly totals", "GET", "/stats/usage?days=28&bucket=week", 200)
+        if not success or len(weekly.get('series', [])) > 5:
+            print(f"❌ Weekly bucketing not applied: {weekly}")
+            return False
+        success, ranked = await self.run_test("Usage stats by operator", "GET", "/stats/usage?dim=operator&days=30", 200)
+        marked = [k.get('marked', 0) for k in ranked.get('keys', [])] if success else None
+        if marked is None or marked != sorted(marked, reverse=True):
+            print(f"❌ Operator ranking not ordered by marked count: {marked}")
+            return False
+        print(f"✅ Usage stats served from rollups ({len(marked)} operators)")
+        invalid_dim = (await self.run_test("Usage stats invalid dim", "GET", "/stats/usage?dim=nope", 400))[0]
+        invalid_bucket = (await self.run_test("Usage stats invalid bucket", "GET", "/stats/usage?bucket=foo", 400))[0]
+        return invalid_dim and invalid_bucket
+
+    async def test_list_facets(self):
+        """Test ?facets=true on /api/places and /api/numbers returns items plus chip counts"""
+        success, places = await self.run_test("Places with facets", "GET", "/places?facets=true", 200)
+        if not success or not all(k in places.get('facets', {}) for k in ['category', 'hasPromo', 'hasLogo']):
+            print(f"❌ Place facets incomplete: {places.get('facets') if success else places}")
+            return False
+        if sum(places['facets']['category'].values()) != len(places.get('items', [])):
+            print(f"❌ Category counts do not add up to the item count")
+            return False
+        if places['facets']['hasLogo'] != sum(1 for p in places['items'] if p.get('hasLogo')):
+            print(f"❌ hasLogo count mismatch")
+            return False
+        success, numbers = await self.run_test("Numbers with facets", "GET", "/numbers?facets=true", 200)
+        if not success or sum(numbers.get('facets', {}).get('operatorKey', {}).values()) != len(numbers.get('items', [])):
+            print(f"❌ Operator counts do not add up to the item count")
+            return False
+        success, plain = await self.run_test("Places without facets", "GET", "/places", 200)
+        if not success or not isinstance(plain, list):
+            print(f"❌ Default /places shape changed")
+            return False
+        print(f"✅ Facet counts: {places['facets']['category']}")
+        return True
+
+    async def test_bootstrap(self):
+        """Test GET /api/bootstrap returns every first-screen list and a /sync token, and honours If-None-Match"""
+        self.tests_run += 1
+        r = await self.client.get(f"{self.api_url}/bootstrap")
+        if r.status_code != 200:
+            print(f"❌ Bootstrap failed with {r.status_code}")
+            return False
+        data = r.json()
+        missing = [k for k in ['token', 'operators', 'categories', 'places', 'numbers', 'facets'] if k not in data]
+        if missing:
+            print(f"❌ Bootstrap missing keys: {missing}")
+            return False
+        if 'generations' in data:
+            print(f"❌ Bootstrap exposes per-worker cache generations")
+            return False
+        synced = await self.client.get(f"{self.api_url}/sync", params={"since": data['token']})
+        if synced.status_code != 200 or synced.json().get('full'):
+            print(f"❌ Bootstrap token not accepted by /sync: {synced.status_code}")
+            return False
+        etag = r.headers.get('ETag')
+        again = await self.client.get(f"{self.api_url}/bootstrap", headers={"If-None-Match": etag or ""})
+        if not etag or again.status_code != 304:
+            print(f"❌ Expected 304 for matching ETag, got {again.status_code}")
+            return False
+        self.tests_passed += 1
+        print(f"✅ Bootstrap: {len(data['places'])} places, {len(data['numbers'])} numbers, ETag revalidation OK")
+        return True
+
+    async def test_delta_sync(self):
+        """Test GET /api/sync returns a token, then only changes and tombstones after it, in pages that always advance;
+        expired tokens resync in full"""
+        success, full = await self.run_test("Full sync snapshot", "GET", "/sync", 200)
+        if not success or not full.get('full') or 'token' not in full:
+            print(f"❌ Full snapshot missing token: {full}")
+            return False
+        token = full['token']
+        while full.get('more'):
+            # a large database pages its snapshot
+            success, full = await self.run_test("Next snapshot page", "GET", f"/sync?since={token}", 200)
+            if not success:
+                return False
+            token = full['token']
+        success, place = await self.run_test("Create place for sync", "POST", "/places", 200,
+                                       data={"name": f"Sync Place {int(time.time())}", "category": "Тест"}, is_multipart=True)
+        if not success:
+            return False
+        # numbers used at the place all get the revision of its delete, more of them than fit one page
+        success, numbers = await self.run_test("Get numbers for sync", "GET", "/numbers", 200)
+        used_ids = [n['id'] for n in numbers[:3]] if success else []
+        for number_id in used_ids:
+            await self.run_test("Mark used for sync", "POST", "/usage", 200, {"numberId": number_id, "placeId": place['id'], "used": True})
+        await self.run_test("Delete place for sync", "DELETE", f"/places/{place['id']}", 200)
+        changed, deleted, pages, since = set(), set(), 0, token
+        while pages < 20:
+            success, delta = await self.run_test("Delta sync page", "GET", f"/sync?since={since}&limit=2", 200)
+            if not success:
+                return False
+            pages += 1
+            changed.update(n['id'] for n in delta['changes']['numbers'])
+            deleted.update(delta['deleted'].get('places', []))
+            if not delta['more']:
+                break
+            if delta['token'] == since:
+                print(f"❌ Sync page did not advance past {since}")
+                return False
+            since = delta['token']
+        if delta['more']:
+            print(f"❌ Delta sync still paging after {pages} pages")
+            return False
+        if place['id'] not in deleted:
+            print(f"❌ Deleted place missing from tombstones")
+            return False
+        if not set(used_ids) <= changed:
+            print(f"❌ Numbers touched by the place delete missing from the delta: {set(used_ids) - changed}")
+            return False
+        if int(delta['token']) <= int(token):
+            print(f"❌ Sync token did not advance")
+            return False
+        print(f"✅ Delta sync returned the tombstone in {pages} pages, token {token} -> {delta['token']}")
+        # a token older than the tombstone retention gets a full snapshot back
+        success, stale = await self.run_test("Sync past the tombstone horizon", "GET", "/sync?since=1&limit=1", 200)
+        if not success or not stale.get('full'):
+            print(f"❌ Expired token not answered with a full snapshot: {stale.get('full')}")
+            return False
+        invalid = [(await self.run_test(f"Sync with invalid token {t}", "GET", f"/sync?since={t}", 400))[0] for t in ["abc", "12:", "-5"]]
+        return all(invalid)
+
+    async def test_events_stream(self):
+        """Test GET /api/events opens an SSE stream that starts with a hello event carrying a sync token"""
+        self.tests_run += 1
+        try:
+            async with self.client.stream("GET", f"{self.api_url}/events", timeout=10) as r:
+                if r.status_code != 200 or not r.headers.get('Content-Type', '').startswith('text/event-stream'):
+                    print(f"❌ Unexpected SSE response: {r.status_code} {r.headers.get('Content-Type')}")
+                    return False
+                lines = []
+                async for line in r.aiter_lines():
+                    lines.append(line)
+                    if line.startswith('data:'):
+                        break
+        except httpx.HTTPError as e:
+            print(f"❌ SSE connection failed: {e}")
+            return False
+        if 'event: hello' not in lines or 'token' not in json.loads(lines[-1][5:]):
+            print(f"❌ Missing hello event: {lines}")
+            return False
+        # the per-worker feed is running: a change stream, or revision polling where streams are unavailable
+        if json.loads(lines[-1][5:]).get('mode') not in ('change_stream', 'polling'):
+            print(f"❌ Event feed not running: {lines[-1]}")
+            return False
+        self.tests_passed += 1
+        print(f"✅ SSE stream opened: {lines[-1]}")
+        return True
+
+    async def test_cache_headers(self):
+        """Test list ETags revalidate to 304 and hash-versioned logos are served immutable"""
+        self.tests_run += 1
+        r = await self.client.get(f"{self.api_url}/places")
+        etag = r.headers.get('ETag')
+        if r.status_code != 200 or not etag or r.headers.get('Cache-Control') != 'no-cache':
+            print(f"❌ List response missing ETag/Cache-Control: {dict(r.headers)}")
+            return False
+        again = await self.client.get(f"{self.api_url}/places", headers={"If-None-Match": etag})
+        if again.status_code != 304:
+            print(f"❌ Expected 304 for unchanged list, got {again.status_code}")
+            return False
+        with_logo = next((p for p in r.json() if p.get('hasLogo') and p.get('logoHash')), None)
+        if with_logo:
+            logo = await self.client.get(f"{self.api_url}/places/{with_logo['id']}/logo?v={with_logo['logoHash']}")
+            if 'immutable' not in logo.headers.get('Cache-Control', ''):
+                print(f"❌ Versioned logo not immutable: {logo.headers.get('Cache-Control')}")
+                return False
+        self.tests_passed += 1
+        print(f"✅ List revalidation and versioned media caching OK")
+        return True
+
+    async def test_prometheus_metrics(self):
+        """Test GET /api/metrics exposes route histograms, Mongo command timings and cache counters behind the admin secret"""
+        self.tests_run += 1
+        await self.client.get(f"{self.api_url}/places")
+        if self.admin_secret:
+            r = await self.client.get(f"{self.api_url}/metrics?secret=wrong-{self.timestamp}")
+            if r.status_code != 403:
+                print(f"❌ /api/metrics served with a wrong secret: {r.status_code}")
+                return False
+        r = await self.client.get(f"{self.api_url}{self.admin('/metrics')}")
+        if r.status_code != 200 or not r.headers.get('Content-Type', '').startswith('text/plain'):
+            print(f"❌ /api/metrics unavailable: {r.status_code}")
+            return False
+        expected = [
+            'first_http_request_duration_seconds_bucket{method="GET",route="/api/places"',
+            'first_mongo_command_duration_seconds_count{command="find"',
+            'first_cache_requests_total{cache="query",result="hit"}',
+        ]
+        missing = [e for e in expected if e not in r.text]
+        if missing:
+            print(f"❌ Missing series: {missing}")
+            return False
+        self.tests_passed += 1
+        print(f"✅ Prometheus exposition OK ({len(r.text.splitlines())} lines)")
+        return True
+
+    async def test_server_timing(self):
+        """Test responses carry a Server-Timing header with per-request Mongo command and document counts"""
+        self.tests_run += 1
+        r = await self.client.get(f"{self.api_url}/places?sort=new&q=zz{int(time.time())}")
+        timing = r.headers.get('Server-Timing', '')
+        if r.status_code != 200 or 'db;dur=' not in timing or 'cmds' not in timing:
+            print(f"❌ Missing Server-Timing db entry: {timing!r}")
+            return False
+        if '0 cmds' in timing:
+            print(f"❌ Uncached list reported no Mongo commands: {timing!r}")
+            return False
+        self.tests_passed += 1
+        print(f"✅ Server-Timing: {timing}")
+        return True
+
+    async def test_profiling_sampler(self):
+        """Test /api/admin/profiling samples requests into /api/admin/profiles and can be switched off"""
+        success, state = await self.run_test("Enable profiling sampler", "POST", self.admin("/admin/profiling?rate=1&route=/api/operators&seconds=30"), 200)
+        if not success or state.get('rate') != 1:
+            return False
+        try:
+            await self.client.get(f"{self.api_url}/operators")
+            success, listing = await self.run_test("List captured profiles", "GET", self.admin("/admin/profiles"), 200)
+            if not success or not any('operators' in p['name'] for p in listing.get('profiles', [])):
+                print(f"❌ No profile captured for /api/operators")
+                return False
+            name = listing['profiles'][0]['name']
+            success, _ = await self.run_test("Download profile", "GET", self.admin(f"/admin/profiles/{name}"), 200)
+            if not success:
+                return False
+        finally:
+            await self.run_test("Disable profiling sampler", "POST", self.admin("/admin/profiling?rate=0"), 200)
+        print(f"✅ Sampled profile captured: {name}")
+        return True
+
+    async def test_event_loop_lag(self):
+        """Test event-loop lag is exported to /api/metrics"""
+        self.tests_run += 1
+        series = await self.metrics()
+        loop = {k: v for k, v in series.items() if k.startswith(('first_event_loop_lag_seconds_count', 'first_event_loop_lag_max_seconds', 'first_event_loop_stalls_total'))}
+        if len(loop) != 3:
+            print(f"❌ Loop lag series missing: {loop}")
+            return False
+        self.tests_passed += 1
+        print(f"✅ Event loop lag: {loop}")
+        return True
+
+    async def test_memory_admin(self):
+        """Test tracemalloc start/snapshot/diff/stop and the memory report with cache sizes"""
+        success, started = await self.run_test("Start tracemalloc", "POST", self.admin("/admin/memory/start?rate=1"), 200)
+        if not success or not started.get('tracing'):
+            return False
+        try:
+            await self.client.get(f"{self.api_url}/places")
+            success, snap = await self.run_test("Take memory snapshot", "POST", self.admin("/admin/memory/snapshot"), 200)
+            success2, diff = await self.run_test("Diff memory snapshots", "GET", self.admin(f"/admin/memory/diff?base={started['baseline']}&limit=5"), 200)
+            if not (success and success2) or 'top' not in diff:
+                return False
+            success, report = await self.run_test("Memory report", "GET", self.admin("/admin/memory"), 200)
+            if not success or 'query' not in report.get('caches', {}) or not any('/api/places' in k for k in report.get('routes', {})):
+                print(f"❌ Memory report missing caches or route peaks")
+                return False
+        finally:
+            await self.run_test("Stop tracemalloc", "POST", self.admin("/admin/memory/stop"), 200)
+        print(f"✅ Memory report: {report.get('process')}")
+        return True
+
+    async def run_performance_tests(self):
+        """Run caching / performance feature tests"""
+        print("⚡ Starting Performance Feature Tests")
+        print("=" * 50)
+
+        initial_tests_run = self.tests_run
+        initial_tests_passed = self.tests_passed
+
+        performance_tests = [
+            self.test_query_cache,
+            self.test_single_flight_burst,
+            self.test_places_sort_modes,
+            self.test_number_usage_summary,
+            self.test_next_free_numbers,
+            self.test_number_recommendations,
+            self.test_unmark_deletes_usage_row,
+            self.test_usage_stats,
+            self.test_list_facets,
+            self.test_bootstrap,
+            self.test_delta_sync,
+            self.test_events_stream,
+            self.test_cache_headers,
+            self.test_prometheus_metrics,
+            self.test_server_timing,
+            self.test_profiling_sampler,
+            self.test_event_loop_lag,
+            self.test_memory_admin,
+        ]
+
+        failed = await self.run_checks(performance_tests)
+
+        suite_tests_run = self.tests_run - initial_tests_run
+        suite_tests_passed = self.tests_passed - initial_tests_passed
+
+        print("📊 Performance Test Results:")
+        print(f"   Tests run: {suite_tests_run}")
+        print(f"   Tests passed: {suite_tests_passed}")
+        print(f"   Success rate: {(suite_tests_passed/suite_tests_run*100):.1f}%" if suite_tests_run > 0 else "   Success rate: 0%")
+
+        return suite_tests_passed == suite_tests_run and not failed
+
+# test type -> tester coroutine; tests/test_api.py runs the same suites in-process
+SUITES = {
+    "all": "run_all_tests",
+    "promo": "run_promo_tests",
+    "search": "run_search_tests",
+    "admin": "test_admin_fix_timestamps",
+    "operators": "run_operators_tests",
+    "operators_delete": "run_operators_delete_tests",
+    "categories_delete": "run_categories_delete_tests",
+    "places_review": "run_places_review_tests",
+    "performance": "run_performance_tests",
+}
+
+async def run_suite(test_type, base_url=DEFAULT_BASE_URL):
+    async with httpx.AsyncClient(timeout=60) as client:
+        tester = FIRSTAPITester(base_url, client)
+        return await getattr(tester, SUITES[test_type])()
+
 def main():
-    tester = FIRSTAPITester()
-    
-    if len(sys.argv) > 1:
-        test_type = sys.argv[1].lower()
-        
-        if test_type == "promo":
-            success = tester.run_promo_tests()
-        elif test_type == "search":
-            success = tester.run_search_tests()
-        elif test_type == "admin":
-            success = tester.test_admin_fix_timestamps()
-        elif test_type == "operators":
-            success = tester.run_operators_tests()
-        elif test_type == "operators_delete":
-            success = tester.run_operators_delete_tests()
-        elif test_type == "categories_delete":
-            print("Running categories DELETE tests as requested...")
-            success = tester.run_categories_delete_tests()
-        elif test_type == "places_review":
-            print("Running places review tests as requested...")
-            success = tester.run_places_review_tests()
-        else:
-            print(f"Unknown test type: {test_type}")
-            print("Available types: promo, search, admin, operators, operators_delete, categories_delete, places_review")
-            success = False
-    else:
-        success = tester.run_all_tests()
-    
+    test_type = sys.argv[1].lower() if len(sys.argv) > 1 else "all"
+    if test_type not in SUITES:
+        print(f"Unknown test type: {test_type}")
+        print(f"Available types: {', '.join(t for t in SUITES if t != 'all')}")
+        return 1
+    success = asyncio.run(run_suite(test_type))
     return 0 if success else 1
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
@@ -1,11 +1,96 @@
+// Caching tiers, matched to the backend's headers:
+//  - precache: the bundled operator PNGs
+//  - cache-first: logo/icon URLs with ?v=<content hash> (served as immutable)
+//  - stale-while-revalidate: list endpoints, revalidated with If-None-Match against their ETag
+const STATIC_CACHE = 'static-v1';
+const MEDIA_CACHE = 'media-v1';
+const LIST_CACHE = 'lists-v1';
+const CACHES = [STATIC_CACHE, MEDIA_CACHE, LIST_CACHE];
+const MEDIA_LIMIT = 300;
+
+const OPERATOR_ICONS = [
+  'alfa', 'beeline', 'gazprom', 'megafon', 'motiv', 'mts', 'rt', 'sber', 't2', 'tmobile', 'yota',
+].map((key) => `/operators/${key}.png`);
+
+const MEDIA_RE = /\/api\/(places|operators|categories)\/[^/]+\/(logo|icon)$/;
+const LIST_RE = /\/api\/(places|numbers|operators|categories|bootstrap)$/;
+
 self.addEventListener('install', (event) => {
-  self.skipWaiting();
+  event.waitUntil(
+    caches.open(STATIC_CACHE)
+      .then((cache) => cache.addAll(OPERATOR_ICONS))
+      .then(() => self.skipWaiting())
+  );
 });
 
 self.addEventListener('activate', (event) => {
-  event.waitUntil(self.clients.claim());
+  event.waitUntil(
+    caches.keys()
+      .then((keys) => Promise.all(keys.filter((k) => !CACHES.includes(k)).map((k) => caches.delete(k))))
+      .then(() => self.clients.claim())
+  );
 });
 
-self.addEventListener('fetch', () => {
-  // Network-first (MVP)
-});
\ No newline at end of file
+self.addEventListener('fetch', (event) => {
+  const { request } = event;
+  const url = new URL(request.url);
+
+  if (request.method !== 'GET') {
+    // A write makes every cached list suspect: drop them before the page sees the write's response
+    if (url.pathname.includes('/api/')) {
+      event.respondWith(fetch(request).then((response) => caches.delete(LIST_CACHE).then(() => response)));
+    }
+    return;
+  }
+  if (MEDIA_RE.test(url.pathname) && url.searchParams.has('v')) {
+    event.respondWith(cacheFirst(MEDIA_CACHE, request, MEDIA_LIMIT));
+    return;
+  }
+  if (url.origin === self.location.origin && url.pathname.startsWith('/operators/')) {
+    event.respondWith(cacheFirst(STATIC_CACHE, request));
+    return;
+  }
+  if (LIST_RE.test(url.pathname)) {
+    event.respondWith(staleWhileRevalidate(event, request));
+  }
+  // Everything else goes to the network as before
+});
+
+async function cacheFirst(name, request, limit) {
+  const cache = await caches.open(name);
+  const cached = await cache.match(request);
+  if (cached) return cached;
+  const response = await fetch(request);
+  if (response.ok) {
+    await cache.put(request, response.clone());
+    if (limit) trimCache(cache, limit);
+  }
+  return response;
+}
+
+async function trimCache(cache, limit) {
+  const keys = await cache.keys();
+  // keys() is in insertion order, so the oldest entries go first
+  await Promise.all(keys.slice(0, Math.max(0, keys.length - limit)).map((k) => cache.delete(k)));
+}
+
+async function staleWhileRevalidate(event, request) {
+  const cache = await caches.open(LIST_CACHE);
+  const cached = await cache.match(request);
+  const fresh = revalidate(cache, request, cached);
+  if (cached) {
+    event.waitUntil(fresh.catch(() => {}));
+    return cached;
+  }
+  return fresh;
+}
+
+async function revalidate(cache, request, cached) {
+  const headers = new Headers(request.headers);
+  const etag = cached && cached.headers.get('ETag');
+  if (etag) headers.set('If-None-Match', etag);
+  const response = await fetch(new Request(request, { headers }));
+  if (response.status === 304 && cached) return cached;
+  if (response.ok) await cache.put(request, response.clone());
+  return response;
+}
@@ -126,6 +126,9 @@ import axios from "axios";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+// Logos and icons are requested with ?v=<content hash>: the server marks those URLs immutable,
+// so the browser and the service worker cache them until the image actually changes
+const mediaUrl = (path, hash) => (hash ? `${API}${path}?v=${hash}` : `${API}${path}`);
 
 // Operators map for logos in UI
 const OPERATORS = {
@@ -620,7 +623,7 @@ function SearchPage() {
               {results.places.map((p) => (
                 <div key={p.id} className="suggestion flex items-center gap-3" onClick={() => (window.location.href = `/places/${p.id}`)}>
                   <div className="w-6 h-6 bg-neutral-200 overflow-hidden flex items-center justify-center sugg-box">
-                    {p.hasLogo && <img alt="logo" className="w-6 h-6 object-cover sugg-logo" src={`${API}/places/${p.id}/logo`} />}
+                    {p.hasLogo && <img alt="logo" className="w-6 h-6 object-cover sugg-logo" src={mediaUrl(`/places/${p.id}/logo`, p.logoHash)} />}
                   </div>
                   <div className="flex-1">{p.name}</div>
                   <div className="text-neutral-400 text-xs">место</div>
@@ -693,8 +696,8 @@ function SearchPage() {
                 {/* sticky spacer removed per request */}
                 <div className="max-h-[50vh] overflow-y-auto overflow-x-hidden">
                   {ops.map(op => (
-                    <button key={op.id} className="w-full px-3 py-2 text-left hover:bg-neutral-50 border flex items-center gap-2" onClick={()=> { setOpForm({ id: op.id, name: op.name, logo:null, existingLogo: op.hasLogo ? `${API}/operators/${op.id}/logo` : '' }); setIsEditingOp(true); gotoSettingsMode('ops_form'); }}>
-                      <img alt="op" src={op.hasLogo ? `${API}/operators/${op.id}/logo` : '/operators/mts.png'} className="w-6 h-6 rounded-[3px]" onError={(e)=>{ e.currentTarget.src='/operators/mts.png'; }} />
+                    <button key={op.id} className="w-full px-3 py-2 text-left hover:bg-neutral-50 border flex items-center gap-2" onClick={()=> { setOpForm({ id: op.id, name: op.name, logo:null, existingLogo: op.hasLogo ? mediaUrl(`/operators/${op.id}/logo`, op.logoHash) : '' }); setIsEditingOp(true); gotoSettingsMode('ops_form'); }}>
+                      <img alt="op" src={op.hasLogo ? mediaUrl(`/operators/${op.id}/logo`, op.logoHash) : '/operators/mts.png'} className="w-6 h-6 rounded-[3px]" onError={(e)=>{ e.currentTarget.src='/operators/mts.png'; }} />
                       <span>{op.name}</span>
                     </button>
                   ))}
@@ -710,8 +713,8 @@ function SearchPage() {
               <div className="grid gap-2">
                 <div className="max-h-[50vh] overflow-y-auto overflow-x-hidden">
                   {catsList.map(cat => (
-                    <button key={cat.id} className="w-full px-3 py-2 text-left hover:bg-neutral-50 border flex items-center gap-2" onClick={()=> { setCatForm({ id: cat.id, name: cat.name, icon: null, existingIcon: `${API}/categories/${cat.id}/icon` }); setSettingsMode('cats_form'); }}>
-                      <img alt="icon" src={`${API}/categories/${cat.id}/icon`} className="w-6 h-6 rounded-[3px]" onError={(e)=>{ e.currentTarget.style.display='none'; }} />
+                    <button key={cat.id} className="w-full px-3 py-2 text-left hover:bg-neutral-50 border flex items-center gap-2" onClick={()=> { setCatForm({ id: cat.id, name: cat.name, icon: null, existingIcon: mediaUrl(`/categories/${cat.id}/icon`, cat.iconHash) }); setSettingsMode('cats_form'); }}>
+                      <img alt="icon" src={mediaUrl(`/categories/${cat.id}/icon`, cat.iconHash)} className="w-6 h-6 rounded-[3px]" onError={(e)=>{ e.currentTarget.style.display='none'; }} />
                       <span>{cat.name}</span>
                     </button>
                   ))}
@@ -925,7 +928,7 @@ function SearchPage() {
                 const active = key === opPickKey;
                 return (
                   <button key={op.id} className={`flex items-center px-3 py-2 text-left hover:bg-neutral-50 ${active? 'bg-neutral-100':''}`} onClick={()=> setOpPickKey(key || 'mts')}>
-                    <img alt="op" src={op.hasLogo ? `${API}/operators/${op.id}/logo` : (key? OPERATORS[key]?.icon : '/operators/mts.png')} className="w-6 h-6 rounded-[3px] mr-2" onError={(e)=>{ e.currentTarget.src='/operators/mts.png'; }} />
+                    <img alt="op" src={op.hasLogo ? mediaUrl(`/operators/${op.id}/logo`, op.logoHash) : (key? OPERATORS[key]?.icon : '/operators/mts.png')} className="w-6 h-6 rounded-[3px] mr-2" onError={(e)=>{ e.currentTarget.src='/operators/mts.png'; }} />
                     <span>{op.name}</span>
                   </button>
                 );
@@ -1048,7 +1051,7 @@ function SearchPage() {
                 const active = (cat.name||'') === (catPickName||'');
                 return (
                   <button key={cat.id} className={`text-left px-3 py-2 hover:bg-neutral-50 flex items-center gap-2 ${active? 'bg-neutral-100':''}`} onClick={()=> setCatPickName(cat.name)}>
-                    <img alt="icon" src={`${API}/categories/${cat.id}/icon`} className="w-6 h-6 rounded-[3px]" onError={(e)=>{ e.currentTarget.style.display='none'; }} />
+                    <img alt="icon" src={mediaUrl(`/categories/${cat.id}/icon`, cat.iconHash)} className="w-6 h-6 rounded-[3px]" onError={(e)=>{ e.currentTarget.style.display='none'; }} />
                     <span>{cat.name}</span>
                   </button>
                 );
@@ -1203,7 +1206,7 @@ function NumbersPage() {
               <div className="used-avatars" aria-label="Использованные места">
                 {(n.usedPlaces || []).slice(0,5).map((p,idx)=> (
                   <div key={p.id||idx} className="av" style={{ left: `${idx* (parseInt(getComputedStyle(document.documentElement).getPropertyValue('--check-size'))||20 * 0.6)}px`, zIndex: 10-idx }}>
-                    <img alt="place" src={`${API}/places/${p.id}/logo`} onError={(e)=>{ e.currentTarget.style.visibility='hidden'; }} />
+                    <img alt="place" src={mediaUrl(`/places/${p.id}/logo`, p.logoHash)} onError={(e)=>{ e.currentTarget.style.visibility='hidden'; }} />
                   </div>
                 ))}
               </div>
@@ -1250,7 +1253,7 @@ function NumbersPage() {
                     const key = Object.keys(OPERATORS).find(k => (OPERATORS[k]?.name||'').toLowerCase() === (op.name||'').toLowerCase());
                     if (key) setOpFilter(prev => ({ ...prev, [key]: checked }));
                   }} />
-                  <img alt="op" src={op.hasLogo ? `${API}/operators/${op.id}/logo` : '/operators/mts.png'} className="w-6 h-6 rounded-[3px] mr-2" onError={(e)=>{ e.currentTarget.src='/operators/mts.png'; }} />
+                  <img alt="op" src={op.hasLogo ? mediaUrl(`/operators/${op.id}/logo`, op.logoHash) : '/operators/mts.png'} className="w-6 h-6 rounded-[3px] mr-2" onError={(e)=>{ e.currentTarget.src='/operators/mts.png'; }} />
                   <span>{op.name}</span>
                 </label>
               ))}
@@ -1310,7 +1313,7 @@ function NumbersPage() {
                 const active = key === nbOpPickKey;
                 return (
                   <button key={op.id} className={`flex items-center px-3 py-2 text-left hover:bg-neutral-50 ${active? 'bg-neutral-100':''}`} onClick={()=> setNbOpPickKey(key || 'mts')}>
-                    <img alt="op" src={op.hasLogo ? `${API}/operators/${op.id}/logo` : (key? OPERATORS[key]?.icon : '/operators/mts.png')} className="w-6 h-6 rounded-[3px] mr-2" onError={(e)=>{ e.currentTarget.src='/operators/mts.png'; }} />
+                    <img alt="op" src={op.hasLogo ? mediaUrl(`/operators/${op.id}/logo`, op.logoHash) : (key? OPERATORS[key]?.icon : '/operators/mts.png')} className="w-6 h-6 rounded-[3px] mr-2" onError={(e)=>{ e.currentTarget.src='/operators/mts.png'; }} />
                     <span>{op.name}</span>
                   </button>
                 );
@@ -1586,7 +1589,7 @@ function NumberDetails({ id }) {
                   <label key={p.id} className="flex items-center px-3 py-2 cursor-pointer">
                     <input type="checkbox" className="ops-check" checked={!!placeFilter[p.id]} onChange={(e)=> setPlaceFilter(prev=> ({...prev, [p.id]: e.target.checked}))} />
                     <div className="w-6 h-6 bg-neutral-200 overflow-hidden flex items-center justify-center sugg-box mr-2">
-                      {p.hasLogo && <img alt="logo" className="w-6 h-6 object-cover sugg-logo" src={`${API}/places/${p.id}/logo?v=${Date.now()}`} />}
+                      {p.hasLogo && <img alt="logo" className="w-6 h-6 object-cover sugg-logo" src={mediaUrl(`/places/${p.id}/logo`, p.logoHash)} />}
                     </div>
                     <span>{p.name}</span>
                   </label>
@@ -1625,7 +1628,7 @@ function NumberDetails({ id }) {
             })
             .map((p)=> (
             <div key={p.id} className="list-row">
-              <div className="op"><img alt="logo" src={`${API}/places/${p.id}/logo`} onError={(e)=>{ e.currentTarget.style.display='none'; }} /></div>
+              <div className="op"><img alt="logo" src={mediaUrl(`/places/${p.id}/logo`, p.logoHash)} onError={(e)=>{ e.currentTarget.style.display='none'; }} /></div>
               <div className="phone font-medium">{p.name}</div>
               <div className="check">
                 <input
@@ -1707,7 +1710,7 @@ function NumberDetails({ id }) {
                 const active = key === ndOpPickKey;
                 return (
                   <button key={op.id} className={`flex items-center px-3 py-2 text-left hover:bg-neutral-50 ${active? 'bg-neutral-100':''}`} onClick={()=> setNdOpPickKey(key || 'mts')}>
-                    <img alt="op" src={op.hasLogo ? `${API}/operators/${op.id}/logo` : (key? OPERATORS[key]?.icon : '/operators/mts.png')} className="w-6 h-6 rounded-[3px] mr-2" onError={(e)=>{ e.currentTarget.src='/operators/mts.png'; }} />
+                    <img alt="op" src={op.hasLogo ? mediaUrl(`/operators/${op.id}/logo`, op.logoHash) : (key? OPERATORS[key]?.icon : '/operators/mts.png')} className="w-6 h-6 rounded-[3px] mr-2" onError={(e)=>{ e.currentTarget.src='/operators/mts.png'; }} />
                     <span>{op.name}</span>
                   </button>
                 );
@@ -1906,7 +1909,7 @@ function PlaceDetails({ id }) {
         <div className="flex items-start justify-between gap-3">
           <div className="flex items-start gap-3 flex-1 min-w-0 w-full">
             {place.hasLogo && (
-              <img alt={place.name} className="w-20 h-20 object-cover" style={{ borderRadius: '2%', marginLeft: '-3px' }} src={`${API}/places/${id}/logo`} />
+              <img alt={place.name} className="w-20 h-20 object-cover" style={{ borderRadius: '2%', marginLeft: '-3px' }} src={mediaUrl(`/places/${id}/logo`, place.logoHash)} />
             )}
             <div className="flex flex-col min-w-0" style={{ width: 'calc(100vw - 23px - 80px - 12px - 1px)', marginRight: '-15px' }}>
               <div className="marquee text-2xl font-semibold min-w-0" style={{ display: 'flex', alignItems: 'flex-start', lineHeight: 1 }} ref={el=>{
@@ -2063,7 +2066,7 @@ function PlaceDetails({ id }) {
                     const key = Object.keys(OPERATORS).find(k => (OPERATORS[k]?.name||'').toLowerCase() === (op.name||'').toLowerCase());
                     if (key) setOpFilter(prev => ({ ...prev, [key]: checked }));
                   }} />
-                  <img alt="op" src={op.hasLogo ? `${API}/operators/${op.id}/logo` : '/operators/mts.png'} className="w-6 h-6 rounded-[3px] mr-2" onError={(e)=>{ e.currentTarget.src='/operators/mts.png'; }} />
+                  <img alt="op" src={op.hasLogo ? mediaUrl(`/operators/${op.id}/logo`, op.logoHash) : '/operators/mts.png'} className="w-6 h-6 rounded-[3px] mr-2" onError={(e)=>{ e.currentTarget.src='/operators/mts.png'; }} />
                   <span>{op.name}</span>
                 </label>
               ))}
@@ -2239,7 +2242,7 @@ function PlaceDetails({ id }) {
                 const active = (cat.name||'') === (plCatPickName||'');
                 return (
                   <button key={cat.id} className={`text-left px-3 py-2 hover:bg-neutral-50 flex items-center gap-2 ${active? 'bg-neutral-100':''}`} onClick={()=> setPlCatPickName(cat.name)}>
-                    <img alt="icon" src={`${API}/categories/${cat.id}/icon`} className="w-6 h-6 rounded-[3px]" onError={(e)=>{ e.currentTarget.style.display='none'; }} />
+                    <img alt="icon" src={mediaUrl(`/categories/${cat.id}/icon`, cat.iconHash)} className="w-6 h-6 rounded-[3px]" onError={(e)=>{ e.currentTarget.style.display='none'; }} />
                     <span>{cat.name}</span>
                   </button>
                 );
@@ -2465,7 +2468,7 @@ function PlacesPage() {
                       const checked = e.target.checked;
                       setCatFilterNames(prev=> ({...prev, [c.name]: checked}));
                     }} />
-                    <img alt="icon" src={`${API}/categories/${c.id}/icon`} className="w-6 h-6 rounded-[3px] mr-2" onError={(e)=>{ e.currentTarget.style.display='none'; }} />
+                    <img alt="icon" src={mediaUrl(`/categories/${c.id}/icon`, c.iconHash)} className="w-6 h-6 rounded-[3px] mr-2" onError={(e)=>{ e.currentTarget.style.display='none'; }} />
                     <span>{c.name}</span>
                   </label>
                 ))}
@@ -2497,7 +2500,7 @@ function PlacesPage() {
               <div className="card-wrap">
                 <button className="w-full aspect-square overflow-hidden flex items-center justify-center relative tile" onClick={(e)=>{ e.stopPropagation(); nav(`/places/${p.id}`); }}>
                   {p.hasLogo ? (
-                    <img alt={p.name} className="w-[92%] h-[92%] object-cover" style={{ borderRadius: '2%' }} src={`${API}/places/${p.id}/logo`} />
+                    <img alt={p.name} className="w-[92%] h-[92%] object-cover" style={{ borderRadius: '2%' }} src={mediaUrl(`/places/${p.id}/logo`, p.logoHash)} />
                   ) : (
                     <div className="text-neutral-400 text-xs">нет лого</div>
                   )}
@@ -2585,7 +2588,7 @@ function PlacesPage() {
                 const active = (cat.name||'') === (plCatPickName||'');
                 return (
                   <button key={cat.id} className={`text-left px-3 py-2 hover:bg-neutral-50 flex items-center gap-2 ${active? 'bg-neutral-100':''}`} onClick={()=> setPlCatPickName(cat.name)}>
-                    <img alt="icon" src={`${API}/categories/${cat.id}/icon`} className="w-6 h-6 rounded-[3px]" onError={(e)=>{ e.currentTarget.style.display='none'; }} />
+                    <img alt="icon" src={mediaUrl(`/categories/${cat.id}/icon`, cat.iconHash)} className="w-6 h-6 rounded-[3px]" onError={(e)=>{ e.currentTarget.style.display='none'; }} />
                     <span>{cat.name}</span>
                   </button>
                 );
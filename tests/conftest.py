@@ -0,0 +1,15 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+# backend_test.py lives at the root, server.py and benchmark.py in backend/
+sys.path[:0] = [str(ROOT_DIR), str(ROOT_DIR / "backend")]
+
+
+@pytest.fixture(scope="session")
+def worker_db() -> str:
+    """A database name of this pytest-xdist worker's own (gw0, gw1, ...; "main" without xdist)."""
+    return f"first_test_{os.environ.get('PYTEST_XDIST_WORKER', 'main')}"
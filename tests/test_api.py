@@ -0,0 +1,290 @@
+"""The FIRSTAPITester suites from backend_test.py, run in-process against the ASGI app.
+
+Each suite gets a freshly started app and a freshly seeded database named for its pytest-xdist worker:
+the in-memory stand-in by default, or TEST_MONGO_URL's mongod (the worker's database is dropped first).
+The app keeps process-wide caches, so parallelism comes from worker processes, not from sharing one:
+
+    python -m pytest tests/test_api.py -n auto
+"""
+import asyncio
+import importlib.util
+import os
+import random
+import sys
+import tracemalloc
+from contextlib import asynccontextmanager, suppress
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import unquote
+
+import httpx
+import pytest
+
+import backend_test
+import benchmark
+
+TEST_MONGO_URL = os.environ.get("TEST_MONGO_URL")
+BASE_URL = "http://testserver"
+# the profiling and tracemalloc toggles refuse to run on an admin API without a secret
+ADMIN_SECRET = "test-admin-secret"
+# The suites were written against a live database: they expect some numbers and places to exist already,
+# and the promo suite reads this place by id
+SEED_VOLUMES = {"numbers": 20, "places": 10, "usages": 60}
+NEFTL_PLACE = {
+    "id": "c4c95482-5229-40bc-a5d1-9b555035235a", "name": "НЕФТЛ", "category": "АЗС",
+    "promoCode": "1111111", "promoUrl": None, "comment": None, "usageCount": 0,
+}
+
+
+class StreamingASGITransport(httpx.AsyncBaseTransport):
+    """Like httpx.ASGITransport, but the body is streamed as the app sends it, so /api/events can be read."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = request.url
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": request.method,
+            "scheme": url.scheme, "path": unquote(url.path), "raw_path": url.raw_path.split(b"?")[0],
+            "query_string": url.query, "root_path": "", "headers": [(k.lower(), v) for k, v in request.headers.raw],
+            "server": (url.host, url.port or 80), "client": ("127.0.0.1", 50000),
+        }
+        body = await request.aread()
+        messages: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        request_sent = False
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def run_app():
+            try:
+                await self.app(scope, receive, messages.put)
+            finally:
+                await messages.put(None)
+
+        task = asyncio.create_task(run_app())
+        start = await messages.get()
+        if start is None:
+            task.result()  # the app failed before responding: surface its exception
+            raise RuntimeError("app returned without sending a response")
+
+        async def close():
+            disconnected.set()
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(asyncio.shield(task), 1)
+            task.cancel()
+            with suppress(asyncio.CancelledError, Exception):
+                await task
+
+        return httpx.Response(start["status"], headers=start.get("headers", []), stream=BodyStream(messages, close), request=request)
+
+
+class BodyStream(httpx.AsyncByteStream):
+    def __init__(self, messages: asyncio.Queue, close):
+        self.messages = messages
+        self.close = close
+
+    async def __aiter__(self):
+        while True:
+            message = await self.messages.get()
+            if message is None:
+                return
+            if message["type"] == "http.response.body":
+                if message.get("body"):
+                    yield message["body"]
+                if not message.get("more_body", False):
+                    return
+
+    async def aclose(self):
+        await self.close()
+
+
+@asynccontextmanager
+async def app_client(db_name: str, prepare=None):
+    """`prepare(server)`, if given, runs on the seeded database before the app starts."""
+    if TEST_MONGO_URL:
+        os.environ["MONGO_URL"] = TEST_MONGO_URL
+    server = benchmark.load_server(db_name, memory=not TEST_MONGO_URL)
+    await server.client.drop_database(db_name)
+    await benchmark.seed(server, server.db, SEED_VOLUMES, random.Random(0))
+    await server.db.places.insert_one({
+        **NEFTL_PLACE, "nameKey": server.name_key(NEFTL_PLACE["name"]), "createdAt": datetime.now(timezone.utc), "rev": 1,
+    })
+    if prepare:
+        await prepare(server)
+    benchmark.reset_app_state(server)
+    await server.app.router.startup()
+    try:
+        async with httpx.AsyncClient(transport=StreamingASGITransport(server.app), base_url=BASE_URL, timeout=30) as client:
+            yield client
+    finally:
+        await server.app.router.shutdown()
+
+
+@pytest.mark.parametrize("suite", list(backend_test.SUITES))
+def test_suite(suite, worker_db, monkeypatch):
+    async def run():
+        async with app_client(worker_db) as client:
+            tester = backend_test.FIRSTAPITester(BASE_URL, client, admin_secret=ADMIN_SECRET)
+            return await getattr(tester, backend_test.SUITES[suite])(), tester
+
+    if not TEST_MONGO_URL:
+        pytest.importorskip("mongomock_motor")
+    monkeypatch.setenv("ADMIN_FIX_SECRET", ADMIN_SECRET)
+    passed, tester = asyncio.run(run())
+    assert passed, (
+        f"{suite}: {tester.tests_passed}/{tester.tests_run} requests as expected, failed checks: {tester.failed_checks}"
+        " (details in the captured output)"
+    )
+
+
+def test_profilers_require_admin_secret(worker_db, monkeypatch):
+    async def run():
+        async with app_client(worker_db) as client:
+            enable = await client.post("/api/admin/profiling?rate=1&route=/api/operators")
+            disable = await client.post("/api/admin/profiling?rate=0")
+            trace = await client.post("/api/admin/memory/start?rate=1")
+            return enable.status_code, disable.status_code, trace.status_code, tracemalloc.is_tracing()
+
+    if not TEST_MONGO_URL:
+        pytest.importorskip("mongomock_motor")
+    monkeypatch.delenv("ADMIN_FIX_SECRET", raising=False)
+    assert asyncio.run(run()) == (403, 200, 403, False)
+
+
+class SlowLookups:
+    """A database whose replies to find_one on one collection arrive late, as over a slow network."""
+
+    def __init__(self, db, collection: str, ticks: int = 50):
+        self.db, self.collection, self.ticks = db, collection, ticks
+
+    def __getattr__(self, name):
+        attr = getattr(self.db, name)
+        return SlowLookups.Collection(attr, self.ticks) if name == self.collection else attr
+
+    def __getitem__(self, name):
+        return self.db[name]
+
+    class Collection:
+        def __init__(self, collection, ticks: int):
+            self.collection, self.ticks = collection, ticks
+
+        def __getattr__(self, name):
+            return getattr(self.collection, name)
+
+        async def find_one(self, *args, **kwargs):
+            doc = await self.collection.find_one(*args, **kwargs)
+            for _ in range(self.ticks):
+                await asyncio.sleep(0)
+            return doc
+
+
+def test_usage_mark_racing_place_delete(worker_db):
+    async def run():
+        async with app_client(worker_db) as client:
+            server = sys.modules["server"]
+            number = await server.db.numbers.find_one({}, {"_id": 0, "id": 1, "usedCount": 1})
+            place = (await client.post("/api/places", data={"name": "Гонка", "category": "Магазины"})).json()
+            # the mark's place lookup still sees the place, but the whole delete runs before the mark is written
+            server.db = SlowLookups(server.db, "places")
+            marked, deleted = await asyncio.gather(
+                client.post("/api/usage", json={"numberId": number["id"], "placeId": place["id"], "used": True}),
+                client.delete(f"/api/places/{place['id']}"),
+            )
+            server.db = server.db.db
+            orphans = await server.db.usages.count_documents({"placeId": place["id"]})
+            after = await server.db.numbers.find_one({"id": number["id"]})
+            return marked.status_code, deleted.status_code, orphans, after.get("usedCount", 0) - number.get("usedCount", 0)
+
+    if not TEST_MONGO_URL:
+        pytest.importorskip("mongomock_motor")
+    assert asyncio.run(run()) == (404, 200, 0, 0)
+
+
+def test_startup_resolves_duplicate_phone_digits(worker_db):
+    kept = {}
+
+    async def prepare(server):
+        # a copy of the oldest number, digits and all, written while the unique index was missing
+        await server.db.numbers.drop_indexes()
+        kept.update(await server.db.numbers.find_one({}, {"_id": 0}, sort=[("createdAt", 1)]))
+        await server.db.numbers.insert_one({**kept, "id": "duplicate-digits", "createdAt": datetime.now(timezone.utc)})
+
+    async def run():
+        async with app_client(worker_db, prepare):
+            server = sys.modules["server"]
+            docs = {d["id"]: d["phoneDigits"] async for d in server.db.numbers.find({"id": {"$in": [kept["id"], "duplicate-digits"]}})}
+            return kept, docs, await server.db.numbers.index_information()
+
+    if not TEST_MONGO_URL:
+        pytest.importorskip("mongomock_motor")
+    kept, docs, indexes = asyncio.run(run())
+    assert indexes["phoneDigits_1"].get("unique")
+    assert docs == {kept["id"]: kept["phoneDigits"], "duplicate-digits": f"{kept['phoneDigits']}#duplicate-digits"}
+
+
+def test_change_pipeline_drops_media_bytes():
+    pytest.importorskip("mongomock_motor")
+    import mongomock
+    server = benchmark.load_server("first_test_pipeline", memory=True)
+    logo = {"data": "QUJD" * 1000, "contentType": "image/png", "hash": "abc123"}
+    changes = mongomock.MongoClient().db.changes
+    changes.insert_many([
+        {"ns": {"coll": "places"}, "operationType": "insert", "fullDocument": {"id": "p1", "name": "Кафе", "rev": 2, "logo": logo}},
+        {"ns": {"coll": "places"}, "operationType": "update", "fullDocument": {"id": "p1", "name": "Кафе", "rev": 3, "logo": logo},
+         "updateDescription": {"updatedFields": {"logo": logo, "rev": 3}, "removedFields": []}},
+        {"ns": {"coll": "categories"}, "operationType": "insert", "fullDocument": {"id": "c1", "name": "АЗС", "rev": 4, "icon": logo}},
+    ])
+    projected = list(changes.aggregate(server.CHANGE_PIPELINE))
+    assert len(projected) == 3 and "QUJD" not in repr(projected)
+    events = [server.change_event(c) for c in projected]
+    assert [e["fields"].get("logoHash", e["fields"].get("iconHash")) for e in events] == ["abc123"] * 3
+    assert all(e["fields"].get("hasLogo", e["fields"].get("hasIcon")) for e in events)
+
+
+def load_peer(server):
+    """A second copy of the app on the same database, as another worker process would run it."""
+    spec = importlib.util.spec_from_file_location("server_peer", Path(server.__file__))
+    peer = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(peer)
+    peer.client, peer.db = server.client, server.db
+    peer.EVENTS_POLL_INTERVAL = 0.05
+    benchmark.reset_app_state(peer)
+    return peer
+
+
+def test_write_on_one_worker_reaches_another(worker_db):
+    async def run():
+        async with app_client(worker_db) as client:
+            peer = load_peer(sys.modules["server"])
+            await peer.app.router.startup()
+            try:
+                async with httpx.AsyncClient(transport=StreamingASGITransport(peer.app), base_url=BASE_URL, timeout=30) as other:
+                    await other.get("/api/places?q=Соседний")
+                    cached = await other.get("/api/places?q=Соседний")
+                    created = (await client.post("/api/places", data={"name": "Соседний", "category": "Магазины"})).json()
+                    await asyncio.sleep(0.3)
+                    after = await other.get("/api/places?q=Соседний")
+                    suggested = (await other.get("/api/suggest?q=сосед")).json()
+                    await client.delete(f"/api/places/{created['id']}")
+                    await asyncio.sleep(0.3)
+                    dropped = (await other.get("/api/suggest?q=сосед")).json()
+            finally:
+                await peer.app.router.shutdown()
+            return cached.headers.get("X-Cache"), created["id"], after, suggested, dropped
+
+    if not TEST_MONGO_URL:
+        pytest.importorskip("mongomock_motor")
+    cached, created, after, suggested, dropped = asyncio.run(run())
+    assert (cached, after.headers.get("X-Cache")) == ("HIT", "MISS")
+    assert created in [p["id"] for p in after.json()]
+    # the peer's suggest index follows the other worker's create and delete
+    assert [p["id"] for p in suggested["places"]] == [created]
+    assert dropped["places"] == []
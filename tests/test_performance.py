@@ -0,0 +1,89 @@
+"""Performance regression gate: the benchmark scenarios at reduced scale, checked against perf_baseline.json.
+
+Every scenario of backend/benchmark.py runs once per session against the in-process app, by default on the
+in-memory stand-in (set PERF_MONGO_URL to gate against a real mongod; it has its own baseline section).
+A scenario fails when its Mongo commands per request or peak allocation leaves the tolerance band around
+its baseline. Wall-clock p95 from a dozen requests is too noisy to fail a shared runner on, so a p95 outside
+its band is only a warning unless PERF_STRICT_LATENCY=1. After an intentional change, refresh the numbers
+and commit them with it:
+
+    PERF_UPDATE_BASELINE=1 python -m pytest tests/test_performance.py
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import warnings
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+import benchmark  # noqa: E402
+
+BASELINE_PATH = Path(__file__).parent / "perf_baseline.json"
+BASELINE = json.loads(BASELINE_PATH.read_text())
+MONGO_URL = os.environ.get("PERF_MONGO_URL")
+BACKEND = "mongod" if MONGO_URL else "memory"
+UPDATE = os.environ.get("PERF_UPDATE_BASELINE") == "1"
+GATED = ("p95Ms", "dbCommands", "peakKb")
+# deterministic per request on a given backend; the rest only warn unless asked to fail
+STRICT = ("dbCommands", "peakKb") + (("p95Ms",) if os.environ.get("PERF_STRICT_LATENCY") == "1" else ())
+
+
+async def run_benchmark() -> dict:
+    config = BASELINE["config"]
+    if MONGO_URL:
+        os.environ["MONGO_URL"] = MONGO_URL
+    server = benchmark.load_server("first_perf", memory=not MONGO_URL)
+    await benchmark.prepare(server, config["volumes"], config["seed"])
+    return await benchmark.drive(
+        server, list(benchmark.SCENARIOS), config["requests"], config["concurrency"],
+        config["warmup"], config["seed"], trace_memory=True,
+    )
+
+
+@pytest.fixture(scope="module")
+def results():
+    if not MONGO_URL:
+        pytest.importorskip("mongomock_motor")
+    # captured log records (per-request httpx lines, stall stacks) would be counted in the peaks
+    quiet = {"server": logging.ERROR, "httpx": logging.WARNING}
+    levels = {name: logging.getLogger(name).level for name in quiet}
+    for name, level in quiet.items():
+        logging.getLogger(name).setLevel(level)
+    try:
+        out = asyncio.run(run_benchmark())
+    finally:
+        for name, level in levels.items():
+            logging.getLogger(name).setLevel(level)
+    if UPDATE:
+        BASELINE.setdefault("backends", {})[BACKEND] = {
+            name: {metric: r[metric] for metric in GATED} for name, r in out.items()
+        }
+        BASELINE_PATH.write_text(json.dumps(BASELINE, indent=2, ensure_ascii=False) + "\n")
+    return out
+
+
+def allowed(metric: str, base: float) -> float:
+    band = BASELINE["tolerance"][metric]
+    return base * band["ratio"] + band["slack"]
+
+
+@pytest.mark.parametrize("scenario", list(benchmark.SCENARIOS))
+def test_scenario_within_baseline(results, scenario):
+    result = results[scenario]
+    assert result["errors"] == 0, f"{scenario} failed requests: {result['statuses']}"
+    base = BASELINE.get("backends", {}).get(BACKEND, {}).get(scenario)
+    if base is None:
+        pytest.skip(f"no {BACKEND} baseline for {scenario}; run with PERF_UPDATE_BASELINE=1")
+    regressions = {
+        metric: f"{metric} {result[metric]} > {allowed(metric, base[metric]):.1f} (baseline {base[metric]})"
+        for metric in GATED
+        if base.get(metric) is not None and result.get(metric) is not None and result[metric] > allowed(metric, base[metric])
+    }
+    for metric in regressions.keys() - set(STRICT):
+        warnings.warn(f"{scenario} slower than baseline: {regressions[metric]}")
+    strict = [regressions[metric] for metric in STRICT if metric in regressions]
+    assert not strict, f"{scenario} regressed: " + "; ".join(strict)